@@ -0,0 +1,339 @@
+import argparse
+import datetime
+import functools
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from geometry import Line, Point, Points, Rectangle
+from line_drawer import (DrawType, compute_image_lines, draw_line_image, draw_line_svg,
+                         find_best_line_through_point, load_image, residual_error, write_line_svg)
+from orientation import OrientationMap
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example', 'mani_matter.png')
+
+# Benchmark matrix: (image widths, num_lines, num_lines_to_check)
+MATRICES = {
+    'quick': ((128,), (300,), (10,)),
+    'default': ((128, 256), (300, 1000), (10, 50)),
+    'full': ((128, 256, 512), (300, 1000, 3000), (10, 50, 200)),
+}
+
+
+def synthetic_image(width):
+    """Deterministic test image with a radial gradient, rings and a dark square.
+
+    Args:
+        width (int): Image width and height.
+
+    Returns:
+        np.array: Grayscale image as int16 numpy array.
+    """
+    yy, xx = np.indices((width, width)) / width
+    radius = np.hypot(xx - 0.5, yy - 0.5)
+    image = 255 * (1 - radius) + 40 * np.sin(radius * 40)
+    image[width // 5:width // 2, width // 5:width // 2] = 30
+    return np.clip(image, 0, 255).astype(np.int16)
+
+
+def input_images(widths):
+    """Returns all benchmark images as (name, image) pairs."""
+    images = []
+    for width in widths:
+        images.append(('synthetic{}'.format(width), synthetic_image(width)))
+        images.append(('mani_matter{}'.format(width), load_image(EXAMPLE_PATH, width)))
+    return images
+
+
+def find_lines_through_points(points, num_lines_to_check, image):
+    """Finds the best line through every point of points."""
+    for point in points:
+        find_best_line_through_point(num_lines_to_check, point, image, None, DrawType.SUBTRACTIVE)
+
+
+def compute_residual_lines(target, num_lines, num_lines_to_check, draw_type):
+    """Computes lines on a copy of target with a fixed seed and returns residual and lines."""
+    np.random.seed(42)
+    residual = target.copy()
+    lines = compute_image_lines(residual, num_lines, num_lines_to_check, draw_type)
+    return residual, lines
+
+
+def best_time(function, repeat):
+    """Runs function repeat times and returns the fastest run time and the last result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run_benchmarks(matrix='default', repeat=3, progress=print):
+    """Times the hot paths over the benchmark matrix.
+
+    Args:
+        matrix (str, optional): Name of the matrix in MATRICES. Defaults to 'default'.
+        repeat (int, optional): Runs per case, the fastest counts. Defaults to 3.
+        progress (callable, optional): Called with a line for every finished case.
+
+    Returns:
+        dict: Results with case names as keys and dicts with time in seconds and
+        optional mse as values.
+    """
+    (widths, num_lines_list, num_lines_to_check_list) = MATRICES[matrix]
+    results = {}
+
+    def record(case, seconds, mse=None):
+        results[case] = {'time': seconds}
+        if mse is not None:
+            results[case]['mse'] = mse
+        progress('{:<68} {:>12.6f}s {}'.format(
+            case, seconds, '' if mse is None else 'mse={:.1f}'.format(mse)))
+
+    for (image_name, target) in input_images(widths):
+        (height, width) = target.shape
+
+        for num_lines_to_check in num_lines_to_check_list:
+            case = 'find_best_line_through_point/{}/check{}'.format(image_name, num_lines_to_check)
+            np.random.seed(42)
+            points = [Point(x, -y) for (y, x) in zip(np.random.randint(0, height, 100),
+                                                      np.random.randint(0, width, 100))]
+            seconds, _ = best_time(functools.partial(
+                find_lines_through_points, points, num_lines_to_check, target), repeat)
+            record(case, seconds / len(points))
+
+            for num_lines in num_lines_list:
+                for draw_type in DrawType:
+                    case = 'compute_image_lines/{}/{}/lines{}/check{}'.format(
+                        image_name, draw_type.name.lower(), num_lines, num_lines_to_check)
+                    seconds, (residual, lines) = best_time(functools.partial(
+                        compute_residual_lines, target, num_lines, num_lines_to_check, draw_type),
+                        repeat)
+                    record(case, seconds, residual_error(target, residual, draw_type))
+
+        # Render the lines of the last computed case.
+        for num_lines in num_lines_list:
+            render_lines = lines * math.ceil(num_lines / max(len(lines), 1))
+            render_lines = render_lines[:num_lines]
+
+            seconds, _ = best_time(functools.partial(
+                draw_line_image, render_lines, target.shape, DrawType.SUBTRACTIVE), repeat)
+            record('draw_line_image/{}/lines{}'.format(image_name, num_lines), seconds)
+
+            seconds, _ = best_time(functools.partial(
+                draw_line_svg, render_lines, width, height, DrawType.SUBTRACTIVE), repeat)
+            record('draw_line_svg/{}/lines{}'.format(image_name, num_lines), seconds)
+
+            with tempfile.TemporaryDirectory() as temp_dir:
+                svg_path = os.path.join(temp_dir, 'lines.svg')
+                seconds, _ = best_time(functools.partial(
+                    write_line_svg, render_lines, width, height, DrawType.SUBTRACTIVE, svg_path),
+                    repeat)
+            record('write_line_svg/{}/lines{}'.format(image_name, num_lines), seconds)
+
+    rectangle = Rectangle(255.0, 255.0, Point(0.0, -255.0))
+    np.random.seed(42)
+    test_lines = [Line(Point(x, -y), Point(math.cos(angle), math.sin(angle)))
+                  for (x, y, angle) in np.random.rand(1000, 3) * (255, 255, math.pi)]
+    seconds, _ = best_time(
+        lambda: [rectangle.intersection_with_line(line_) for line_ in test_lines], repeat)
+    record('Rectangle.intersection_with_line', seconds / len(test_lines))
+
+    points = Points.from_points([line_.point for line_ in test_lines])
+    directions = Points.from_points([line_.direction for line_ in test_lines])
+    seconds, _ = best_time(lambda: rectangle.intersect_lines(points, directions), repeat)
+    record('Rectangle.intersect_lines', seconds / len(test_lines))
+
+    return results
+
+
+def run_angle_sampling_benchmark(width=256, num_lines=2000, checks=(2, 5, 10, 20, 50),
+                                 spread=0.2, progress=print):
+    """Compares residual error versus candidates checked for uniform and guided angles.
+
+    Args:
+        width (int, optional): Image width. Defaults to 256.
+        num_lines (int, optional): Number of lines per run. Defaults to 2000.
+        checks (tuple(int), optional): Values of num_lines_to_check. Defaults to (2, 5, 10, 20, 50).
+        spread (float, optional): Spread of the orientation map in radians. Defaults to 0.2.
+        progress (callable, optional): Called with a line for every finished row.
+
+    Returns:
+        list(dict): One row per image, draw type and num_lines_to_check with time and
+        mse of both samplings, and the number of uniform candidates reaching the
+        mse of the guided ones, interpolated and clamped to the checked values.
+    """
+    rows = []
+    progress('{:<28} {:>6} {:>10} {:>10} {:>9} {:>9} {:>11}'.format(
+        'case', 'check', 'mse', 'mse_guided', 'time', 'time_guid', 'same_mse_at'))
+    for (image_name, target) in input_images((width,)):
+        for draw_type in DrawType:
+            image_rows = []
+            for num_lines_to_check in checks:
+                row = {'case': '{}/{}'.format(image_name, draw_type.name.lower()),
+                       'num_lines_to_check': num_lines_to_check}
+                for (key, guided) in (('', False), ('_guided', True)):
+                    start = time.perf_counter()
+                    np.random.seed(42)
+                    residual = target.copy()
+                    orientation_map = None
+                    if guided:
+                        orientation_map = OrientationMap(
+                            target, spread, draw_type == DrawType.ADDITIVE)
+                    compute_image_lines(residual, num_lines, num_lines_to_check, draw_type,
+                                        orientation_map=orientation_map)
+                    row['time' + key] = time.perf_counter() - start
+                    row['mse' + key] = residual_error(target, residual, draw_type)
+                image_rows.append(row)
+
+            # Best uniform error reached with up to this many candidates, negated to rise.
+            uniform_curve = -np.minimum.accumulate([row['mse'] for row in image_rows])
+            for row in image_rows:
+                row['same_mse_at'] = float(np.interp(-row['mse_guided'], uniform_curve, checks))
+                progress('{:<28} {:>6} {:>10.1f} {:>10.1f} {:>8.2f}s {:>8.2f}s {:>11.1f}'.format(
+                    row['case'], row['num_lines_to_check'], row['mse'], row['mse_guided'],
+                    row['time'], row['time_guided'], row['same_mse_at']))
+            rows += image_rows
+    return rows
+
+
+def compare_results(baseline, current, threshold=0.2, quality_threshold=0.02):
+    """Compares benchmark results with a baseline.
+
+    Args:
+        baseline (dict): Results of the baseline.
+        current (dict): Results to check.
+        threshold (float, optional): Allowed relative slowdown. Defaults to 0.2.
+        quality_threshold (float, optional): Allowed relative increase of the
+            residual mse. Defaults to 0.02.
+
+    Returns:
+        list(dict): One row per case found in both results with the ratios and
+        a list of regressions.
+    """
+    rows = []
+    for case in sorted(set(baseline) & set(current)):
+        row = {
+            'case': case,
+            'time_ratio': current[case]['time'] / max(baseline[case]['time'], 1e-12),
+            'regressions': [],
+        }
+        if row['time_ratio'] > 1.0 + threshold:
+            row['regressions'].append('time')
+
+        if 'mse' in baseline[case] and 'mse' in current[case]:
+            row['mse_ratio'] = current[case]['mse'] / max(baseline[case]['mse'], 1e-12)
+            if row['mse_ratio'] > 1.0 + quality_threshold:
+                row['regressions'].append('quality')
+        rows.append(row)
+    return rows
+
+
+def print_comparison(rows):
+    print('{:<68} {:>8} {:>8}  {}'.format('case', 'time', 'mse', 'regression'))
+    for row in rows:
+        mse_ratio = '{:.2f}x'.format(row['mse_ratio']) if 'mse_ratio' in row else '-'
+        print('{:<68} {:>7.2f}x {:>8}  {}'.format(
+            row['case'], row['time_ratio'], mse_ratio, ', '.join(row['regressions'])))
+
+
+def benchmark_metadata(matrix, repeat):
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'matrix': matrix,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save_results(path, results, metadata):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'metadata': metadata, 'results': results}, file, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def main(args):
+    if args.command == 'run':
+        results = run_benchmarks(args.matrix, args.repeat)
+        save_results(args.output_path, results, benchmark_metadata(args.matrix, args.repeat))
+        print('Write results to {}'.format(args.output_path))
+        return
+
+    if args.command == 'angles':
+        rows = run_angle_sampling_benchmark(args.width, args.num_lines, tuple(args.checks), args.spread)
+        if args.output_path:
+            save_results(args.output_path, rows, {'width': args.width, 'num_lines': args.num_lines,
+                                                  'spread': args.spread})
+            print('Write results to {}'.format(args.output_path))
+        return
+
+    baseline = load_results(args.baseline_path)
+    if args.current_path:
+        current = load_results(args.current_path)['results']
+    else:
+        metadata = baseline['metadata']
+        current = run_benchmarks(metadata['matrix'], metadata['repeat'])
+
+    rows = compare_results(baseline['results'], current, args.threshold, args.quality_threshold)
+    print_comparison(rows)
+
+    num_regressions = sum(bool(row['regressions']) for row in rows)
+    if num_regressions:
+        print('{} of {} cases regressed.'.format(num_regressions, len(rows)))
+        sys.exit(1)
+    print('No regressions in {} cases.'.format(len(rows)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='line_drawer benchmarks - Times the hot paths.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run benchmarks and save results as JSON.')
+    run_parser.add_argument('--output-path', type=str, default='bench/results.json',
+                            help='Path of the JSON results.')
+    run_parser.add_argument('--matrix', type=str, default='default', choices=sorted(MATRICES),
+                            help='Image sizes, num_lines and num_lines_to_check to run.')
+    run_parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per case, the fastest counts.')
+
+    angles_parser = subparsers.add_parser(
+        'angles', help='Compare residual error versus candidates checked for uniform and orientation guided angles.')
+    angles_parser.add_argument('--width', type=int, default=256,
+                               help='Image width.')
+    angles_parser.add_argument('--num-lines', type=int, default=2000,
+                               help='Number of lines per run.')
+    angles_parser.add_argument('--checks', type=int, nargs='+', default=[2, 5, 10, 20, 50],
+                               help='Values of num_lines_to_check, ascending.')
+    angles_parser.add_argument('--spread', type=float, default=0.2,
+                               help='Spread of the guided angles in radians.')
+    angles_parser.add_argument('--output-path', type=str, default='',
+                               help='Also write the rows as JSON to this path.')
+
+    compare_parser = subparsers.add_parser(
+        'compare', help='Compare results with a baseline and exit with 1 on regressions.')
+    compare_parser.add_argument('baseline_path', type=str,
+                                help='JSON baseline written by run.')
+    compare_parser.add_argument('current_path', type=str, nargs='?', default='',
+                                help='JSON results to check. Runs the benchmarks of the baseline if omitted.')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help='Allowed relative slowdown per case.')
+    compare_parser.add_argument('--quality-threshold', type=float, default=0.02,
+                                help='Allowed relative increase of the residual mse per case.')
+
+    main(parser.parse_args())
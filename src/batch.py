@@ -0,0 +1,254 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from line_drawer import LOGO, build_arg_parser, draw_image
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+MANIFEST_EXTENSIONS = ('.txt', '.lst')
+SUMMARY_FIELDS = ('input_path', 'output_path', 'time', 'lines', 'residual_error', 'error')
+
+# Options of line_drawer naming a single input or output file. Parallel jobs would
+# all share them, so they are rejected. Outputs are written to --output-dir.
+PER_IMAGE_OPTIONS = ('input_path', 'output_path', 'lines_path', 'metrics_out', 'checkpoint_path',
+                     'resume', 'preview_path', 'pin_sequence_path')
+
+
+def collect_input_paths(inputs):
+    """Expands directories, glob patterns and manifest files to image paths.
+
+    Args:
+        inputs (list(str)): Directories, glob patterns or manifest files with one
+            image path per line.
+
+    Returns:
+        list(str): Image paths in input order.
+    """
+    input_paths = []
+    for input_ in inputs:
+        if os.path.isdir(input_):
+            input_paths += sorted(
+                os.path.join(input_, name) for name in os.listdir(input_)
+                if name.lower().endswith(IMAGE_EXTENSIONS))
+        elif os.path.isfile(input_) and input_.lower().endswith(MANIFEST_EXTENSIONS):
+            with open(input_, encoding='utf-8') as manifest:
+                for row in manifest:
+                    row = row.strip()
+                    if row and not row.startswith('#'):
+                        input_paths.append(row)
+        elif os.path.isfile(input_):
+            input_paths.append(input_)
+        else:
+            input_paths += sorted(glob.glob(input_))
+    return input_paths
+
+
+def output_path_for(input_path, output_dir, output_format):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, '{}.{}'.format(stem, output_format.lower()))
+
+
+def output_paths_for(input_paths, output_dir, output_format):
+    """Output paths of all inputs, with a numbered suffix for inputs sharing a file stem.
+
+    Args:
+        input_paths (list(str)): Image paths.
+        output_dir (str): Output directory.
+        output_format (str): Output format, also used as file extension.
+
+    Returns:
+        list(str): Output path per input path.
+    """
+    output_paths = []
+    used = set()
+    for input_path in input_paths:
+        output_path = output_path_for(input_path, output_dir, output_format)
+        (base, extension) = os.path.splitext(output_path)
+        suffix = 1
+        while output_path in used:
+            suffix += 1
+            output_path = '{}_{}{}'.format(base, suffix, extension)
+        if suffix > 1:
+            print('Warning: {} has the same name as an earlier input, write it to {}'.format(
+                input_path, output_path))
+        used.add(output_path)
+        output_paths.append(output_path)
+    return output_paths
+
+
+def per_image_options(args):
+    """Finds options of PER_IMAGE_OPTIONS which are not at their default.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments.
+
+    Returns:
+        list(str): Command line flags of the options.
+    """
+    actions = build_arg_parser()._actions  # pylint: disable=protected-access
+    return [action.option_strings[0] for action in actions
+            if action.dest in PER_IMAGE_OPTIONS and getattr(args, action.dest) != action.default]
+
+
+def _init_worker():
+    # Progress bars and prints of parallel jobs would only garble the output.
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    sys.stderr = sys.stdout
+
+
+def _run_job(job_args):
+    """Draws one image and reports failures instead of raising them."""
+    try:
+        return draw_image(job_args)
+    except Exception as error:  # pylint: disable=broad-except
+        return {
+            'input_path': job_args.input_path,
+            'output_path': job_args.output_path,
+            'error': '{}: {}'.format(type(error).__name__, error),
+        }
+
+
+def _crash_summary(job_args):
+    return {
+        'input_path': job_args.input_path,
+        'output_path': job_args.output_path,
+        'error': 'BrokenProcessPool: worker process terminated abruptly',
+    }
+
+
+def _run_pool(jobs, num_workers, on_done):
+    """Runs jobs on a new process pool.
+
+    Args:
+        jobs (dict): Job arguments by input index.
+        num_workers (int): Number of worker processes.
+        on_done (callable): Called with input index and summary of every finished job.
+
+    Returns:
+        list(int): Input indexes of jobs lost because a worker process died.
+    """
+    broken = []
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(_run_job, job_args): i for (i, job_args) in jobs.items()}
+        for future in as_completed(futures):
+            try:
+                on_done(futures[future], future.result())
+            except BrokenProcessPool:
+                broken.append(futures[future])
+    return sorted(broken)
+
+
+def run_batch(args, input_paths):
+    """Draws all images on a process pool and writes outputs as jobs finish.
+
+    A worker process dying kills all jobs running on the pool. These jobs are
+    run again one by one in a pool of their own, so only the image which
+    crashes the worker fails.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments shared by all jobs.
+        input_paths (list(str)): Image paths.
+
+    Returns:
+        list(dict): Summaries of all jobs in input order.
+
+    Raises:
+        ValueError: If args set options of PER_IMAGE_OPTIONS.
+    """
+    if per_image_options(args):
+        raise ValueError('not supported in batch mode: {}'.format(' '.join(per_image_options(args))))
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = {}
+    output_paths = output_paths_for(input_paths, args.output_dir, args.output_format)
+    for i, (input_path, output_path) in enumerate(zip(input_paths, output_paths)):
+        job_args = argparse.Namespace(**vars(args))
+        job_args.input_path = input_path
+        job_args.output_path = output_path
+        jobs[i] = job_args
+
+    summaries = {}
+
+    def on_done(i, summary):
+        summaries[i] = summary
+        num_done = len(summaries)
+        if 'error' in summary:
+            print('[{}/{}] FAILED {}: {}'.format(
+                num_done, len(input_paths), summary['input_path'], summary['error']))
+        else:
+            print('[{}/{}] {} -> {}'.format(
+                num_done, len(input_paths), summary['input_path'], summary['output_path']))
+
+    broken = _run_pool(jobs, args.jobs, on_done)
+    if broken:
+        print('A worker process died, run {} unfinished images again one by one.'.format(len(broken)))
+    for i in broken:
+        if _run_pool({i: jobs[i]}, 1, on_done):
+            on_done(i, _crash_summary(jobs[i]))
+
+    return [summaries[i] for i in range(len(input_paths))]
+
+
+def print_summary(summaries):
+    print("\n----------------------------------------------\n")
+    print("-- Summary --")
+    print('{:>8} {:>8} {:>10}  {}'.format('time[s]', 'lines', 'residual', 'input_path'))
+    for summary in summaries:
+        if 'error' in summary:
+            print('{:>8} {:>8} {:>10}  {} ({})'.format(
+                '-', '-', '-', summary['input_path'], summary['error']))
+        else:
+            print('{:>8.2f} {:>8} {:>10.1f}  {}'.format(
+                summary['time'], summary['lines'], summary['residual_error'], summary['input_path']))
+    print("\n----------------------------------------------\n")
+
+
+def write_summary_csv(summaries, summary_path):
+    with open(summary_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for summary in summaries:
+            writer.writerow(summary)
+
+
+def main(args):
+    print(LOGO)
+
+    input_paths = collect_input_paths(args.inputs)
+    print('Found {} images, running {} jobs in parallel.'.format(len(input_paths), args.jobs))
+
+    summaries = run_batch(args, input_paths)
+    print_summary(summaries)
+
+    if args.summary_path:
+        print('Write summary to {}'.format(args.summary_path))
+        write_summary_csv(summaries, args.summary_path)
+
+    num_failed = sum('error' in summary for summary in summaries)
+    if num_failed:
+        print('{} of {} images failed.'.format(num_failed, len(summaries)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = build_arg_parser()
+    parser.description = 'line_drawer batch - Redraws many images on a process pool.'
+
+    parser.add_argument('inputs', nargs='+',
+                        help='Input directories, glob patterns or manifest files (.txt/.lst) with one image path per line.')
+    parser.add_argument('--output-dir', type=str, required=True,
+                        help='Directory where output images are written.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='Number of images processed in parallel.')
+    parser.add_argument('--summary-path', type=str, default='',
+                        help='Write per-image summary as CSV to this path.')
+
+    args = parser.parse_args()
+    if per_image_options(args):
+        parser.error('not supported in batch mode: {}'.format(' '.join(per_image_options(args))))
+
+    main(args)
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+from line_file import lines_from_array, lines_to_array
+
+
+def save_checkpoint(path, residual, lines, line_ids, config):
+    """Saves residual image, lines so far and numpy's random state.
+
+    The file is written next to path first and then moved into place, so an
+    interruption never leaves a broken checkpoint behind.
+
+    Args:
+        path (str): Checkpoint path (.npz).
+        residual (np.array): Image with all lines accumulated.
+        lines (list): List of point pairs found so far.
+        line_ids (list): Line table ids of the lines. Empty if no line table is used.
+        config (dict): Settings which need to match when resuming.
+    """
+    (name, key, pos, has_gauss, cached_gaussian) = np.random.get_state()
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        np.savez(file,
+                 residual=np.asarray(residual),
+                 lines=lines_to_array(lines),
+                 line_ids=np.array(line_ids, dtype=np.int64),
+                 rng_name=np.array(name),
+                 rng_key=key,
+                 rng_pos=np.array(pos),
+                 rng_has_gauss=np.array(has_gauss),
+                 rng_cached_gaussian=np.array(cached_gaussian),
+                 config_keys=np.array(sorted(config)),
+                 config_values=np.array([str(config[k]) for k in sorted(config)]))
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path, config):
+    """Loads a checkpoint and restores numpy's random state.
+
+    Args:
+        path (str): Checkpoint path (.npz).
+        config (dict): Current settings, which need to match the saved ones.
+
+    Returns:
+        (np.array, list, list): Residual image, lines and line table ids.
+    """
+    with np.load(path) as checkpoint:
+        saved_config = dict(zip(checkpoint['config_keys'].tolist(),
+                                checkpoint['config_values'].tolist()))
+        current_config = {k: str(v) for k, v in config.items()}
+        if saved_config != current_config:
+            raise ValueError('Checkpoint {} was written with other settings: {}'.format(
+                path, saved_config))
+
+        np.random.set_state((
+            str(checkpoint['rng_name']), checkpoint['rng_key'], int(checkpoint['rng_pos']),
+            int(checkpoint['rng_has_gauss']), float(checkpoint['rng_cached_gaussian'])))
+
+        return (checkpoint['residual'], lines_from_array(checkpoint['lines']),
+                checkpoint['line_ids'].tolist())
@@ -0,0 +1,198 @@
+import numpy as np
+
+# Histogram offset to map all int16 values to non negative bins.
+VALUE_OFFSET = 32768
+NUM_VALUES = 65536
+
+# Number of pixels scanned at once, so memory-mapped images are never fully loaded.
+SCAN_CHUNK_SIZE = 1 << 22
+
+# Candidate pool of sample_extreme_pixels() relative to the requested number of pixels.
+POOL_MARGIN = 4
+
+# Picked pixels in a row without any candidate line inside the image, e.g. in a
+# corner, after which the line search gives up.
+MAX_FAILED_PICKS = 100
+
+
+class ExtremumIndex:
+    """
+    Index of the darkest or brightest pixels of an int16 image.
+
+    Keeps a histogram of all pixel values and the sorted flat indexes of the
+    pixels holding the current extreme value. Lines are accumulated through the
+    index, so only the pixels touched by a line need to be looked at. The full
+    image is only scanned again when the extreme value itself changes.
+    """
+
+    def __init__(self, image, search_max):
+        """
+        Args:
+            image (np.array): C-contiguous int16 image. Will be modified by accumulate().
+            search_max (bool): Index brightest pixels if set, otherwise darkest pixels.
+        """
+        if not image.flags.c_contiguous:
+            raise ValueError('ExtremumIndex needs a C-contiguous image.')
+
+        self.image = image
+        self.search_max = search_max
+        self._flat_image = image.reshape(-1)
+        self._histogram = np.zeros(NUM_VALUES, dtype=np.int64)
+        for start in range(0, self._flat_image.shape[0], SCAN_CHUNK_SIZE):
+            chunk = self._flat_image[start:start + SCAN_CHUNK_SIZE]
+            self._histogram += np.bincount(chunk.astype(np.int64) + VALUE_OFFSET, minlength=NUM_VALUES)
+        self.value = None
+        self._members = None
+        # Superset of the pixels up to _pool_threshold, see sample_extreme_pixels().
+        self._pool = None
+        self._pool_threshold = None
+
+    def _refresh(self):
+        """Finds the extreme value in the histogram and collects its pixels."""
+        values = np.flatnonzero(self._histogram)
+        if self.search_max:
+            self.value = values[-1] - VALUE_OFFSET
+        else:
+            self.value = values[0] - VALUE_OFFSET
+
+        self._members = np.concatenate([
+            start + np.flatnonzero(self._flat_image[start:start + SCAN_CHUNK_SIZE] == self.value)
+            for start in range(0, self._flat_image.shape[0], SCAN_CHUNK_SIZE)])
+
+    def target_pixels(self):
+        """Returns flat indexes of all pixels with the extreme value in row-major order.
+
+        Returns:
+            np.array: Sorted flat indexes.
+        """
+        if self._members is None:
+            self._refresh()
+        return self._members
+
+    def extreme_pixels(self, min_count):
+        """Returns flat indexes of the most extreme pixels, at least min_count of them.
+
+        All pixels of the values needed to reach min_count are returned, so
+        there can be more than min_count pixels.
+
+        Args:
+            min_count (int): Minimal number of pixels.
+
+        Returns:
+            np.array: Sorted flat indexes.
+        """
+        threshold = self._threshold(min_count)
+        return np.concatenate([
+            start + np.flatnonzero(self._within(self._flat_image[start:start + SCAN_CHUNK_SIZE], threshold))
+            for start in range(0, self._flat_image.shape[0], SCAN_CHUNK_SIZE)])
+
+    def _threshold(self, min_count):
+        """Least extreme value needed to get min_count of the most extreme pixels."""
+        if self.search_max:
+            counts = np.cumsum(self._histogram[::-1])
+            threshold = NUM_VALUES - 1 - np.searchsorted(counts, min(min_count, counts[-1]))
+        else:
+            counts = np.cumsum(self._histogram)
+            threshold = np.searchsorted(counts, min(min_count, counts[-1]))
+        return int(threshold) - VALUE_OFFSET
+
+    def _within(self, values, threshold):
+        """True for values at least as extreme as threshold."""
+        if self.search_max:
+            return values >= threshold
+        return values <= threshold
+
+    def _count_within(self, threshold):
+        if self.search_max:
+            return int(np.sum(self._histogram[threshold + VALUE_OFFSET:]))
+        return int(np.sum(self._histogram[:threshold + VALUE_OFFSET + 1]))
+
+    def sample_extreme_pixels(self, min_count, num_samples):
+        """Draws distinct pixels uniformly at random from extreme_pixels(min_count).
+
+        Keeps a pool of candidates with up to POOL_MARGIN times more pixels.
+        Lines only move pixels out of the pool, so the pool is only filtered
+        again once most of it is outdated, and the full image is only scanned
+        again once the pool runs out of extreme pixels.
+
+        Args:
+            min_count (int): Minimal number of pixels, see extreme_pixels().
+            num_samples (int): Number of pixels to draw.
+
+        Returns:
+            np.array: Up to num_samples distinct flat indexes in random order.
+        """
+        threshold = self._threshold(min_count)
+        num_valid = self._count_within(threshold)
+        if self._pool is None or not self._within(threshold, self._pool_threshold) or \
+                num_valid * POOL_MARGIN < self._pool.shape[0]:
+            pool_threshold = self._threshold(min_count * POOL_MARGIN)
+            if self._pool is not None and self._within(pool_threshold, self._pool_threshold):
+                self._pool = self._pool[self._within(self._flat_image[self._pool], pool_threshold)]
+            else:
+                self._pool = self.extreme_pixels(min_count * POOL_MARGIN)
+            self._pool_threshold = pool_threshold
+
+        if self._pool.shape[0] <= 2 * POOL_MARGIN * num_samples:
+            pixels = self._pool[self._within(self._flat_image[self._pool], threshold)]
+            return pixels[np.random.permutation(pixels.shape[0])[:num_samples]]
+
+        # At least every POOL_MARGIN-th pool pixel is valid, draw enough to find num_samples.
+        pixels = self._pool[np.random.randint(0, self._pool.shape[0], 2 * POOL_MARGIN * num_samples)]
+        pixels = pixels[self._within(self._flat_image[pixels], threshold)]
+        _, first = np.unique(pixels, return_index=True)
+        return pixels[np.sort(first)][:num_samples]
+
+    def pick_random(self):
+        """Picks randomly one of the darkest or brightest pixels.
+
+        Draws from the same random stream and in the same order as
+        np.where(image == value), so results stay reproducible.
+
+        Returns:
+            (int, int): Row and column of the selected pixel.
+        """
+        members = self.target_pixels()
+        random_index = np.random.randint(0, members.shape[0])
+        return divmod(members[random_index], self.image.shape[1])
+
+    def accumulate(self, yy, xx, delta):
+        """Adds delta to the image at the given pixels and updates the index.
+
+        Args:
+            yy (np.array): Rows of unique pixels.
+            xx (np.array): Columns of unique pixels.
+            delta (int): Value to add.
+        """
+        flat_indexes = yy * self.image.shape[1] + xx
+        old_values = self._flat_image[flat_indexes]
+        new_values = old_values + delta
+        self._flat_image[flat_indexes] = new_values
+
+        np.subtract.at(self._histogram, old_values.astype(np.int64) + VALUE_OFFSET, 1)
+        np.add.at(self._histogram, new_values.astype(np.int64) + VALUE_OFFSET, 1)
+
+        if self._pool is not None and np.any(
+                self._within(new_values, self._pool_threshold) & ~self._within(old_values, self._pool_threshold)):
+            # Pixels entered the pool range, let next lookup rebuild the pool.
+            self._pool = None
+
+        if self._members is None:
+            return
+
+        if self.search_max:
+            reaches_extreme = np.any(new_values >= self.value)
+        else:
+            reaches_extreme = np.any(new_values <= self.value)
+
+        if reaches_extreme:
+            # New or more extreme pixels, let next lookup rebuild the index.
+            self._members = None
+            return
+
+        leaving = np.sort(flat_indexes[old_values == self.value])
+        if leaving.shape[0]:
+            self._members = np.delete(
+                self._members, np.searchsorted(self._members, leaving))
+            if self._members.shape[0] == 0:
+                self._members = None
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 import math
 
+import numpy as np
+
 # Example how to disable linter features
 # pylint: disable=R0902
 
@@ -53,6 +55,73 @@ class PointInt(Point):
     y: int
 
 
+class Points:
+    """
+    Many points backed by a (N, 2) float array of x and y coordinates.
+
+    Array counterpart of Point for batched geometry, where creating one Point
+    object per element would dominate the runtime.
+    """
+
+    def __init__(self, xy):
+        """
+        Args:
+            xy (np.array): Coordinates with shape (N, 2) or a single (2,) pair.
+        """
+        self.xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+
+    @classmethod
+    def from_points(cls, points):
+        """Creates points from a list of Point objects."""
+        return cls([point.as_tuple() for point in points])
+
+    @property
+    def x(self):
+        return self.xy[:, 0]
+
+    @property
+    def y(self):
+        return self.xy[:, 1]
+
+    def __len__(self):
+        return self.xy.shape[0]
+
+    def __getitem__(self, index):
+        return Point(float(self.xy[index, 0]), float(self.xy[index, 1]))
+
+    def __add__(self, other):
+        """Adds points element wise like a vector addition.
+
+        Args:
+            other (Points): Points to add. A single point is added to all points.
+
+        Returns:
+            Points: summation of the points
+        """
+        return Points(self.xy + other.xy)
+
+    def equals(self, other, tol=TOL_DIST):
+        """Element wise version of Point.equals.
+
+        Args:
+            other (Points): Other points. A single point is compared with all points.
+            tol (float, optional): Absolute tolerance. Defaults to TOL_DIST.
+
+        Returns:
+            np.array: Mask of points at the same position.
+        """
+        return _isclose(self.x, other.x, tol) & _isclose(self.y, other.y, tol)
+
+    def as_points(self):
+        """Returns points as a list of Point objects."""
+        return [Point(float(x), float(y)) for (x, y) in self.xy]
+
+
+def _isclose(a, b, tol):
+    """Element wise version of math.isclose with default relative tolerance."""
+    return np.abs(a - b) <= np.maximum(1e-09 * np.maximum(np.abs(a), np.abs(b)), tol)
+
+
 class LineSegment:
     """
     A geometric line segment defined by two points.
@@ -253,3 +322,56 @@ class Rectangle():
                     cleaned_intersections.append(intersection)
 
         return cleaned_intersections
+
+    def intersect_lines(self, points, directions):
+        """Clips many lines defined by point and direction against the rectangle at once.
+
+        Batched counterpart of intersection_with_line() with the same tolerances,
+        so the endpoints are the same as when every line is clipped on its own.
+
+        Args:
+            points (Points): Point on each line. A single point is used for all lines.
+            directions (Points): Direction of each line.
+
+        Returns:
+            (np.array, np.array): Endpoints with shape (N, 2, 2) and mask of lines
+            with exactly two intersection points. Endpoints of other lines are undefined.
+        """
+        (point_xy, direction_xy) = np.broadcast_arrays(points.xy, directions.xy)
+        x_3 = point_xy[:, 0]
+        y_3 = point_xy[:, 1]
+        x_4 = x_3 + direction_xy[:, 0]
+        y_4 = y_3 + direction_xy[:, 1]
+
+        num_lines = x_3.shape[0]
+        num_segments = len(self.line_segments)
+        intersections = np.zeros((num_lines, num_segments, 2))
+        found = np.zeros((num_lines, num_segments), dtype=bool)
+
+        for k, line_segment in enumerate(self.line_segments):
+            x_1, y_1 = line_segment.p_1.as_tuple()
+            x_2, y_2 = line_segment.p_2.as_tuple()
+
+            den = (x_1-x_2)*(y_3-y_4) - (y_1-y_2)*(x_3-x_4)
+            # Is line parallel or coincindent?
+            not_parallel = np.abs(den) > TOL_ZERO_DIV
+            den = np.where(not_parallel, den, 1.0)
+
+            t = ((x_1-x_3)*(y_3-y_4) - (y_1-y_3)*(x_3-x_4)) / den
+
+            intersections[:, k, 0] = x_1 + t * (x_2 - x_1)
+            intersections[:, k, 1] = y_1 + t * (y_2 - y_1)
+            found[:, k] = not_parallel & (0.0 <= t) & (t <= 1.0)
+
+        # Clean twin points at edges.
+        unique = found.copy()
+        for k in range(1, num_segments):
+            for j in range(k):
+                unique[:, k] &= ~(unique[:, j] & Points(intersections[:, k]).equals(
+                    Points(intersections[:, j])))
+
+        valid = np.count_nonzero(unique, axis=1) == 2
+        first_two = np.argsort(~unique, axis=1, kind='stable')[:, :2]
+        endpoints = np.take_along_axis(intersections, first_two[:, :, np.newaxis], axis=1)
+
+        return endpoints, valid
@@ -0,0 +1,320 @@
+import numpy as np
+
+from extremum import MAX_FAILED_PICKS, VALUE_OFFSET
+from geometry import TOL_DIST, TOL_ZERO_DIV, PointInt
+from raster import line
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+AVAILABLE = numba is not None
+
+
+def _jit(function):
+    """Compiles function in nopython mode if Numba is installed."""
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+@_jit
+def _isclose(a, b):
+    """Scalar version of geometry._isclose() with tolerance TOL_DIST."""
+    return abs(a - b) <= max(1e-09 * max(abs(a), abs(b)), TOL_DIST)
+
+
+@_jit
+def _refresh_members(flat_image, histogram, search_max):
+    """Finds the extreme value in the histogram and collects its pixels in row-major order."""
+    if search_max:
+        bin_ = histogram.shape[0] - 1
+        while histogram[bin_] == 0:
+            bin_ -= 1
+    else:
+        bin_ = 0
+        while histogram[bin_] == 0:
+            bin_ += 1
+    value = bin_ - VALUE_OFFSET
+
+    members = np.empty(histogram[bin_], dtype=np.int64)
+    num_members = 0
+    for index in range(flat_image.shape[0]):
+        if flat_image[index] == value:
+            members[num_members] = index
+            num_members += 1
+    return value, members
+
+
+@_jit
+def _clip_line(x_3, y_3, direction_x, direction_y, borders, endpoint):
+    """Clips one line through a point against the image border.
+
+    Same arithmetic and tolerances as Rectangle.intersect_lines(), so both
+    give bit identical endpoints. Writes the truncated endpoints in image
+    coordinates as x1, y1, x2, y2 to endpoint.
+
+    Returns:
+        bool: True if the line has exactly two intersection points.
+    """
+    x_4 = x_3 + direction_x
+    y_4 = y_3 + direction_y
+    intersections = np.empty((4, 2))
+    unique = np.zeros(4, dtype=np.bool_)
+
+    for k in range(4):
+        (x_1, y_1, x_2, y_2) = (borders[k, 0], borders[k, 1], borders[k, 2], borders[k, 3])
+        den = (x_1-x_2)*(y_3-y_4) - (y_1-y_2)*(x_3-x_4)
+        not_parallel = abs(den) > TOL_ZERO_DIV
+        if not not_parallel:
+            den = 1.0
+        t = ((x_1-x_3)*(y_3-y_4) - (y_1-y_3)*(x_3-x_4)) / den
+
+        intersections[k, 0] = x_1 + t * (x_2 - x_1)
+        intersections[k, 1] = y_1 + t * (y_2 - y_1)
+        unique[k] = not_parallel and 0.0 <= t and t <= 1.0
+
+    # Clean twin points at edges.
+    for k in range(1, 4):
+        for j in range(k):
+            if unique[j] and _isclose(intersections[k, 0], intersections[j, 0]) and \
+                    _isclose(intersections[k, 1], intersections[j, 1]):
+                unique[k] = False
+
+    num_found = 0
+    for k in range(4):
+        if unique[k]:
+            if num_found < 2:
+                # Remap y-coordinate because y-axis direction is opposite in numpy arrays.
+                endpoint[2 * num_found] = int(intersections[k, 0])
+                endpoint[2 * num_found + 1] = int(-intersections[k, 1])
+            num_found += 1
+    return num_found == 2
+
+
+@_jit
+def _mean_line_intensity(flat_image, width, endpoint):
+    """Walks a line like raster.line() and returns the mean of its pixels."""
+    (c_0, r_0, c_1, r_1) = (endpoint[0], endpoint[1], endpoint[2], endpoint[3])
+    step_r = 1 if r_1 > r_0 else -1
+    step_c = 1 if c_1 > c_0 else -1
+    d_r = abs(r_1 - r_0)
+    d_c = abs(c_1 - c_0)
+
+    line_sum = 0.0
+    if d_r > d_c:
+        for i in range(d_r + 1):
+            minor_steps = (2 * d_c * i + d_r) // (2 * d_r)
+            line_sum += flat_image[(r_0 + step_r * i) * width + c_0 + step_c * minor_steps]
+        return line_sum / (d_r + 1)
+
+    for i in range(d_c + 1):
+        minor_steps = (2 * d_r * i + d_c) // (2 * max(d_c, 1))
+        line_sum += flat_image[(r_0 + step_r * minor_steps) * width + c_0 + step_c * i]
+    return line_sum / (d_c + 1)
+
+
+@_jit
+def _accumulate_pixel(flat_image, histogram, index, delta, value, search_max):
+    """Adds delta to one pixel and returns True if it reaches the extreme value."""
+    old_value = int(flat_image[index])
+    new_value = old_value + delta
+    flat_image[index] = new_value
+    histogram[old_value + VALUE_OFFSET] -= 1
+    histogram[new_value + VALUE_OFFSET] += 1
+    if search_max:
+        return new_value >= value
+    return new_value <= value
+
+
+@_jit
+def _draw_line(flat_image, width, histogram, members, value, search_max, delta, member_index,
+               direction_xs, direction_ys, borders, endpoint):
+    """Finds the best line through one of the extreme pixels and accumulates it.
+
+    Returns:
+        (int, int, int): Number of valid candidates, number of accumulated pixels
+        and number of pixels left in members, which is -1 if members has to be
+        collected again.
+    """
+    index = members[member_index]
+    x_3 = float(index % width)
+    y_3 = float(-(index // width))
+
+    candidate = np.empty(4, dtype=np.int64)
+    best_intensity = 0.0
+    num_valid = 0
+    for k in range(direction_xs.shape[0]):
+        if not _clip_line(x_3, y_3, direction_xs[k], direction_ys[k], borders, candidate):
+            continue
+        intensity = _mean_line_intensity(flat_image, width, candidate)
+        if num_valid == 0 or (search_max and intensity > best_intensity) or \
+                (not search_max and intensity < best_intensity):
+            best_intensity = intensity
+            endpoint[:] = candidate
+        num_valid += 1
+
+    if num_valid == 0:
+        # Nothing is drawn, the caller picks another pixel.
+        return 0, 0, members.shape[0]
+
+    reaches_extreme = False
+    (c_0, r_0, c_1, r_1) = (endpoint[0], endpoint[1], endpoint[2], endpoint[3])
+    step_r = 1 if r_1 > r_0 else -1
+    step_c = 1 if c_1 > c_0 else -1
+    d_r = abs(r_1 - r_0)
+    d_c = abs(c_1 - c_0)
+    num_pixels = max(d_r, d_c) + 1
+    for i in range(num_pixels):
+        if d_r > d_c:
+            (r, c) = (r_0 + step_r * i, c_0 + step_c * ((2 * d_c * i + d_r) // (2 * d_r)))
+        else:
+            (r, c) = (r_0 + step_r * ((2 * d_r * i + d_c) // (2 * max(d_c, 1))), c_0 + step_c * i)
+        if _accumulate_pixel(flat_image, histogram, r * width + c, delta, value, search_max):
+            reaches_extreme = True
+
+    if reaches_extreme:
+        return num_valid, num_pixels, -1
+
+    # Pixels of the line left the extreme value.
+    num_members = 0
+    for k in range(members.shape[0]):
+        if flat_image[members[k]] == value:
+            members[num_members] = members[k]
+            num_members += 1
+    return num_valid, num_pixels, num_members if num_members > 0 else -1
+
+
+class JitLineSearch:
+    """
+    Nopython version of the RANDOM engine iteration working on an int16 image.
+
+    Keeps the extreme pixels like ExtremumIndex and picks, scores and
+    accumulates lines in compiled loops. Random numbers are still drawn from
+    numpy's global random state in the same order as the pure Python engine,
+    so both engines find the same lines.
+    """
+
+    def __init__(self, image, search_max, delta):
+        """
+        Args:
+            image (np.array): C-contiguous int16 image. Gets the lines accumulated.
+            search_max (bool): Search brightest pixels if set, otherwise darkest pixels.
+            delta (int): Value added to the pixels of every line.
+        """
+        if not image.flags.c_contiguous:
+            raise ValueError('JitLineSearch needs a C-contiguous image.')
+
+        (self.height, self.width) = image.shape
+        self.search_max = search_max
+        self.delta = delta
+        self._flat_image = image.reshape(-1)
+        self._histogram = np.bincount(
+            self._flat_image.astype(np.int64) + VALUE_OFFSET, minlength=2 * VALUE_OFFSET)
+        self._value = 0
+        self._members = None
+        self._endpoint = np.zeros(4, dtype=np.int64)
+
+        # Borders of the image in the coordinate system of the geometry library, in
+        # the order and with the arithmetic of Rectangle.
+        (x_0, y_0) = (0.0, - self.height + 1.0)
+        (x_1, y_1) = (x_0 + (self.width - 1.0), y_0 + (self.height - 1.0))
+        self._borders = np.array([
+            (x_0, y_0, x_1, y_0), (x_1, y_0, x_1, y_1), (x_1, y_1, x_0, y_1), (x_0, y_1, x_0, y_0)])
+
+    def num_extreme_pixels(self):
+        """Returns the number of pixels holding the darkest or brightest value."""
+        if self._members is None:
+            (self._value, self._members) = _refresh_members(
+                self._flat_image, self._histogram, self.search_max)
+        return self._members.shape[0]
+
+    def draw_line(self, member_index, angles):
+        """Finds the best of the lines with given angles through an extreme pixel and draws it.
+
+        Args:
+            member_index (int): Index of the pixel in the row-major list of extreme pixels.
+            angles (np.array): Angles of the candidate lines.
+
+        Returns:
+            ((PointInt,PointInt), int, int): Best line, number of valid candidates
+            and number of line pixels. The line is None and nothing is drawn if no
+            candidate line lies inside the image.
+        """
+        self.num_extreme_pixels()
+        (num_valid, num_pixels, num_members) = _draw_line(
+            self._flat_image, self.width, self._histogram, self._members, self._value,
+            self.search_max, self.delta, member_index, np.cos(angles), np.sin(angles),
+            self._borders, self._endpoint)
+        self._members = self._members[:num_members] if num_members >= 0 else None
+
+        if num_valid == 0:
+            return None, 0, 0
+        (x_1, y_1, x_2, y_2) = (int(v) for v in self._endpoint)
+        return (PointInt(x_1, y_1), PointInt(x_2, y_2)), num_valid, num_pixels
+
+
+def iter_jit_image_lines(image, num_lines, num_lines_to_check, search_max, line_heaviness,
+                         metrics=None, stopping=None):
+    """Yields the lines of the RANDOM engine computed with compiled loops.
+
+    Draws the same random numbers in the same order as the pure Python
+    engine, so results with a fixed seed match line for line.
+
+    Args:
+        image (np.array): Image as int16 numpy array. Gets the lines accumulated.
+        num_lines (int): Number of lines to draw.
+        num_lines_to_check (int): Number of tries to find best line.
+        search_max (bool): Search brightest lines if set, otherwise darkest lines.
+        line_heaviness (int): Line heaviness. Subtracted from the image if search_max is set.
+        metrics (Metrics, optional): Collects phase timings and counters. Defaults to None.
+        stopping (StoppingCriteria, optional): Stops early and adapts num_lines_to_check
+            to a time budget. Defaults to None.
+
+    Yields:
+        (PointInt,PointInt): Point pair of the next line.
+    """
+    from tqdm import tqdm
+
+    delta = -line_heaviness if search_max else line_heaviness
+    search = JitLineSearch(image, search_max, delta)
+    if metrics is not None:
+        metrics.lap('extremum_search')
+    if stopping is not None:
+        stopping.start(num_lines, num_lines_to_check)
+
+    for _ in tqdm(range(num_lines), desc='Calculating line: '):
+        if metrics is not None:
+            metrics.lap('caller')
+        if stopping is not None:
+            if stopping.should_stop():
+                break
+            num_lines_to_check = stopping.lines_to_check
+        if metrics is not None:
+            metrics.count('lines')
+            metrics.count('candidates', num_lines_to_check)
+
+        # Like the pure Python engine, pick another pixel while no candidate line
+        # lies inside the image.
+        for _ in range(MAX_FAILED_PICKS):
+            member_index = np.random.randint(0, search.num_extreme_pixels())
+            angles = (np.random.rand(num_lines_to_check) - 0.5) * np.pi
+            if metrics is not None:
+                metrics.lap('extremum_search')
+
+            best_line, num_valid, num_pixels = search.draw_line(member_index, angles)
+            if metrics is not None:
+                metrics.count('valid_candidates', num_valid)
+                metrics.count('line_pixels', num_pixels)
+                metrics.lap('scoring')
+            if best_line is not None:
+                break
+        if best_line is None:
+            break
+
+        if stopping is not None:
+            yy, xx = line(best_line[0].y, best_line[0].x, best_line[1].y, best_line[1].x)
+            stopping.line_accepted(yy, xx, image[yy, xx], delta)
+
+        yield best_line
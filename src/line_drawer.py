@@ -1,14 +1,31 @@
+import time
+
+# Cold start is measured from here, see --verbose.
+_IMPORT_START = time.perf_counter()
+
 import argparse
+import os
 import sys
-from enum import Enum
+import threading
 
 from PIL import Image
 import numpy as np
-from skimage.draw import line
-from tqdm import tqdm
-import drawsvg as draw
 
-from geometry import Point, Line, Rectangle
+from checkpoint import load_checkpoint, save_checkpoint
+from extremum import MAX_FAILED_PICKS, ExtremumIndex
+from geometry import Point, PointInt
+from line_file import lines_from_array, lines_to_array, load_lines, save_lines
+from metrics import Metrics
+from png_stream import PngStreamWriter
+from stopping import ResidualErrorTracker, StoppingCriteria, squared_errors
+from raster import line, line_flat_indexes, line_segments
+from scoring import (DrawType, find_best_line_through_point, find_best_lines_through_pixels,
+                     mean_line_intensities_through_point, score_lines_through_point)
+from svg_stream import SvgPathWriter
+
+# Seconds spent importing this module and its dependencies. tqdm, drawsvg and
+# the modules of the engines and search options are imported where they are needed.
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 LOGO = "\n\
    / /   (_)___  ___  / __ \_________ __      _____  _____\n\
@@ -17,53 +34,167 @@ LOGO = "\n\
 /_____/_/_/ /_/\___/_____/_/   \__,_/ |__/|__/\___/_/ "
 
 
-class DrawType(Enum):
-    ADDITIVE = 1
-    SUBTRACTIVE = 2
+# Number of lines rasterized at once when drawing line images.
+LINE_CHUNK_SIZE = 4096
+
+# Quantized angles of the RADON engine if --angle-resolution is not set.
+RADON_ANGLE_RESOLUTION = 180
+
+# Lines sharing a larger part of their pixels with a line accepted before in
+# the same round are skipped when drawing several lines per round.
+MAX_ROUND_OVERLAP = 0.1
+
+# Number of extreme pixels per line to pick the spread pixels of a round from.
+SPREAD_POOL_FACTOR = 8
 
+# Stroke colors of the lines of the red, green and blue channel with --color.
+# Subtractive lines act like inks on white paper and additive lines like lights.
+CHANNEL_COLORS = {
+    DrawType.SUBTRACTIVE: ('cyan', 'magenta', 'yellow'),
+    DrawType.ADDITIVE: ('red', 'lime', 'blue'),
+}
 
-def draw_line_image(lines, image_shape, draw_type, line_heaviness=10):
+# SVG blend modes mixing overlapping lines of different channels. Both are
+# commutative, so the drawing order of the channels does not matter.
+CHANNEL_BLEND_MODES = {DrawType.SUBTRACTIVE: 'multiply', DrawType.ADDITIVE: 'screen'}
+
+
+def draw_line_image(lines, image_shape, draw_type, line_heaviness=10, line_table=None, line_ids=None,
+                    line_channels=None):
     """Draws line image into numpy array given a list of lines.
 
     Args:
-        lines (list: List of point pairs
+        lines (list: List of point pairs or (N, 4) array of x1, y1, x2, y2
         image_shape (tuple(int)): Image shape of output format
         draw_type (DrawType): Enum for draw type
         line_heaviness (int, optional): Line heaviness. Defaults to 10.
+        line_table (LineTable, optional): Take line pixels from line table. Defaults to None.
+        line_ids (list, optional): Line table ids of lines. Needed with line_table. Defaults to None.
+        line_channels (list, optional): Color channel of every line. Draws an RGB image
+            if given. Defaults to None.
 
     Returns:
         np.array: Output image given as np.array.
     """    
+    if line_channels is None:
+        counts = line_counts(lines, image_shape, line_table, line_ids)
+        return render_line_counts(counts, draw_type, line_heaviness)
 
-    if draw_type == DrawType.ADDITIVE:
-        fill_value = 0
-        line_heaviness = line_heaviness * (-1)
+    lines = lines_to_array(lines)
+    line_channels = np.asarray(line_channels)
+    channel_images = []
+    for channel in range(len(CHANNEL_COLORS[draw_type])):
+        selected = line_channels == channel
+        channel_ids = None if line_table is None else np.asarray(line_ids)[selected]
+        counts = line_counts(lines[selected], image_shape, line_table, channel_ids)
+        channel_images.append(render_line_counts(counts, draw_type, line_heaviness))
+    return np.dstack(channel_images)
+
+
+def line_counts(lines, image_shape, line_table=None, line_ids=None):
+    """Counts how many lines pass through each pixel.
+
+    All lines are rasterized chunk by chunk into flat pixel indexes, which are
+    accumulated with a single bincount per chunk. Pixels hit several times
+    are counted several times.
+
+    Args:
+        lines (list): List of point pairs or (N, 4) array of x1, y1, x2, y2
+        image_shape (tuple(int)): Image shape of output format
+        line_table (LineTable, optional): Take line pixels from line table. Defaults to None.
+        line_ids (list, optional): Line table ids of lines. Needed with line_table. Defaults to None.
+
+    Returns:
+        np.array: int64 line count per pixel.
+    """
+    image_size = image_shape[0] * image_shape[1]
+    counts = np.zeros(image_size, dtype=np.int64)
+
+    if line_table is not None:
+        # Pixels are already rasterized, so only their ids are needed.
+        for start in range(0, len(line_ids), LINE_CHUNK_SIZE):
+            flat_indexes, _ = line_table.pixels(line_ids[start:start + LINE_CHUNK_SIZE])
+            counts += np.bincount(flat_indexes, minlength=image_size)
     else:
-        fill_value = 255
+        for flat_indexes in _iter_line_pixels(lines, image_shape[1]):
+            counts += np.bincount(flat_indexes, minlength=image_size)
+
+    return counts.reshape(image_shape)
 
-    output_image = np.full(image_shape, fill_value, dtype=np.int16)
 
-    for line_ in lines:
-        p1, p2 = line_
+def render_line_counts(counts, draw_type, line_heaviness=10):
+    """Converts line counts of line_counts() into an image.
+
+    Counts can be rendered again with other line heaviness values without
+    rasterizing the lines again.
+
+    Args:
+        counts (np.array): Line count per pixel.
+        draw_type (DrawType): Enum for draw type
+        line_heaviness (int, optional): Line heaviness. Defaults to 10.
+
+    Returns:
+        np.array: Output image given as np.array.
+    """
+    output_image = counts * line_heaviness
+    if draw_type == DrawType.SUBTRACTIVE:
+        output_image = 255 - output_image
+    return np.clip(output_image, 0, 255).astype(np.uint8)
+
+
+def _iter_line_pixels(lines, image_width):
+    """Yields flat pixel indexes of lines in chunks of LINE_CHUNK_SIZE lines."""
+    for start in range(0, len(lines), LINE_CHUNK_SIZE):
+        (x_1, y_1, x_2, y_2) = lines_to_array(lines[start:start + LINE_CHUNK_SIZE]).T
+        yield line_flat_indexes(y_1, x_1, y_2, x_2, image_width)
+
+
+def draw_line_image_striped(lines, image_shape, draw_type, output_path, work_dir,
+                            line_heaviness=10, stripe_rows=256):
+    """Draws line image stripe by stripe into a PNG file.
+
+    Line counts are accumulated in a memory-mapped file in work_dir and converted
+    to the output PNG one row stripe at a time, so memory stays bounded for any
+    image size.
+
+    Args:
+        lines (list): List of point pairs or (N, 4) array of x1, y1, x2, y2
+        image_shape (tuple(int)): Image shape of output format
+        draw_type (DrawType): Enum for draw type
+        output_path (str): Output PNG path.
+        work_dir (str): Directory for temporary files.
+        line_heaviness (int, optional): Line heaviness. Defaults to 10.
+        stripe_rows (int, optional): Number of rows per stripe. Defaults to 256.
+    """
+    (image_height, image_width) = image_shape
+    counts_memmap = np.memmap(os.path.join(work_dir, 'line_counts.dat'),
+                              dtype=np.int32, mode='w+', shape=image_shape)
+    flat_line_counts = counts_memmap.reshape(-1)
+
+    for flat_indexes in _iter_line_pixels(lines, image_width):
+        flat_indexes, counts = np.unique(flat_indexes, return_counts=True)
+        flat_line_counts[flat_indexes] += counts.astype(np.int32)
 
-        yy, xx = line(p1.y, p1.x, p2.y, p2.x)
+    with PngStreamWriter(output_path, image_width, image_height) as writer:
+        for row in range(0, image_height, stripe_rows):
+            writer.write_rows(render_line_counts(
+                counts_memmap[row:row + stripe_rows].astype(np.int64), draw_type, line_heaviness))
 
-        output_image[yy, xx] -= line_heaviness
+    del flat_line_counts, counts_memmap
 
-    output_image = np.clip(output_image, 0, 255)
-    output_image = output_image.astype(np.uint8)
-    return output_image
 
-def draw_line_svg(lines, width, height, draw_type, stroke_width=0.1):
+def draw_line_svg(lines, width, height, draw_type, stroke_width=0.1, line_channels=None):
     """Draw lines into SVG drawing given a list of lines.
 
     Parameters
     ----------
-        lines (list): List of point pairs
+        lines (list): List of point pairs or (N, 4) array of x1, y1, x2, y2
         width (int): Width of SVG document
         heigh (int): Height of SVG document
         draw_type (DrawType): Enum for draw type
         stroke_width (float, optional): Stroke width of lines. Defaults to 0.1
+        line_channels (list, optional): Color channel of every line. Lines are drawn
+            in the colors of CHANNEL_COLORS if given. Defaults to None
 
     Returns
     -------
@@ -77,6 +208,11 @@ def draw_line_svg(lines, width, height, draw_type, stroke_width=0.1):
         stroke_color = 'black'
         background = 'white'
 
+    import drawsvg as draw
+
+    if isinstance(lines, np.ndarray):
+        lines = lines_from_array(lines)
+
     svg_drawing = draw.Drawing(width, height, origin=(0, -height),
                 displayInline=False,
                 stroke=stroke_color,
@@ -87,14 +223,71 @@ def draw_line_svg(lines, width, height, draw_type, stroke_width=0.1):
             stroke='none',
             fill=background))
 
-    for line_ in lines:
-        p1, p2 = line_
+    if line_channels is None:
+        for line_ in lines:
+            p1, p2 = line_
+
+            svg_drawing.append(draw.Line(p1.x, p1.y*-1, p2.x, p2.y*-1))
+    else:
+        colors = CHANNEL_COLORS[draw_type]
+        style = 'mix-blend-mode:{}'.format(CHANNEL_BLEND_MODES[draw_type])
+        for line_, channel in zip(lines, line_channels):
+            p1, p2 = line_
 
-        svg_drawing.append(draw.Line(p1.x, p1.y*-1, p2.x, p2.y*-1))
+            svg_drawing.append(draw.Line(p1.x, p1.y*-1, p2.x, p2.y*-1,
+                                         stroke=colors[channel], style=style))
 
     return svg_drawing
 
-def compute_image_lines(image, num_lines, num_lines_to_check, draw_type, line_heaviness=10):
+def write_line_svg(lines, width, height, draw_type, output_path, stroke_width=0.1, precision=0,
+                   line_channels=None, scale=1.0):
+    """Streams lines as a single SVG path to a file.
+
+    Faster and smaller than draw_line_svg() for many lines. Output is gzip
+    compressed if output_path ends with .svgz. With line_channels every color
+    channel becomes one path, which looks the same as interleaved lines
+    because the channel blend modes are commutative.
+
+    Args:
+        lines (list): List of point pairs or (N, 4) array of x1, y1, x2, y2
+        width (int): Width of SVG document
+        height (int): Height of SVG document
+        draw_type (DrawType): Enum for draw type
+        output_path (str): Output path.
+        stroke_width (float, optional): Stroke width of lines. Defaults to 0.1
+        precision (int, optional): Decimal places of coordinates, 0 writes integers. Defaults to 0.
+        line_channels (list, optional): Color channel of every line. Lines are drawn
+            in the colors of CHANNEL_COLORS if given. Defaults to None
+        scale (float, optional): Display size relative to width and height. Defaults to 1.0
+    """
+    if draw_type == DrawType.ADDITIVE:
+        stroke_color = 'white'
+        background = 'black'
+    else:
+        stroke_color = 'black'
+        background = None
+
+    if line_channels is None:
+        with SvgPathWriter(output_path, width, height, stroke_color, background, stroke_width,
+                           precision, scale=scale) as writer:
+            writer.write_lines(lines)
+        return
+
+    lines = lines_to_array(lines)
+    line_channels = np.asarray(line_channels)
+    colors = CHANNEL_COLORS[draw_type]
+    with SvgPathWriter(output_path, width, height, colors[0], background, stroke_width,
+                       precision, blend_mode=CHANNEL_BLEND_MODES[draw_type], scale=scale) as writer:
+        for channel, color in enumerate(colors):
+            if channel > 0:
+                writer.start_path(color)
+            writer.write_lines(lines[line_channels == channel])
+
+
+def compute_image_lines(image, num_lines, num_lines_to_check, draw_type, line_heaviness=10,
+                        line_table=None, line_ids=None, workers=0, pyramid_factor=1, pyramid_refine=3,
+                        metrics=None, stopping=None, lines_per_round=1, jit=False,
+                        orientation_map=None):
     """Computes lines needed to redraw line image.
 
     Args:
@@ -103,30 +296,162 @@ def compute_image_lines(image, num_lines, num_lines_to_check, draw_type, line_he
         num_lines_to_check (int): Number of tries to find best line.
         draw_type (DrawType): Enum for draw type.
         line_heaviness (int, optional): Line heaviness. Defaults to 10.
+        line_table (LineTable, optional): Only use quantized lines of line table. Defaults to None.
+        line_ids (list, optional): Gets line table ids of found lines appended. Defaults to None.
+        workers (int, optional): Number of processes scoring candidate lines. Defaults to 0.
+        pyramid_factor (int, optional): Score candidates first on an image downsampled
+            by this factor. Defaults to 1.
+        pyramid_refine (int, optional): Number of best downsampled candidates scored
+            again on the full image. Defaults to 3.
+        metrics (Metrics, optional): Collects phase timings and counters. Defaults to None.
+        stopping (StoppingCriteria, optional): Stops early and adapts num_lines_to_check
+            to a time budget. Defaults to None.
+        lines_per_round (int, optional): Accept up to this many lines through different
+            pixels per round. Only used without line_table, workers and pyramid_factor.
+            Defaults to 1.
+        jit (bool, optional): Run the search in loops compiled by Numba if it is installed.
+            Only used without line_table, workers, pyramid_factor and lines_per_round.
+            Finds the same lines. Defaults to False.
+        orientation_map (OrientationMap, optional): Draw candidate angles around the local
+            orientation instead of uniformly. Only used without line_table, workers,
+            pyramid_factor, lines_per_round and jit. Defaults to None.
 
     Returns:
         list(): List of point pairs
     """    
     list_of_lines = []
+    for line_ in iter_image_lines(
+            image, num_lines, num_lines_to_check, draw_type, line_heaviness,
+            line_table, line_ids, workers, pyramid_factor, pyramid_refine, metrics, stopping,
+            lines_per_round, jit, orientation_map):
+        list_of_lines.append(line_)
+        if metrics is not None:
+            metrics.line_finished(len(list_of_lines))
+    return list_of_lines
+
+
+def iter_image_lines(image, num_lines, num_lines_to_check, draw_type, line_heaviness=10,
+                     line_table=None, line_ids=None, workers=0, pyramid_factor=1, pyramid_refine=3,
+                     metrics=None, stopping=None, lines_per_round=1, jit=False,
+                     orientation_map=None):
+    """Yields lines needed to redraw line image one by one.
+
+    Takes the same arguments as compute_image_lines(). Each line is already
+    accumulated to image when it is yielded, so image together with numpy's
+    random state can be saved to continue the computation later on.
+
+    Yields:
+        (PointInt,PointInt): Point pair of the next line.
+    """
+    if jit and line_table is None and workers <= 0 and pyramid_factor <= 1 and lines_per_round <= 1:
+        from jit_engine import AVAILABLE, iter_jit_image_lines
+
+        if AVAILABLE:
+            yield from iter_jit_image_lines(
+                image, num_lines, num_lines_to_check, draw_type == DrawType.ADDITIVE,
+                line_heaviness, metrics, stopping)
+            return
+
+    if workers > 0 and line_table is None:
+        from parallel import ParallelLineScorer
+
+        # Seed worker random streams from numpy's global state to stay reproducible.
+        with ParallelLineScorer(image, workers, np.random.randint(0, 2**31)) as scorer:
+            if lines_per_round > 1:
+                yield from _iter_image_lines_in_rounds(
+                    scorer.image, num_lines, num_lines_to_check, draw_type, line_heaviness,
+                    lines_per_round, metrics, stopping, scorer, image)
+            else:
+                yield from _iter_image_lines(
+                    scorer.image, num_lines, num_lines_to_check, draw_type, line_heaviness,
+                    None, None, scorer, None, 0, image, metrics, stopping)
+        return
+
+    if lines_per_round > 1 and line_table is None and pyramid_factor <= 1:
+        yield from _iter_image_lines_in_rounds(
+            image, num_lines, num_lines_to_check, draw_type, line_heaviness, lines_per_round,
+            metrics, stopping)
+        return
+
+    if pyramid_factor > 1 and line_table is None:
+        from pyramid import CoarseImage
+
+        coarse_image = CoarseImage(image, pyramid_factor)
+    else:
+        coarse_image = None
+
+    yield from _iter_image_lines(
+        image, num_lines, num_lines_to_check, draw_type, line_heaviness, line_table, line_ids,
+        None, coarse_image, pyramid_refine, None, metrics, stopping, orientation_map)
+
+
+def _iter_image_lines(image, num_lines, num_lines_to_check, draw_type, line_heaviness,
+                      line_table, line_ids, scorer, coarse_image, pyramid_refine, mirror_image,
+                      metrics, stopping, orientation_map=None):
+    """Greedy line search of iter_image_lines() with optional parallel or coarse-to-fine scoring.
+
+    Lines are also accumulated to mirror_image if given, which keeps the caller's
+    image up to date while the search runs on a shared memory copy.
+    """
+    from tqdm import tqdm
+
     debug_ = False
 
-    for i in tqdm(range(num_lines), desc='Calculating line: '):
-        # For additive draw_type find brightest point and for subtractive mode
-        # search darkest point.
-        if draw_type == DrawType.ADDITIVE:
-            value_to_search = np.max(image)
-        else:
-            value_to_search = np.min(image)
+    # For additive draw_type index brightest points and for subtractive mode
+    # index darkest points.
+    extremum_index = ExtremumIndex(image, draw_type == DrawType.ADDITIVE)
+    if metrics is not None:
+        metrics.lap('extremum_search')
 
-        (indexes_y, indexes_x) = np.where(value_to_search == image)
+    # Accumulated lines lower the brightness in additive mode and the darkness
+    # in subtractive mode.
+    if draw_type == DrawType.ADDITIVE:
+        delta = -line_heaviness
+    else:
+        delta = line_heaviness
+
+    if stopping is not None:
+        stopping.start(num_lines, num_lines_to_check)
+
+    for i in tqdm(range(num_lines), desc='Calculating line: '):
+        if metrics is not None:
+            # Time spent by the consumer of the previous line.
+            metrics.lap('caller')
+        if stopping is not None:
+            if stopping.should_stop():
+                break
+            num_lines_to_check = stopping.lines_to_check
+        if metrics is not None:
+            metrics.count('lines')
+            metrics.count('candidates', num_lines_to_check)
 
         # Pick randomly one of the brightest, or darkest points depending on draw_type.
-        number_of_target_pixel = indexes_x.shape[0]
-        random_index = np.random.randint(0, number_of_target_pixel)
+        (index_y, index_x) = extremum_index.pick_random()
+        if metrics is not None:
+            metrics.lap('extremum_search')
 
         # y-axis value is inverted because geometry library uses inverted y-axis direction.
-        selected_point = Point(
-            indexes_x[random_index], - indexes_y[random_index])
+        selected_point = Point(index_x, - index_y)
+
+        if line_table is not None:
+            line_id, _ = find_best_table_line_through_pixel(
+                num_lines_to_check, index_y, index_x, image, line_table, draw_type)
+            if metrics is not None:
+                metrics.lap('scoring')
+            flat_indexes, _ = line_table.pixels(line_id)
+            yy, xx = np.divmod(flat_indexes, image.shape[1])
+            extremum_index.accumulate(yy, xx, delta)
+            if stopping is not None:
+                stopping.line_accepted(yy, xx, image[yy, xx], delta)
+            if metrics is not None:
+                metrics.count('line_pixels', yy.shape[0])
+                metrics.lap('accumulation')
+
+            (x_1, y_1, x_2, y_2) = (int(v) for v in line_table.endpoints[line_id])
+            if line_ids is not None:
+                line_ids.append(line_id)
+            yield (PointInt(x_1, y_1), PointInt(x_2, y_2))
+            continue
 
         if debug_:
             # Prepare white image to create
@@ -135,13 +460,36 @@ def compute_image_lines(image, num_lines, num_lines_to_check, draw_type, line_he
             debug_image = None
 
         # Find best fitting line in current test round
-        best_line, best_mean_value = find_best_line_through_point(
-            num_lines_to_check, selected_point, image, debug_image, draw_type)
+        for num_picks in range(MAX_FAILED_PICKS):
+            if num_picks > 0:
+                # No candidate line through the last pixel lies inside the image,
+                # e.g. in a corner, so pick another one.
+                (index_y, index_x) = extremum_index.pick_random()
+                selected_point = Point(index_x, - index_y)
+
+            if scorer is not None:
+                best_line, _ = scorer.find_best_line_through_point(
+                    num_lines_to_check, selected_point, draw_type == DrawType.ADDITIVE)
+            elif coarse_image is not None:
+                best_line, _ = find_best_line_coarse_to_fine(
+                    num_lines_to_check, index_y, index_x, image, coarse_image, pyramid_refine, draw_type)
+            elif orientation_map is not None:
+                angles = orientation_map.sample_angles(index_y, index_x, num_lines_to_check)
+                best_line, _ = score_lines_through_point(
+                    angles, selected_point, image, draw_type, debug_image, metrics)
+            else:
+                best_line, _ = find_best_line_through_point(
+                    num_lines_to_check, selected_point, image, debug_image, draw_type, metrics)
+            if best_line is not None:
+                break
+        if metrics is not None:
+            metrics.lap('scoring')
+        if best_line is None:
+            break
 
         if debug_:
             # Draw red point for random point.
-            debug_image[indexes_y[random_index]-2:indexes_y[random_index]+2,
-                        indexes_x[random_index]-2:indexes_x[random_index]+2] = [255, 0, 0]
+            debug_image[index_y-2:index_y+2, index_x-2:index_x+2] = [255, 0, 0]
             output_image = Image.fromarray(debug_image)
             output_image.save('./debug_output/debug_point_{}.png'.format(i))
 
@@ -152,83 +500,199 @@ def compute_image_lines(image, num_lines, num_lines_to_check, draw_type, line_he
         # Accumulate already drawn line to original image.
         yy, xx = line(best_line[0].y, best_line[0].x,
                       best_line[1].y, best_line[1].x)
-        if draw_type == DrawType.ADDITIVE:
-            image[yy, xx] -= line_heaviness
-        else:
-            image[yy, xx] += line_heaviness
-
-        list_of_lines.append(best_line)
-    return list_of_lines
+        extremum_index.accumulate(yy, xx, delta)
+        if coarse_image is not None:
+            coarse_image.accumulate(yy, xx, delta)
+        if mirror_image is not None:
+            mirror_image[yy, xx] += delta
+        if stopping is not None:
+            stopping.line_accepted(yy, xx, image[yy, xx], delta)
+        if metrics is not None:
+            metrics.count('line_pixels', yy.shape[0])
+            metrics.lap('accumulation')
+
+        yield best_line
+
+
+def _iter_image_lines_in_rounds(image, num_lines, num_lines_to_check, draw_type, line_heaviness,
+                                lines_per_round, metrics, stopping, scorer=None, mirror_image=None):
+    """Greedy line search of iter_image_lines() accepting up to lines_per_round lines per round.
+
+    Every round picks lines_per_round of the most extreme pixels spread over
+    the image and scores the candidates of all of them together, split over
+    the workers of scorer if given. The best lines are accepted from best to
+    worst, skipping lines which share more than MAX_ROUND_OVERLAP of their
+    pixels with lines accepted before in the same round. Lines are also
+    accumulated to mirror_image if given.
+    """
+    from tqdm import tqdm
 
+    extremum_index = ExtremumIndex(image, draw_type == DrawType.ADDITIVE)
+    if metrics is not None:
+        metrics.lap('extremum_search')
 
-def find_best_line_through_point(num_lines_to_check, selected_point, image, debug_image, draw_type):
-    """Find best line through a given point.
+    if draw_type == DrawType.ADDITIVE:
+        delta = -line_heaviness
+    else:
+        delta = line_heaviness
+
+    if stopping is not None:
+        stopping.start(num_lines, num_lines_to_check)
+
+    # Pixels drawn in the current round. Only these are reset after a round.
+    round_mask = np.zeros(image.size, dtype=bool)
+    num_found = 0
+
+    with tqdm(total=num_lines, desc='Calculating line: ') as progress:
+        while num_found < num_lines:
+            if metrics is not None:
+                metrics.lap('caller')
+            if stopping is not None:
+                if stopping.should_stop():
+                    break
+                num_lines_to_check = stopping.lines_to_check
+
+            (index_ys, index_xs) = _pick_spread_pixels(
+                extremum_index, min(lines_per_round, num_lines - num_found), image.shape)
+            if metrics is not None:
+                metrics.lap('extremum_search')
+                metrics.count('rounds')
+                metrics.count('candidates', index_ys.shape[0] * num_lines_to_check)
+
+            if scorer is not None:
+                endpoints, _ = scorer.find_best_lines_through_pixels(
+                    num_lines_to_check, index_ys, index_xs, draw_type == DrawType.ADDITIVE)
+            else:
+                endpoints, _ = find_best_lines_through_pixels(
+                    num_lines_to_check, index_ys, index_xs, image, draw_type, metrics)
+            if endpoints.shape[0] == 0:
+                break
+            yy, xx, offsets = line_segments(
+                endpoints[:, 0, 1], endpoints[:, 0, 0], endpoints[:, 1, 1], endpoints[:, 1, 0])
+            flat_indexes = yy * image.shape[1] + xx
+            if metrics is not None:
+                metrics.lap('scoring')
+
+            for k in range(endpoints.shape[0]):
+                line_pixels = flat_indexes[offsets[k]:offsets[k + 1]]
+                if np.count_nonzero(round_mask[line_pixels]) > MAX_ROUND_OVERLAP * line_pixels.shape[0]:
+                    continue
+                round_mask[line_pixels] = True
+
+                line_yy = yy[offsets[k]:offsets[k + 1]]
+                line_xx = xx[offsets[k]:offsets[k + 1]]
+                extremum_index.accumulate(line_yy, line_xx, delta)
+                if mirror_image is not None:
+                    mirror_image[line_yy, line_xx] += delta
+                if stopping is not None:
+                    stopping.line_accepted(line_yy, line_xx, image[line_yy, line_xx], delta)
+                if metrics is not None:
+                    metrics.count('lines')
+                    metrics.count('line_pixels', line_pixels.shape[0])
+                    metrics.lap('accumulation')
+
+                # Yield every line as soon as it is accumulated, so the image
+                # matches the lines so far even if the caller stops mid-round.
+                (x_1, y_1), (x_2, y_2) = endpoints[k]
+                num_found += 1
+                progress.update()
+                yield (PointInt(int(x_1), int(y_1)), PointInt(int(x_2), int(y_2)))
+                if metrics is not None:
+                    metrics.lap('caller')
+
+            round_mask[flat_indexes] = False
+            if metrics is not None:
+                metrics.lap('accumulation')
+
+
+def find_best_table_line_through_pixel(num_lines_to_check, index_y, index_x, image, line_table, draw_type):
+    """Find best line of a line table through a given pixel.
 
     Args:
         num_lines_to_check (int): Number of tries to find best line.
-        selected_point (Point): Point where line needs to go through.
+        index_y (int): Row of pixel where line needs to go through.
+        index_x (int): Column of pixel where line needs to go through.
         image (np.array): Image as np.array.
-        debug_image (np.array): Debug_image when needed. Other value is set to None.
+        line_table (LineTable): Line table matching the image shape.
         draw_type (DrawType): Enum for draw type.
 
     Returns:
-        (Point,Point): Point pair representing the best line segment.
-    """    
+        (int, float): Line id of the best line and its mean intensity.
+    """
+    angle_indexes = np.random.randint(0, line_table.num_angles, num_lines_to_check)
+    candidate_ids = line_table.line_ids(angle_indexes, index_x, index_y)
+
+    flat_indexes, offsets = line_table.pixels(candidate_ids)
+    line_sums = np.add.reduceat(image.reshape(-1)[flat_indexes].astype(np.int64), offsets[:-1])
+    mean_line_intensities = line_sums / np.diff(offsets)
+
     if draw_type == DrawType.ADDITIVE:
-        best_mean_value = -sys.float_info.max
+        best_index = np.argmax(mean_line_intensities)
     else:
-        best_mean_value = sys.float_info.max
+        best_index = np.argmin(mean_line_intensities)
 
-    best_line = (Point(-9.9, -9.9), Point(-9.9, -9.9))
-    (image_height, image_width) = image.shape
+    return candidate_ids[best_index], mean_line_intensities[best_index]
 
-    for j in range(num_lines_to_check):
-        angle = (np.random.rand() - 0.5) * np.pi
-        direction = Point(np.cos(angle), np.sin(angle))
-        line_through_point = Line(selected_point, direction)
 
-        # Rectangle representing the image boarders is mapped to the bottom left quadrant
-        # due to the different coordinate system used in the numpy arrays.
-        image_rectangle = Rectangle(
-            image_width - 1.0, image_height - 1.0, Point(0.0, - image_height + 1.0))
-        found_line = image_rectangle.intersection_with_line(line_through_point)
+def find_best_line_coarse_to_fine(num_lines_to_check, index_y, index_x, image, coarse_image,
+                                  num_refine, draw_type):
+    """Find best line through a given pixel by first scoring all candidates on a coarse image.
 
-        if len(found_line) == 2:
-            (p1, p2) = found_line
-        else:
-            # Forget point - because it was an edge case.
-            continue
+    Angles of the best candidates on the coarse image are scored again on the full
+    resolution image. Lines are defined by point and angle, so they map between
+    the resolutions without any conversion.
 
-        # Remap y-coordinate system because y-axis direction is opposite in
-        # numpy arrays and the geometric lib.
-        p1.y = - p1.y
-        p2.y = - p2.y
+    Args:
+        num_lines_to_check (int): Number of tries to find best line.
+        index_y (int): Row of pixel where line needs to go through.
+        index_x (int): Column of pixel where line needs to go through.
+        image (np.array): Image as np.array.
+        coarse_image (CoarseImage): Downsampled copy of the image.
+        num_refine (int): Number of best coarse candidates scored on the full image.
+        draw_type (DrawType): Enum for draw type.
 
-        (p1, p2) = (p1.as_PointInt(), p2.as_PointInt())
-        yy, xx = line(int(p1.y), int(p1.x), int(p2.y), int(p2.x))
+    Returns:
+        (Point,Point): Point pair representing the best line segment, or None if no
+        candidate line lies inside the image.
+    """
+    angles = (np.random.rand(num_lines_to_check) - 0.5) * np.pi
 
-        mean_line_intensity = np.mean(image[yy, xx])
+    _, mean_line_intensities, valid = mean_line_intensities_through_point(
+        angles, coarse_image.coarse_point(index_y, index_x), coarse_image.image)
 
-        # DEBUG: Check if lines are correctly drawn through random point.
-        if debug_image is not None:
-            print("point pos: ", selected_point)
-            print("angle: ", angle/np.pi*180)
-            print(p1, p2)
-            debug_image[yy, xx] = [0, 0, 0]
+    if mean_line_intensities.shape[0] > 0:
+        if draw_type == DrawType.ADDITIVE:
+            mean_line_intensities = -mean_line_intensities
+        order = np.argsort(mean_line_intensities, kind='stable')
+        angles = angles[valid][order[:num_refine]]
 
-            print("j {}, angle {}, direction {}, selected_point {}, best_mean_value {}".format(
-                j, angle, direction, selected_point, best_mean_value))
+    # y-axis value is inverted because geometry library uses inverted y-axis direction.
+    return score_lines_through_point(angles, Point(index_x, - index_y), image, draw_type)
 
-        if draw_type == DrawType.ADDITIVE:
-            if best_mean_value < mean_line_intensity:
-                best_line = (p1, p2)
-                best_mean_value = mean_line_intensity
-        else:
-            if best_mean_value > mean_line_intensity:
-                best_line = (p1, p2)
-                best_mean_value = mean_line_intensity
 
-    return best_line, best_mean_value
+def _pick_spread_pixels(extremum_index, count, image_shape):
+    """Picks randomly up to count of the most extreme pixels spread over the image.
+
+    The image is divided into about count cells and at most one pixel is picked per cell.
+
+    Args:
+        extremum_index (ExtremumIndex): Index of the residual image.
+        count (int): Number of pixels.
+        image_shape (tuple(int)): Image shape.
+
+    Returns:
+        (np.array, np.array): Rows and columns of the pixels.
+    """
+    pool = extremum_index.sample_extreme_pixels(count * SPREAD_POOL_FACTOR, count * SPREAD_POOL_FACTOR)
+    (pool_y, pool_x) = np.divmod(pool, image_shape[1])
+
+    cell_size = max(int(np.sqrt(image_shape[0] * image_shape[1] / count)), 1)
+    cells = (pool_y // cell_size) * (image_shape[1] // cell_size + 1) + pool_x // cell_size
+    _, first = np.unique(cells, return_index=True)
+    picked = np.sort(first)[:count]
+
+    return pool_y[picked], pool_x[picked]
+
 
 def print_input_params(args):
     print("\n----------------------------------------------\n")
@@ -239,66 +703,638 @@ def print_input_params(args):
     print("output_format: ", args.output_format)
     print("num_lines: ", args.num_lines)
     print("num_lines_to_check: ", args.num_lines_to_check)
+    print("engine: ", args.engine)
+    print("workers: ", args.workers)
+    print("pyramid_factor: ", args.pyramid_factor)
+    print("large_image: ", args.large_image)
+    print("checkpoint_path: ", args.checkpoint_path)
+    print("angle_resolution: ", args.angle_resolution)
     print("\n----------------------------------------------\n")
 
 
-def main(args):
-    print(LOGO)
-    print_input_params(args)
+def residual_error(target, residual, draw_type):
+    """Mean squared error between target image and drawn line image.
 
-    # Initialize random-seed of numpy framework to always get the same output
-    # if no_random_result is set.
-    if args.no_random_result == True:
-        np.random.seed(42)
-        print("No random result setting activated.")
+    The drawn image is derived from the residual image, which is the target
+    image with all lines accumulated as done in compute_image_lines.
 
-    # Prepare draw_type enum to remove string comparisson.
-    if str.upper(args.draw_type) == 'ADDITIVE':
-        draw_type = DrawType['ADDITIVE']
-    elif str.upper(args.draw_type) == 'SUBTRACTIVE':
-        draw_type = DrawType['SUBTRACTIVE']
-    else:
-        print("Error: draw_type <{}> not supported".format(args.draw_type))
-        sys.exit()
+    Args:
+        target (np.array): Preprocessed input image.
+        residual (np.array): Target image with accumulated lines.
+        draw_type (DrawType): Enum for draw type.
 
-    print('Load and preprocess image...')
-    img = Image.open(args.input_path)
+    Returns:
+        float: Mean squared error.
+    """
+    squared_error = 0.0
+    # Go through row stripes, so memory-mapped images are never fully loaded.
+    for row in range(0, target.shape[0], 256):
+        squared_error += np.sum(squared_errors(
+            target[row:row + 256], residual[row:row + 256], draw_type == DrawType.ADDITIVE))
+    return float(squared_error / target.size)
+
+
+def load_image(input_path, output_width):
+    """Loads, resizes and grayscales input image.
+
+    Args:
+        input_path (str): Input image path.
+        output_width (int): Output width in pixels. "-1" will not change the size.
+
+    Returns:
+        np.array: Grayscale image as int16 numpy array.
+    """
+    img = _open_resized_image(input_path, output_width)
+    return _grayscale(np.asarray(img, dtype=float))
+
+
+def load_image_memmap(input_path, output_width, memmap_path, stripe_rows=256):
+    """Loads, resizes and grayscales input image stripe by stripe into a memory-mapped file.
+
+    Avoids holding full size float and int16 copies of large images in memory.
+
+    Args:
+        input_path (str): Input image path.
+        output_width (int): Output width in pixels. "-1" will not change the size.
+        memmap_path (str): Path of the memory-mapped file which is created.
+        stripe_rows (int, optional): Number of rows per stripe. Defaults to 256.
+
+    Returns:
+        np.memmap: Grayscale image as int16 memory-mapped array.
+    """
+    img = _open_resized_image(input_path, output_width)
+    img_arr = np.memmap(memmap_path, dtype=np.int16, mode='w+', shape=(img.height, img.width))
+
+    for row in range(0, img.height, stripe_rows):
+        stripe = img.crop((0, row, img.width, min(row + stripe_rows, img.height)))
+        img_arr[row:row + stripe.height] = _grayscale(np.asarray(stripe, dtype=float))
+
+    return img_arr
+
+
+def load_color_image(input_path, output_width):
+    """Loads and resizes input image keeping its red, green and blue channel.
+
+    Args:
+        input_path (str): Input image path.
+        output_width (int): Output width in pixels. "-1" will not change the size.
+
+    Returns:
+        np.array: RGB image as int16 numpy array with shape (height, width, 3).
+    """
+    img = _open_resized_image(input_path, output_width)
+    return np.asarray(img.convert('RGB'), dtype=np.int16)
+
+
+def _open_resized_image(input_path, output_width):
+    img = Image.open(input_path)
 
     # Resize if wanted.
-    if args.output_width > 0:
-        basewidth = args.output_width
+    if output_width > 0:
+        basewidth = output_width
         wpercent = (basewidth/float(img.size[0]))
         hsize = int((float(img.size[1])*float(wpercent)))
         img = img.resize((basewidth, hsize), Image.Resampling.BICUBIC)
 
+    return img
+
+
+def _grayscale(img_arr):
     # grayscale using CIE luminance (Copied from http://linify.me)
-    img_arr = np.asarray(img, dtype=float)
     img_arr = 0.21 * img_arr[:, :, 0] + 0.72 * \
         img_arr[:, :, 1] + 0.07 * img_arr[:, :, 2]
-    img_arr = img_arr.astype(np.int16)
+    return img_arr.astype(np.int16)
 
-    lines = compute_image_lines(
-        img_arr, args.num_lines, args.num_lines_to_check, draw_type, args.line_heaviness)
-    
-    if args.output_format == 'SVG':
 
-        svg_width = img.width
-        svg_height = img.height
+def write_output(lines, image_shape, draw_type, args, output_path, output_format,
+                 line_table=None, line_ids=None, line_channels=None):
+    """Draws lines and writes them as PNG or SVG.
 
-        output_svg = draw_line_svg(
-            lines, svg_width, svg_height, draw_type, args.stroke_width)
-        print('Write SVG to {}'.format(args.output_path))
-        output_svg.saveSvg(args.output_path)
+    Args:
+        lines (list): List of point pairs or (N, 4) array of x1, y1, x2, y2
+        image_shape (tuple(int)): Image shape of output format
+        draw_type (DrawType): Enum for draw type
+        args (argparse.Namespace): Parsed command line arguments.
+        output_path (str): Output path.
+        output_format (str): PNG or SVG.
+        line_table (LineTable, optional): Take line pixels from line table. Defaults to None.
+        line_ids (list, optional): Line table ids of lines. Needed with line_table. Defaults to None.
+        line_channels (list, optional): Color channel of every line. Defaults to None.
+    """
+    if output_format == 'SVG':
+
+        svg_height, svg_width = image_shape
+
+        print('Write SVG to {}'.format(output_path))
+        write_line_svg(lines, svg_width, svg_height, draw_type, output_path,
+                       args.stroke_width, args.svg_precision, line_channels)
     else:
         output_image_arr = draw_line_image(
-            lines, img_arr.shape, draw_type, args.line_heaviness)
+            lines, image_shape, draw_type, args.line_heaviness, line_table, line_ids, line_channels)
         # Write image to output
-        print('Write image to {}'.format(args.output_path))
+        print('Write image to {}'.format(output_path))
         output_image = Image.fromarray(output_image_arr)
-        output_image.save(args.output_path)
+        output_image.save(output_path)
 
 
-if __name__ == "__main__":
+def _stream_image_lines(args, img_arr, target_arr, draw_type, line_table, line_ids, metrics):
+    """Collects lines of iter_image_lines() while writing checkpoints and previews.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        img_arr (np.array): Image as numpy array.
+        target_arr (np.array): Preprocessed input image.
+        draw_type (DrawType): Enum for draw type.
+        line_table (LineTable): Line table or None.
+        line_ids (list): Gets line table ids of found lines appended.
+        metrics (Metrics): Collects phase timings and counters or None.
+
+    Returns:
+        list(): List of point pairs
+    """
+    checkpoint_config = {
+        'input_path': args.input_path,
+        'shape': img_arr.shape,
+        'draw_type': draw_type.name,
+        'line_heaviness': args.line_heaviness,
+        'num_lines_to_check': args.num_lines_to_check,
+        'angle_resolution': args.angle_resolution,
+        'engine': args.engine,
+        'workers': args.workers,
+        'pyramid_factor': args.pyramid_factor,
+        'pyramid_refine': args.pyramid_refine,
+        'lines_per_round': args.lines_per_round,
+        'orientation_spread': args.orientation_spread,
+        'orientation_scale': args.orientation_scale,
+    }
+
+    lines = []
+    if args.resume and os.path.isfile(args.checkpoint_path):
+        residual, lines, saved_line_ids = load_checkpoint(args.checkpoint_path, checkpoint_config)
+        img_arr[:] = residual
+        line_ids.extend(saved_line_ids)
+        print('Resume from checkpoint {} at line {}.'.format(args.checkpoint_path, len(lines)))
+
+    orientation_map = None
+    if args.orientation_spread > 0:
+        from orientation import OrientationMap
+
+        orientation_map = OrientationMap(
+            target_arr, args.orientation_spread, draw_type == DrawType.ADDITIVE, args.orientation_scale)
+        if metrics is not None:
+            metrics.lap('setup')
+
+    stopping = None
+    if args.target_error > 0 or args.min_improvement > 0 or args.time_budget > 0:
+        stopping = StoppingCriteria(
+            ResidualErrorTracker(target_arr, img_arr, draw_type == DrawType.ADDITIVE),
+            args.target_error, args.min_improvement, args.min_improvement_window, args.time_budget)
+
+    line_stream = iter_image_lines(
+        img_arr, max(args.num_lines - len(lines), 0), args.num_lines_to_check, draw_type,
+        args.line_heaviness, line_table, line_ids, args.workers, args.pyramid_factor,
+        args.pyramid_refine, metrics, stopping, args.lines_per_round, args.engine == 'NUMBA',
+        orientation_map)
+
+    if args.preview_path.lower().endswith(('.svg', '.svgz')):
+        preview_format = 'SVG'
+    else:
+        preview_format = 'PNG'
+    preview_thread = None
+
+    for line_ in line_stream:
+        lines.append(line_)
+        if metrics is not None:
+            metrics.line_finished(len(lines))
+
+        if args.checkpoint_path and args.checkpoint_every > 0 and \
+                len(lines) % args.checkpoint_every == 0:
+            save_checkpoint(args.checkpoint_path, img_arr, lines, line_ids, checkpoint_config)
+
+        if args.preview_path and args.preview_every > 0 and len(lines) % args.preview_every == 0:
+            # Render preview in the background while the search continues.
+            if preview_thread is not None:
+                preview_thread.join()
+            preview_thread = threading.Thread(target=write_output, args=(
+                list(lines), img_arr.shape, draw_type, args, args.preview_path, preview_format,
+                line_table, list(line_ids)))
+            preview_thread.start()
+
+    if preview_thread is not None:
+        preview_thread.join()
+    if stopping is not None and stopping.reason is not None:
+        print('Stopped after {} lines: {}.'.format(len(lines), stopping.reason))
+    if args.checkpoint_path:
+        save_checkpoint(args.checkpoint_path, img_arr, lines, line_ids, checkpoint_config)
+
+    return lines
+
+
+def _line_table_for(args, image_shape):
+    """Loads the line table the engine of args needs, or returns None."""
+    if args.engine == 'RADON':
+        angle_resolution = args.angle_resolution if args.angle_resolution > 0 else RADON_ANGLE_RESOLUTION
+    elif args.engine in ('RANDOM', 'NUMBA') and args.angle_resolution > 0:
+        angle_resolution = args.angle_resolution
+    else:
+        return None
+
+    from line_table import LineTable
+
+    return LineTable.load_or_build(
+        args.raster_cache_dir, image_shape[1], image_shape[0], angle_resolution)
+
+
+def compute_channel_lines(args, image, draw_type, seed=None):
+    """Computes lines of one color channel with the engine of args.
+
+    Runs in the worker processes of compute_color_lines(), which is why the
+    random state is seeded here.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        image (np.array): Channel image, gets the found lines accumulated.
+        draw_type (DrawType): Enum for draw type.
+        seed (int, optional): Random seed. Seeds from fresh entropy if None. Defaults to None.
+
+    Returns:
+        (list, list, np.array): Lines, their line table ids and the channel image.
+    """
+    np.random.seed(seed)
+    line_table = _line_table_for(args, image.shape)
+    line_ids = []
+
+    if args.engine == 'PINS':
+        from pins import PinLayout, compute_pin_lines
+
+        lines = compute_pin_lines(
+            image, args.num_lines, draw_type == DrawType.ADDITIVE, args.line_heaviness,
+            args.num_pins, PinLayout[args.pin_layout], args.pin_min_gap)
+    elif args.engine == 'RADON':
+        from radon import compute_radon_lines
+
+        lines = compute_radon_lines(
+            image, args.num_lines, draw_type == DrawType.ADDITIVE, args.line_heaviness,
+            line_table, args.radon_min_length, line_ids)
+    else:
+        orientation_map = None
+        if args.orientation_spread > 0:
+            from orientation import OrientationMap
+
+            orientation_map = OrientationMap(
+                image, args.orientation_spread, draw_type == DrawType.ADDITIVE, args.orientation_scale)
+        lines = compute_image_lines(
+            image, args.num_lines, args.num_lines_to_check, draw_type, args.line_heaviness,
+            line_table, line_ids, 0, args.pyramid_factor, args.pyramid_refine,
+            lines_per_round=args.lines_per_round, jit=args.engine == 'NUMBA',
+            orientation_map=orientation_map)
+
+    return lines, line_ids, image
+
+
+def compute_color_lines(args, image, draw_type, jobs=3):
+    """Computes lines for the red, green and blue channel in parallel processes.
+
+    Every channel is drawn like a grayscale image, so subtractive lines of the
+    red channel are cyan and additive lines of the red channel are red. Line
+    tables are built once before the workers start and are then shared as
+    memory-mapped files.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        image (np.array): RGB image with shape (height, width, 3), gets the lines
+            of every channel accumulated.
+        draw_type (DrawType): Enum for draw type.
+        jobs (int, optional): Number of processes. "1" computes the channels one
+            after another. Defaults to 3.
+
+    Returns:
+        (list, list, list, LineTable): Lines of all channels interleaved channel by
+        channel, their line table ids, their channels and the line table or None.
+    """
+    line_table = _line_table_for(args, image.shape)
+
+    num_channels = image.shape[2]
+    if args.no_random_result:
+        seeds = [42 + channel for channel in range(num_channels)]
+    else:
+        seeds = [None] * num_channels
+    channel_images = [np.ascontiguousarray(image[:, :, channel]) for channel in range(num_channels)]
+
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(jobs, num_channels)) as executor:
+            results = list(executor.map(compute_channel_lines, [args] * num_channels,
+                                        channel_images, [draw_type] * num_channels, seeds))
+    else:
+        results = [compute_channel_lines(args, channel_image, draw_type, seed)
+                   for (channel_image, seed) in zip(channel_images, seeds)]
+
+    order = sorted((i, channel) for (channel, (channel_lines, _, _)) in enumerate(results)
+                   for i in range(len(channel_lines)))
+    lines = [results[channel][0][i] for (i, channel) in order]
+    line_ids = [results[channel][1][i] for (i, channel) in order] if line_table is not None else []
+    line_channels = [channel for (_, channel) in order]
+
+    for (channel, (_, _, channel_image)) in enumerate(results):
+        image[:, :, channel] = channel_image
+
+    return lines, line_ids, line_channels, line_table
+
+
+def check_args(args):
+    """Checks for option combinations which would be silently ignored.
+
+    Checkpoints, previews and stopping criteria are only supported by the
+    engines searching line by line, not by PINS, RADON and --color. --color
+    keeps the RGB image in memory and runs channels in processes of their
+    own, so it does not support --large-image and --workers either. Options
+    holding full-size arrays in memory defeat --large-image and are rejected
+    with it. Lines of the line table of --angle-resolution are not scored by
+    workers, on a coarse image or with guided angles.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Raises:
+        ValueError: If options do not fit together.
+    """
+    line_by_line_options = [
+        flag for (flag, value) in (
+            ('--checkpoint-path', args.checkpoint_path), ('--resume', args.resume),
+            ('--preview-path', args.preview_path), ('--target-error', args.target_error),
+            ('--min-improvement', args.min_improvement), ('--time-budget', args.time_budget))
+        if value]
+    if line_by_line_options and (args.color or args.engine in ('PINS', 'RADON')):
+        raise ValueError('{} not supported with {}'.format(
+            ' '.join(line_by_line_options), '--color' if args.color else '--engine ' + args.engine))
+    if args.color and (args.large_image or args.workers > 0):
+        raise ValueError('{} not supported with --color'.format(
+            '--large-image' if args.large_image else '--workers'))
+    in_memory_options = [
+        flag for (flag, value) in (
+            ('--workers', args.workers > 0), ('--pyramid-factor', args.pyramid_factor > 1),
+            ('--lines-per-round', args.lines_per_round > 1),
+            ('--orientation-spread', args.orientation_spread > 0),
+            ('--checkpoint-path', args.checkpoint_path), ('--resume', args.resume),
+            ('--preview-path', args.preview_path))
+        if value]
+    if in_memory_options and args.large_image:
+        raise ValueError('{} not supported with --large-image'.format(' '.join(in_memory_options)))
+    continuous_angle_options = [
+        flag for (flag, value) in (
+            ('--workers', args.workers > 0), ('--pyramid-factor', args.pyramid_factor > 1),
+            ('--orientation-spread', args.orientation_spread > 0))
+        if value]
+    if continuous_angle_options and args.angle_resolution > 0 and args.engine in ('RANDOM', 'NUMBA'):
+        raise ValueError('{} not supported with --angle-resolution'.format(
+            ' '.join(continuous_angle_options)))
+
+
+def draw_image(args, metrics=None):
+    """Redraws input image with lines and writes it to the output path.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        metrics (Metrics, optional): Collects phase timings, counters and the residual
+            error trajectory. Created from args.metrics_out if None. Defaults to None.
+
+    Returns:
+        dict: Summary with computation time, number of lines and final residual error.
+    """
+    check_args(args)
+    start_time = time.perf_counter()
+    if metrics is None and args.metrics_out:
+        metrics = Metrics(error_every=args.metrics_error_every)
+
+    # Initialize random-seed of numpy framework to always get the same output
+    # if no_random_result is set.
+    if args.no_random_result == True:
+        np.random.seed(42)
+
+    # Prepare draw_type enum to remove string comparisson.
+    draw_type = DrawType[str.upper(args.draw_type)]
+
+    print('Load and preprocess image...')
+    work_dir = None
+    if args.color:
+        img_arr = load_color_image(args.input_path, args.output_width)
+        target_arr = img_arr.copy()
+    elif args.large_image:
+        # Residual and target image are kept on disk.
+        import tempfile
+
+        work_dir = tempfile.TemporaryDirectory(dir=args.work_dir or None)
+        img_arr = load_image_memmap(
+            args.input_path, args.output_width, os.path.join(work_dir.name, 'residual.dat'),
+            args.stripe_rows)
+        target_arr = np.memmap(os.path.join(work_dir.name, 'target.dat'),
+                               dtype=np.int16, mode='w+', shape=img_arr.shape)
+        target_arr[:] = img_arr
+    else:
+        img_arr = load_image(args.input_path, args.output_width)
+        target_arr = img_arr.copy()
+
+    if metrics is not None:
+        metrics.lap('loading')
+        if metrics.error_function is None:
+            metrics.error_function = lambda: residual_error(target_arr, img_arr, draw_type)
+
+    line_table = None
+    line_ids = []
+    line_channels = None
+
+    if args.color:
+        lines, line_ids, line_channels, line_table = compute_color_lines(
+            args, img_arr, draw_type, args.channel_jobs)
+        if metrics is not None:
+            metrics.lap('channel_search')
+    elif args.engine == 'PINS':
+        from pins import PinLayout, compute_pin_lines
+
+        pin_sequence = []
+        lines = compute_pin_lines(
+            img_arr, args.num_lines, draw_type == DrawType.ADDITIVE, args.line_heaviness,
+            args.num_pins, PinLayout[args.pin_layout], args.pin_min_gap, pin_sequence)
+
+        if args.pin_sequence_path:
+            print('Write pin sequence to {}'.format(args.pin_sequence_path))
+            with open(args.pin_sequence_path, 'w', encoding='utf-8') as file:
+                file.write('\n'.join(str(pin) for pin in pin_sequence) + '\n')
+        if metrics is not None:
+            metrics.lap('pin_search')
+    elif args.engine == 'RADON':
+        from radon import compute_radon_lines
+
+        line_table = _line_table_for(args, img_arr.shape)
+        if metrics is not None:
+            metrics.lap('setup')
+
+        lines = compute_radon_lines(
+            img_arr, args.num_lines, draw_type == DrawType.ADDITIVE, args.line_heaviness,
+            line_table, args.radon_min_length, line_ids)
+        if metrics is not None:
+            metrics.lap('radon_search')
+    else:
+        line_table = _line_table_for(args, img_arr.shape)
+        if metrics is not None:
+            metrics.lap('setup')
+
+        lines = _stream_image_lines(
+            args, img_arr, target_arr, draw_type, line_table, line_ids, metrics)
+        if metrics is not None:
+            metrics.lap('caller')
+
+    # Point pairs take about 200 bytes per line, the array 16 bytes.
+    lines = lines_to_array(lines)
+    if args.lines_path:
+        print('Write lines to {}'.format(args.lines_path))
+        save_lines(args.lines_path, lines, img_arr.shape, {
+            'draw_type': draw_type.name,
+            'line_heaviness': args.line_heaviness,
+            'stroke_width': args.stroke_width,
+            'seed': 42 if args.no_random_result else None,
+            'engine': args.engine,
+            'input_path': args.input_path,
+            'angle_resolution': line_table.num_angles if line_table is not None else 0,
+        }, line_channels, line_ids if line_table is not None else None)
+
+    if args.large_image and args.output_format == 'PNG':
+        print('Write image stripe by stripe to {}'.format(args.output_path))
+        draw_line_image_striped(lines, img_arr.shape, draw_type, args.output_path, work_dir.name,
+                                args.line_heaviness, args.stripe_rows)
+    else:
+        write_output(lines, img_arr.shape[:2], draw_type, args, args.output_path, args.output_format,
+                     line_table, line_ids, line_channels)
+    if metrics is not None:
+        metrics.lap('output_encoding')
+
+    summary = {
+        'input_path': args.input_path,
+        'output_path': args.output_path,
+        'time': time.perf_counter() - start_time,
+        'lines': len(lines),
+        'residual_error': residual_error(target_arr, img_arr, draw_type),
+    }
+
+    if metrics is not None and args.metrics_out:
+        print('Write metrics to {}'.format(args.metrics_out))
+        metrics.save(args.metrics_out)
+
+    if work_dir is not None:
+        del img_arr, target_arr
+        work_dir.cleanup()
+
+    return summary
+
+
+def scale_lines(lines, scale, image_shape):
+    """Maps lines to an image scaled by scale, pixel center to pixel center.
+
+    Args:
+        lines (np.array): (N, 4) array of x1, y1, x2, y2.
+        scale (float): Scale factor.
+        image_shape (tuple(int)): Shape of the scaled image.
+
+    Returns:
+        np.array: (N, 4) int32 array of scaled lines inside the scaled image.
+    """
+    (height, width) = image_shape
+    scaled = np.rint((lines + 0.5) * scale - 0.5)
+    return np.clip(scaled, 0, (width - 1, height - 1, width - 1, height - 1)).astype(np.int32)
+
+
+def render_lines(args):
+    """Renders a line file of --lines-path as PNG or SVG without searching lines again.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments of the render command.
+
+    Returns:
+        dict: Summary with render time and number of lines.
+    """
+    start_time = time.perf_counter()
+    lines, metadata, line_channels, line_ids = load_lines(args.lines_path)
+    draw_type = DrawType[metadata['draw_type']]
+    line_heaviness = args.line_heaviness if args.line_heaviness > 0 else metadata['line_heaviness']
+    stroke_width = args.stroke_width if args.stroke_width > 0 else metadata['stroke_width']
+
+    output_format = args.output_format
+    if not output_format:
+        output_format = 'SVG' if args.output_path.lower().endswith(('.svg', '.svgz')) else 'PNG'
+
+    if output_format == 'SVG':
+        print('Write SVG to {}'.format(args.output_path))
+        write_line_svg(lines, metadata['width'], metadata['height'], draw_type, args.output_path,
+                       stroke_width, args.svg_precision, line_channels, args.scale)
+    elif args.antialias:
+        from print_render import render_tiled_png
+
+        print('Write image to {}'.format(args.output_path))
+        render_tiled_png(lines, (metadata['height'], metadata['width']), args.scale,
+                         draw_type == DrawType.ADDITIVE, args.output_path, line_heaviness,
+                         args.line_width, line_channels, tile_rows=args.tile_rows,
+                         threads=args.threads or None)
+    elif line_ids is not None and args.scale == 1.0:
+        from line_table import LineTable
+
+        # Pixels of line table lines differ slightly from rasterized endpoints.
+        line_table = LineTable.load_or_build(
+            args.raster_cache_dir, metadata['width'], metadata['height'], metadata['angle_resolution'])
+        output_image_arr = draw_line_image(
+            lines, (metadata['height'], metadata['width']), draw_type, line_heaviness, line_table,
+            line_ids, line_channels)
+        print('Write image to {}'.format(args.output_path))
+        Image.fromarray(output_image_arr).save(args.output_path)
+    else:
+        image_shape = (max(int(round(metadata['height'] * args.scale)), 1),
+                       max(int(round(metadata['width'] * args.scale)), 1))
+        output_image_arr = draw_line_image(
+            scale_lines(lines, args.scale, image_shape), image_shape, draw_type, line_heaviness,
+            line_channels=line_channels)
+        print('Write image to {}'.format(args.output_path))
+        Image.fromarray(output_image_arr).save(args.output_path)
+
+    return {'time': time.perf_counter() - start_time, 'lines': lines.shape[0]}
+
+
+def render_main(args):
+    summary = render_lines(args)
+    print('Rendered {} lines in {:.3f}s'.format(summary['lines'], summary['time']))
+
+
+def main(args):
+    if args.verbose:
+        print('Cold start: {:.3f}s imports, {:.3f}s until main'.format(
+            IMPORT_SECONDS, time.perf_counter() - _IMPORT_START))
+    print(LOGO)
+    print_input_params(args)
+
+    if args.no_random_result == True:
+        print("No random result setting activated.")
+
+    if str.upper(args.draw_type) not in DrawType.__members__:
+        print("Error: draw_type <{}> not supported".format(args.draw_type))
+        sys.exit()
+
+    if args.engine == 'NUMBA':
+        from jit_engine import AVAILABLE
+
+        if not AVAILABLE:
+            print("Numba is not installed, falling back to the RANDOM engine.")
+
+    # Options which do not fit together or to the image, see check_args() and the engines.
+    try:
+        summary = draw_image(args)
+    except ValueError as error:
+        print("Error: {}".format(error))
+        sys.exit()
+    print('Finished {} lines in {:.2f}s with residual error {:.1f}'.format(
+        summary['lines'], summary['time'], summary['residual_error']))
+
+
+def build_arg_parser():
     parser = argparse.ArgumentParser(
         description='line_drawer - Redraws image only with straight lines.')
 
@@ -322,7 +1358,116 @@ if __name__ == "__main__":
                         help='Output image format - SVG or PNG')
     parser.add_argument('--stroke-width', type=float, default=0.1,
                         help='SVG stroke width')
+    parser.add_argument('--svg-precision', type=int, default=0,
+                        help='Decimal places of SVG coordinates, 0 writes integers. Output is gzip compressed if path ends with .svgz.')
+    parser.add_argument('--angle-resolution', type=int, default=0,
+                        help='Number of quantized line angles over 180 degrees. Lines are taken from a precomputed line table if set, which --workers, --pyramid-factor and --orientation-spread do not support. "0" uses continuous angles.')
+    parser.add_argument('--engine', type=str.upper, default='RANDOM', choices=['RANDOM', 'NUMBA', 'PINS', 'RADON'],
+                        help='Line search engine. RANDOM searches random lines through the darkest/brightest pixel. NUMBA finds the same lines as RANDOM in loops compiled by Numba and falls back to RANDOM if Numba is not installed. PINS spans a thread between fixed pins like in string art. RADON draws the line of all quantized lines which lowers the error most.')
+    parser.add_argument('--radon-min-length', type=int, default=20,
+                        help='Ignore lines shorter than this many pixels in the RADON engine.')
+    parser.add_argument('--num-pins', type=int, default=300,
+                        help='Number of pins for the PINS engine.')
+    parser.add_argument('--pin-layout', type=str.upper, default='CIRCLE', choices=['CIRCLE', 'BORDER'],
+                        help='Pin placement for the PINS engine - on the inscribed circle or on the image border.')
+    parser.add_argument('--pin-min-gap', type=int, default=10,
+                        help='Skip chords between pins which are closer than this number of pins.')
+    parser.add_argument('--pin-sequence-path', type=str, default='',
+                        help='Write visited pins of the PINS engine to this text file.')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Number of worker processes scoring candidate lines of the RANDOM engine. Without --lines-per-round every line costs a round trip to each worker, which is usually slower than scoring in the main process, so combine it with --lines-per-round to hand every worker several pixels per round. "0" scores in the main process.')
+    parser.add_argument('--pyramid-factor', type=int, default=1,
+                        help='Score candidate lines first on an image downsampled by this factor. "1" scores on the full image only.')
+    parser.add_argument('--pyramid-refine', type=int, default=3,
+                        help='Number of best downsampled candidates scored again on the full image.')
+    parser.add_argument('--lines-per-round', type=int, default=1,
+                        help='Accept up to this many lines through different darkest/brightest pixels per search round. With --workers the pixels of a round are split across the workers. Not used with --pyramid-factor and --angle-resolution.')
+    parser.add_argument('--color', action='store_true',
+                        help='Draw colored lines per color channel, cyan, magenta and yellow with subtractive and red, green and blue with additive draw type. --num-lines is the number of lines per channel. Checkpoints, previews, stopping criteria, --workers and --large-image are rejected and --metrics-out only records phase timings.')
+    parser.add_argument('--channel-jobs', type=int, default=3,
+                        help='Number of processes computing the color channels of --color in parallel. "1" computes them one after another.')
+    parser.add_argument('--large-image', action='store_true',
+                        help='Keep residual image in a memory-mapped file and write PNG output stripe by stripe for images which do not fit into memory. --workers, --pyramid-factor, --lines-per-round, --orientation-spread, checkpoints and previews hold full-size arrays in memory and are rejected.')
+    parser.add_argument('--work-dir', type=str, default='',
+                        help='Directory for temporary files of --large-image. Defaults to the system temp directory.')
+    parser.add_argument('--stripe-rows', type=int, default=256,
+                        help='Number of image rows processed at once with --large-image.')
+    parser.add_argument('--checkpoint-path', type=str, default='',
+                        help='Write residual image, random state and lines so far to this .npz file.')
+    parser.add_argument('--checkpoint-every', type=int, default=1000,
+                        help='Write a checkpoint every this many lines.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue from the checkpoint at --checkpoint-path if it exists.')
+    parser.add_argument('--preview-path', type=str, default='',
+                        help='Write intermediate PNG or SVG previews (by file extension) to this path.')
+    parser.add_argument('--preview-every', type=int, default=1000,
+                        help='Write a preview every this many lines.')
+    parser.add_argument('--target-error', type=float, default=0.0,
+                        help='Stop drawing lines once the mean squared error to the input image reaches this value. "0" disables it.')
+    parser.add_argument('--min-improvement', type=float, default=0.0,
+                        help='Stop drawing lines once the relative error improvement over --min-improvement-window lines is smaller, e.g. 0.01. "0" disables it.')
+    parser.add_argument('--min-improvement-window', type=int, default=200,
+                        help='Number of lines over which --min-improvement is measured.')
+    parser.add_argument('--time-budget', type=float, default=0.0,
+                        help='Seconds available for the line search. num-lines-to-check is lowered on the fly to fit all lines into the budget and drawing stops when it is used up. "0" disables it.')
+    parser.add_argument('--metrics-out', type=str, default='',
+                        help='Write per-phase timings, counters and residual error trajectory as JSON, or CSV if path ends with .csv.')
+    parser.add_argument('--metrics-error-every', type=int, default=100,
+                        help='Record the residual error for --metrics-out every this many lines. 0 disables it.')
+    parser.add_argument('--lines-path', type=str, default='',
+                        help='Also write the found lines with draw type and line heaviness to this .npz/.lines file, which the render command turns into PNG or SVG again.')
+    parser.add_argument('--raster-cache-dir', type=str,
+                        default=os.path.join(os.path.expanduser('~'), '.cache', 'line_drawer'),
+                        help='Directory where precomputed line tables are stored.')
+    parser.add_argument('--orientation-spread', type=float, default=0.0,
+                        help='Draw candidate angles of the RANDOM engine with this standard deviation in radians around the direction the dark (additive: bright) areas around the pixel are elongated in, instead of uniformly. "0" disables it.')
+    parser.add_argument('--orientation-scale', type=float, default=0.125,
+                        help='Size of the window the orientation is computed over, as standard deviation relative to the image width.')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print the cold start time spent on imports and argument parsing.')
+
+    return parser
+
+
+def build_render_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='line_drawer.py render',
+        description='line_drawer render - Draws lines of a --lines-path file as PNG or SVG.')
+
+    parser.add_argument('lines_path', type=str,
+                        help='Line file written with --lines-path.')
+    parser.add_argument('--output-path', type=str, default='./output.png',
+                        help='Output image path.')
+    parser.add_argument('--output-format', type=str.upper, default='', choices=['', 'PNG', 'SVG'],
+                        help='Output image format - SVG or PNG. Derived from the output path if empty.')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Output size relative to the size the lines were computed for.')
+    parser.add_argument('--line-heaviness', type=int, default=0,
+                        help='Line heaviness of PNG output. "0" uses the value of the line file.')
+    parser.add_argument('--antialias', action='store_true',
+                        help='Render PNG output with anti-aliased lines which are --line-width times --scale pixels wide, tile by tile on a thread pool and streamed into the file, so prints far larger than the computed image fit into memory.')
+    parser.add_argument('--line-width', type=float, default=1.0,
+                        help='Line width of --antialias in pixels of the computed image.')
+    parser.add_argument('--tile-rows', type=int, default=256,
+                        help='Number of output rows rendered at once per thread with --antialias.')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='Number of threads rendering tiles with --antialias. "0" uses all CPUs.')
+    parser.add_argument('--stroke-width', type=float, default=0.0,
+                        help='SVG stroke width. "0" uses the value of the line file.')
+    parser.add_argument('--svg-precision', type=int, default=0,
+                        help='Decimal places of SVG coordinates, 0 writes integers.')
+    parser.add_argument('--raster-cache-dir', type=str,
+                        default=os.path.join(os.path.expanduser('~'), '.cache', 'line_drawer'),
+                        help='Directory where precomputed line tables are stored.')
+
+    return parser
+
 
-    args = parser.parse_args()
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'render':
+        render_main(build_render_arg_parser().parse_args(sys.argv[2:]))
+    else:
+        parser = build_arg_parser()
+        args = parser.parse_args()
 
-    main(args)
+        main(args)
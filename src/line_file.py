@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+
+from geometry import PointInt
+
+# Version of the line file layout, stored in the metadata.
+LINE_FILE_VERSION = 1
+
+
+def lines_to_array(lines):
+    """Converts list of point pairs to an (N, 4) int32 array of x1, y1, x2, y2.
+
+    Arrays are returned unchanged apart from the dtype.
+    """
+    if isinstance(lines, np.ndarray):
+        return lines.astype(np.int32, copy=False).reshape(-1, 4)
+    return np.array([(p1.x, p1.y, p2.x, p2.y) for p1, p2 in lines], dtype=np.int32).reshape(-1, 4)
+
+
+def lines_from_array(array):
+    """Converts an (N, 4) array of x1, y1, x2, y2 to a list of point pairs."""
+    return [(PointInt(x_1, y_1), PointInt(x_2, y_2))
+            for (x_1, y_1, x_2, y_2) in np.asarray(array).tolist()]
+
+
+def save_lines(path, lines, image_shape, metadata=None, line_channels=None, line_ids=None):
+    """Writes lines with metadata as compact .npz file.
+
+    Coordinates are stored as int16 if they fit, otherwise as int32, so a
+    line takes 8 or 16 bytes.
+
+    Args:
+        path (str): Output path, e.g. lines.npz or lines.lines.
+        lines (list or np.array): List of point pairs or (N, 4) array of x1, y1, x2, y2.
+        image_shape (tuple(int)): Image shape the lines were computed for.
+        metadata (dict, optional): JSON serializable settings like draw type and line
+            heaviness. Defaults to None.
+        line_channels (list, optional): Color channel of every line. Defaults to None.
+        line_ids (list, optional): Line table ids of the lines. Lines of a line table
+            are rendered exactly from it if given. Defaults to None.
+    """
+    array = lines_to_array(lines)
+    if array.size == 0 or (np.min(array) >= np.iinfo(np.int16).min and
+                           np.max(array) <= np.iinfo(np.int16).max):
+        array = array.astype(np.int16)
+
+    metadata = dict(metadata or {})
+    metadata.update(version=LINE_FILE_VERSION, height=int(image_shape[0]),
+                    width=int(image_shape[1]))
+    arrays = {'lines': array, 'metadata': np.array(json.dumps(metadata, sort_keys=True))}
+    if line_channels is not None:
+        arrays['channels'] = np.asarray(line_channels, dtype=np.uint8)
+    if line_ids is not None:
+        arrays['line_ids'] = np.asarray(line_ids, dtype=np.int32)
+
+    # np.savez appends .npz to paths with other extensions, a file object keeps the path.
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(temp_path, path)
+
+
+def load_lines(path):
+    """Loads lines written by save_lines().
+
+    Args:
+        path (str): Line file path.
+
+    Returns:
+        (np.array, dict, np.array, np.array): (N, 4) int32 array of x1, y1, x2, y2,
+        metadata with at least height and width, color channel per line or None
+        and line table ids or None.
+    """
+    with np.load(path) as line_file:
+        metadata = json.loads(str(line_file['metadata']))
+        if metadata.get('version') != LINE_FILE_VERSION:
+            raise ValueError('Unsupported line file version {} in {}'.format(
+                metadata.get('version'), path))
+        channels = line_file['channels'] if 'channels' in line_file.files else None
+        line_ids = line_file['line_ids'] if 'line_ids' in line_file.files else None
+        return line_file['lines'].astype(np.int32), metadata, channels, line_ids
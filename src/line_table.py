@@ -0,0 +1,215 @@
+import os
+
+import numpy as np
+
+
+class LineTable:
+    """
+    Precomputed pixels of all border to border lines for a set of quantized angles.
+
+    For every angle the image is split into parallel digital lines with one pixel
+    per step along the major axis. Each pixel belongs to exactly one line per
+    angle, so the line through a pixel is found by arithmetic only. The pixels of
+    all lines are stored compactly as offsets plus one flat int32 index array and
+    are persisted as memory-mapped .npy files keyed by image size and angle
+    resolution.
+    """
+
+    FILES = ('offsets', 'indices', 'endpoints', 'angle_params', 'line_base')
+
+    # Tables opened by load_or_build() in this process, keyed by directory.
+    _opened = {}
+
+    def __init__(self, directory):
+        """Loads a line table from disk as memory-mapped arrays.
+
+        Args:
+            directory (str): Directory of a table written by LineTable.build().
+        """
+        arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+                  for name in self.FILES}
+
+        self.offsets = arrays['offsets']
+        self.indices = arrays['indices']
+        self.endpoints = arrays['endpoints']
+        self.line_base = np.array(arrays['line_base'])
+
+        angle_params = np.array(arrays['angle_params'])
+        self.cos = angle_params[:, 0]
+        self.sin = angle_params[:, 1]
+        self.norm = angle_params[:, 2]
+        self.bin_min = angle_params[:, 3].astype(np.int64)
+
+        self.num_angles = self.cos.shape[0]
+        self.num_lines = self.endpoints.shape[0]
+        self.height, self.width = (int(v) for v in angle_params[0, 4:6])
+
+    @staticmethod
+    def cache_path(cache_dir, width, height, angle_resolution):
+        return os.path.join(cache_dir, 'lines_{}x{}_a{}'.format(width, height, angle_resolution))
+
+    @classmethod
+    def load_or_build(cls, cache_dir, width, height, angle_resolution):
+        """Loads line table from cache directory and builds it first if missing.
+
+        Tables stay open for the lifetime of the process, so repeated calls
+        for the same image size do not touch the disk again.
+
+        Args:
+            cache_dir (str): Cache directory.
+            width (int): Image width.
+            height (int): Image height.
+            angle_resolution (int): Number of quantized angles over 180 degrees.
+
+        Returns:
+            LineTable: Memory-mapped line table.
+        """
+        directory = cls.cache_path(cache_dir, width, height, angle_resolution)
+        if directory in cls._opened and os.path.isdir(directory):
+            return cls._opened[directory]
+        if not os.path.isdir(directory):
+            print('Build line table for {}x{} with {} angles...'.format(
+                width, height, angle_resolution))
+            cls.build(directory, width, height, angle_resolution)
+        cls._opened[directory] = cls(directory)
+        return cls._opened[directory]
+
+    @staticmethod
+    def _angle_params(angle_resolution):
+        # Angles of the line normals. Normalizing with the dominant component
+        # gives exactly one pixel per major axis step and line.
+        angles = np.arange(angle_resolution) * np.pi / angle_resolution
+        cos = np.cos(angles)
+        sin = np.sin(angles)
+        norm = np.maximum(np.abs(cos), np.abs(sin))
+        return cos, sin, norm
+
+    @staticmethod
+    def _bins(xx, yy, cos, sin, norm):
+        return np.floor((xx * cos + yy * sin) / norm + 0.5).astype(np.int64)
+
+    @classmethod
+    def build(cls, directory, width, height, angle_resolution):
+        """Rasterizes all lines and writes the table to directory.
+
+        Args:
+            directory (str): Output directory.
+            width (int): Image width.
+            height (int): Image height.
+            angle_resolution (int): Number of quantized angles over 180 degrees.
+        """
+        import shutil
+        import tempfile
+
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        temp_directory = tempfile.mkdtemp(dir=parent)
+
+        cos, sin, norm = cls._angle_params(angle_resolution)
+        num_pixels = width * height
+        (yy, xx) = np.divmod(np.arange(num_pixels, dtype=np.int64), width)
+        corners_x = np.array([0, width - 1, 0, width - 1])
+        corners_y = np.array([0, 0, height - 1, height - 1])
+
+        indices = np.lib.format.open_memmap(
+            os.path.join(temp_directory, 'indices.npy'), mode='w+',
+            dtype=np.int32, shape=(angle_resolution * num_pixels,))
+
+        all_offsets = [np.zeros(1, dtype=np.int64)]
+        all_endpoints = []
+        bin_min = np.zeros(angle_resolution, dtype=np.int64)
+        line_base = np.zeros(angle_resolution + 1, dtype=np.int64)
+
+        for a in range(angle_resolution):
+            bins = cls._bins(xx, yy, cos[a], sin[a], norm[a])
+            bin_min[a] = np.min(cls._bins(corners_x, corners_y, cos[a], sin[a], norm[a]))
+            num_bins = np.max(bins) - bin_min[a] + 1
+            line_base[a + 1] = line_base[a] + num_bins
+
+            # Order pixels by line and along the major axis of the line direction.
+            if abs(cos[a]) >= abs(sin[a]):
+                major = yy
+            else:
+                major = xx
+            order = np.argsort((bins - bin_min[a]) * max(width, height) + major, kind='stable')
+            indices[a * num_pixels:(a + 1) * num_pixels] = order
+
+            lengths = np.bincount(bins - bin_min[a], minlength=num_bins)
+            ends = np.cumsum(lengths)
+            all_offsets.append(a * num_pixels + ends)
+
+            first = order[np.minimum(ends - lengths, num_pixels - 1)]
+            last = order[np.maximum(ends - 1, 0)]
+            all_endpoints.append(np.stack(
+                (xx[first], yy[first], xx[last], yy[last]), axis=1))
+
+        indices.flush()
+        del indices
+
+        angle_params = np.zeros((angle_resolution, 6))
+        angle_params[:, 0] = cos
+        angle_params[:, 1] = sin
+        angle_params[:, 2] = norm
+        angle_params[:, 3] = bin_min
+        angle_params[:, 4] = height
+        angle_params[:, 5] = width
+
+        np.save(os.path.join(temp_directory, 'offsets.npy'), np.concatenate(all_offsets))
+        np.save(os.path.join(temp_directory, 'endpoints.npy'),
+                np.concatenate(all_endpoints).astype(np.int32))
+        np.save(os.path.join(temp_directory, 'angle_params.npy'), angle_params)
+        np.save(os.path.join(temp_directory, 'line_base.npy'), line_base)
+
+        try:
+            os.rename(temp_directory, directory)
+        except OSError:
+            # Another process was faster building the same table.
+            shutil.rmtree(temp_directory, ignore_errors=True)
+
+    def line_ids(self, angle_indexes, xx, yy):
+        """Returns ids of the lines going through the given pixels.
+
+        Args:
+            angle_indexes (np.array): Index of the quantized angle.
+            xx (np.array): Pixel columns.
+            yy (np.array): Pixel rows.
+
+        Returns:
+            np.array: Line ids.
+        """
+        bins = self._bins(xx, yy, self.cos[angle_indexes],
+                          self.sin[angle_indexes], self.norm[angle_indexes])
+        return self.line_base[angle_indexes] + bins - self.bin_min[angle_indexes]
+
+    def crossing_line_ids(self, xx, yy):
+        """Returns ids of the lines of all angles going through the given pixels.
+
+        Args:
+            xx (np.array): Pixel columns.
+            yy (np.array): Pixel rows.
+
+        Returns:
+            np.array: Line ids with shape (num_angles, number of pixels).
+        """
+        bins = self._bins(xx[np.newaxis, :], yy[np.newaxis, :], self.cos[:, np.newaxis],
+                          self.sin[:, np.newaxis], self.norm[:, np.newaxis])
+        return (self.line_base[:-1] - self.bin_min)[:, np.newaxis] + bins
+
+    def pixels(self, line_ids):
+        """Returns concatenated flat pixel indexes of the given lines.
+
+        Args:
+            line_ids (np.array): Line ids.
+
+        Returns:
+            (np.array, np.array): Flat pixel indexes and the offsets into them.
+        """
+        line_ids = np.atleast_1d(np.asarray(line_ids, dtype=np.int64))
+        starts = np.asarray(self.offsets[line_ids])
+        lengths = np.asarray(self.offsets[line_ids + 1]) - starts
+
+        offsets = np.zeros(line_ids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = np.arange(offsets[-1], dtype=np.int64) + np.repeat(starts - offsets[:-1], lengths)
+
+        return np.asarray(self.indices[positions], dtype=np.int64), offsets
@@ -0,0 +1,89 @@
+import csv
+import json
+import time
+from collections import defaultdict
+
+
+class Metrics:
+    """
+    Collects cumulative per-phase timings, counters and the residual error trajectory.
+
+    Phases are measured as laps: lap(name) adds the time since the previous lap
+    to the phase name. Instrumented code only calls lap() and count() if a
+    Metrics object is given, so disabled instrumentation costs a None check.
+    """
+
+    def __init__(self, callback=None, callback_every=1, error_function=None, error_every=0):
+        """
+        Args:
+            callback (callable, optional): Called as callback(metrics, num_lines) while
+                lines are found. Defaults to None.
+            callback_every (int, optional): Call callback every this many lines. Defaults to 1.
+            error_function (callable, optional): Returns the current residual error.
+                Defaults to None.
+            error_every (int, optional): Record the residual error every this many lines.
+                0 disables the error trajectory. Defaults to 0.
+        """
+        self.callback = callback
+        self.callback_every = callback_every
+        self.error_function = error_function
+        self.error_every = error_every
+
+        self.timings = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.error_trajectory = []
+        self._last_lap = time.perf_counter()
+
+    def lap(self, phase):
+        """Adds the time since the previous lap to phase."""
+        now = time.perf_counter()
+        self.timings[phase] += now - self._last_lap
+        self._last_lap = now
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def line_finished(self, num_lines):
+        """Records the residual error and calls the callback after a line was found.
+
+        Args:
+            num_lines (int): Number of lines found so far.
+        """
+        if self.error_every > 0 and self.error_function is not None and \
+                num_lines % self.error_every == 0:
+            self.lap('caller')
+            self.error_trajectory.append((num_lines, float(self.error_function())))
+            self.lap('error_tracking')
+
+        if self.callback is not None and num_lines % self.callback_every == 0:
+            self.callback(self, num_lines)
+
+    def as_dict(self):
+        return {
+            'timings': dict(self.timings),
+            'counters': dict(self.counters),
+            'error_trajectory': [list(entry) for entry in self.error_trajectory],
+        }
+
+    def save(self, path):
+        """Writes metrics as CSV if path ends with .csv, otherwise as JSON.
+
+        CSV rows are (kind, name, value) with kind timing, counter or error,
+        where name of an error row is the number of lines.
+
+        Args:
+            path (str): Output path.
+        """
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(('kind', 'name', 'value'))
+                for (phase, seconds) in self.timings.items():
+                    writer.writerow(('timing', phase, seconds))
+                for (name, value) in self.counters.items():
+                    writer.writerow(('counter', name, value))
+                for (num_lines, error) in self.error_trajectory:
+                    writer.writerow(('error', num_lines, error))
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(self.as_dict(), file, indent=2)
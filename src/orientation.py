@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+
+from pyramid import CoarseImage
+
+# Largest width of the downsampled image the orientation map is computed on.
+MAP_WIDTH = 256
+
+# Number of box blurs approximating one Gaussian blur.
+BOX_PASSES = 3
+
+
+def _box_blur(image, radius, axis):
+    """Mean over 2 * radius + 1 pixels along axis with edge padding, using cumulative sums."""
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (radius + 1, radius)
+    sums = np.cumsum(np.pad(image, pad, mode='edge'), axis=axis)
+    size = image.shape[axis]
+    upper = np.take(sums, np.arange(2 * radius + 1, 2 * radius + 1 + size), axis=axis)
+    lower = np.take(sums, np.arange(size), axis=axis)
+    return (upper - lower) / (2 * radius + 1)
+
+
+def _smooth(image, sigma):
+    """Approximates a Gaussian blur with standard deviation sigma by repeated box blurs."""
+    radius = max(int(round((math.sqrt(12 * sigma * sigma / BOX_PASSES + 1) - 1) / 2)), 1)
+    for _ in range(BOX_PASSES):
+        image = _box_blur(_box_blur(image, radius, 0), radius, 1)
+    return image
+
+
+class OrientationMap:
+    """
+    Direction in which the ink around every pixel is elongated.
+
+    Ink is the darkness of the image in subtractive mode and its brightness in
+    additive mode. The second moments of the ink within a Gaussian window
+    around a pixel form a tensor whose main axis points along dark (or
+    bright) strokes and areas, which long lines through the pixel should
+    follow. Coherence is 1 for ink along a single direction and 0 for evenly
+    spread ink. The map is computed once on a copy downsampled to at most
+    MAP_WIDTH pixels width.
+    """
+
+    def __init__(self, image, spread, search_max, scale=0.125):
+        """
+        Args:
+            image (np.array): Preprocessed grayscale image.
+            spread (float): Standard deviation in radians of angles drawn around the
+                local orientation.
+            search_max (bool): Bright pixels are ink if set, otherwise dark pixels.
+            scale (float, optional): Standard deviation of the window as part of the
+                image width. Defaults to 0.125.
+        """
+        self.spread = spread
+        self.factor = max(-(-image.shape[1] // MAP_WIDTH), 1)
+        if self.factor > 1:
+            small = CoarseImage(image, self.factor).image
+        else:
+            small = np.asarray(image, dtype=np.float64)
+        small = np.clip(small, 0, 255)
+        ink = small if search_max else 255 - small
+
+        sigma = max(scale * small.shape[1], 1.0)
+        (yy, xx) = np.indices(small.shape, dtype=np.float64)
+        mass = _smooth(ink, sigma) + 1e-9
+        (mean_x, mean_y) = (_smooth(xx * ink, sigma) / mass, _smooth(yy * ink, sigma) / mass)
+
+        # Second moments around the pixel itself in image coordinates.
+        m_xx = _smooth(xx * xx * ink, sigma) / mass - 2 * xx * mean_x + xx * xx
+        m_yy = _smooth(yy * yy * ink, sigma) / mass - 2 * yy * mean_y + yy * yy
+        m_xy = _smooth(xx * yy * ink, sigma) / mass - xx * mean_y - yy * mean_x + xx * yy
+
+        # Mirrored because the y-axis of the geometry library points up.
+        main_axes = -0.5 * np.arctan2(2 * m_xy, m_xx - m_yy)
+        self.angles = ((main_axes + np.pi / 2) % np.pi - np.pi / 2).astype(np.float32)
+
+        coherence = np.sqrt((m_xx - m_yy) ** 2 + 4 * m_xy ** 2) / np.maximum(m_xx + m_yy, 1e-9)
+        self.coherence = np.clip(coherence, 0, 1).astype(np.float32)
+
+    def sample_angles(self, index_y, index_x, count):
+        """Draws candidate angles around the orientation of a pixel.
+
+        Each angle is drawn from a normal distribution around the local
+        orientation with probability coherence, and uniformly otherwise.
+
+        Args:
+            index_y (int): Row of the pixel.
+            index_x (int): Column of the pixel.
+            count (int): Number of angles.
+
+        Returns:
+            np.array: Angles in [-pi/2, pi/2).
+        """
+        (index_y, index_x) = (index_y // self.factor, index_x // self.factor)
+        angles = (np.random.rand(count) - 0.5) * np.pi
+        guided = np.random.rand(count) < self.coherence[index_y, index_x]
+        offsets = self.spread * np.random.randn(count)
+
+        angles[guided] = self.angles[index_y, index_x] + offsets[guided]
+        return (angles + np.pi / 2) % np.pi - np.pi / 2
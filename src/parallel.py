@@ -0,0 +1,184 @@
+import multiprocessing
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from geometry import Point, PointInt
+from scoring import DrawType, find_best_lines_through_pixels, score_lines_through_point
+
+
+def _worker_loop(connection, shared_memory_name, shape, dtype, seed_sequence):
+    """Scores candidate lines on the shared image until None is received.
+
+    Args:
+        connection (Connection): Pipe end to receive jobs and send results.
+        shared_memory_name (str): Name of shared memory holding the image.
+        shape (tuple(int)): Image shape.
+        dtype (np.dtype): Image data type.
+        seed_sequence (np.random.SeedSequence): Seed of the worker's own random stream.
+    """
+    memory = shared_memory.SharedMemory(name=shared_memory_name)
+    image = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    generator = np.random.Generator(np.random.PCG64(seed_sequence))
+
+    try:
+        while True:
+            job = connection.recv()
+            if job is None:
+                break
+
+            (kind, num_lines_to_check, search_max, *targets) = job
+            draw_type = DrawType.ADDITIVE if search_max else DrawType.SUBTRACTIVE
+            if kind == 'point':
+                (x, y) = targets
+                angles = (generator.random(num_lines_to_check) - 0.5) * np.pi
+                best_line, best_mean_value = score_lines_through_point(
+                    angles, Point(x, y), image, draw_type)
+                if best_line is not None:
+                    best_line = (best_line[0].x, best_line[0].y, best_line[1].x, best_line[1].y)
+                connection.send((best_line, float(best_mean_value)))
+            else:
+                (index_ys, index_xs) = targets
+                angles = (generator.random(index_ys.shape[0] * num_lines_to_check) - 0.5) * np.pi
+                connection.send(find_best_lines_through_pixels(
+                    num_lines_to_check, index_ys, index_xs, image, draw_type, angles=angles))
+    finally:
+        del image
+        memory.close()
+
+
+class ParallelLineScorer:
+    """
+    Scores candidate lines on a pool of persistent worker processes.
+
+    The image lives in shared memory, so only the selected pixels and the best
+    lines of each worker are sent between processes. Every worker draws its
+    angles from its own random stream, which keeps the output reproducible for
+    a given seed and number of workers.
+
+    Splitting the candidates of a single pixel costs one pipe round trip per
+    worker and line, which outweighs the scoring for a few candidates.
+    find_best_lines_through_pixels() hands every worker several pixels per
+    round instead.
+    """
+
+    def __init__(self, image, num_workers, seed=None):
+        """
+        Args:
+            image (np.array): Image which is copied into shared memory.
+            num_workers (int): Number of worker processes.
+            seed (int, optional): Seed of the worker random streams. Defaults to None.
+        """
+        self._memory = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        self.image = np.ndarray(image.shape, dtype=image.dtype, buffer=self._memory.buf)
+        self.image[:] = image
+
+        self._connections = []
+        self._processes = []
+        for seed_sequence in np.random.SeedSequence(seed).spawn(num_workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker_loop,
+                args=(worker_connection, self._memory.name, image.shape, image.dtype, seed_sequence),
+                daemon=True)
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def find_best_line_through_point(self, num_lines_to_check, selected_point, search_max):
+        """Find best line through a given point by splitting the candidates across workers.
+
+        Args:
+            num_lines_to_check (int): Number of tries to find best line.
+            selected_point (Point): Point where line needs to go through.
+            search_max (bool): Search brightest line if set, otherwise darkest line.
+
+        Returns:
+            (Point,Point): Point pair representing the best line segment, or None if no
+            candidate line lies inside the image.
+        """
+        num_workers = len(self._connections)
+        counts = [num_lines_to_check // num_workers + (k < num_lines_to_check % num_workers)
+                  for k in range(num_workers)]
+        jobs = [(connection, count) for connection, count in zip(self._connections, counts) if count > 0]
+
+        for connection, count in jobs:
+            connection.send(('point', count, search_max, int(selected_point.x), int(selected_point.y)))
+
+        if search_max:
+            best_mean_value = -sys.float_info.max
+        else:
+            best_mean_value = sys.float_info.max
+        best_line = None
+
+        # Collect results in worker order, so ties are resolved deterministically.
+        for connection, _ in jobs:
+            endpoints, mean_line_intensity = connection.recv()
+            if endpoints is None:
+                continue
+            if (search_max and best_mean_value < mean_line_intensity) or \
+                    (not search_max and best_mean_value > mean_line_intensity):
+                (x_1, y_1, x_2, y_2) = endpoints
+                best_line = (PointInt(x_1, y_1), PointInt(x_2, y_2))
+                best_mean_value = mean_line_intensity
+
+        return best_line, best_mean_value
+
+    def find_best_lines_through_pixels(self, num_lines_to_check, index_ys, index_xs, search_max):
+        """Find best line through each of several pixels by splitting the pixels across workers.
+
+        Every worker scores all candidates of its share of the pixels, so a
+        round costs one pipe round trip per worker, whatever the number of pixels.
+
+        Args:
+            num_lines_to_check (int): Number of tries to find best line per pixel.
+            index_ys (np.array): Rows of pixels where lines need to go through.
+            index_xs (np.array): Columns of pixels where lines need to go through.
+            search_max (bool): Search brightest lines if set, otherwise darkest lines.
+
+        Returns:
+            (np.array, np.array): Integer endpoints with shape (M, 2, 2) in image
+            coordinates and mean intensities of the best line of the M pixels
+            which got a valid line, ordered from best to worst.
+        """
+        shares = np.array_split(np.arange(index_ys.shape[0]), len(self._connections))
+        jobs = [(connection, share) for connection, share in zip(self._connections, shares)
+                if share.shape[0] > 0]
+        for connection, share in jobs:
+            connection.send(('pixels', num_lines_to_check, search_max, index_ys[share], index_xs[share]))
+
+        results = [connection.recv() for connection, _ in jobs]
+        endpoints = np.concatenate([result[0].reshape(-1, 2, 2) for result in results])
+        mean_line_intensities = np.concatenate([result[1] for result in results])
+
+        # Stable sort over results in worker order, so ties are resolved deterministically.
+        order = np.argsort(-mean_line_intensities if search_max else mean_line_intensities, kind='stable')
+        return endpoints[order], mean_line_intensities[order]
+
+    def close(self):
+        """Stops all workers and releases the shared memory, also if a worker died."""
+        try:
+            for connection in self._connections:
+                try:
+                    connection.send(None)
+                except ConnectionError:
+                    # The worker is gone already.
+                    pass
+            for process in self._processes:
+                process.join()
+        finally:
+            self._connections = []
+            self._processes = []
+
+            if self._memory is not None:
+                del self.image
+                self._memory.close()
+                self._memory.unlink()
+                self._memory = None
@@ -0,0 +1,187 @@
+from enum import Enum
+
+import numpy as np
+
+from geometry import PointInt
+from raster import line_segments
+
+# Number of chords rasterized at once while building the chord table.
+CHORD_CHUNK_SIZE = 4096
+
+
+class PinLayout(Enum):
+    BORDER = 1
+    CIRCLE = 2
+
+
+def pin_positions(num_pins, width, height, layout):
+    """Places pins evenly on the image border or on the inscribed circle.
+
+    Args:
+        num_pins (int): Number of pins.
+        width (int): Image width.
+        height (int): Image height.
+        layout (PinLayout): Enum for pin layout.
+
+    Returns:
+        (np.array, np.array): Columns and rows of all pins.
+    """
+    if layout == PinLayout.CIRCLE:
+        angles = np.arange(num_pins) * 2.0 * np.pi / num_pins
+        radius = (min(width, height) - 1) / 2.0
+        xx = np.rint((width - 1) / 2.0 + radius * np.cos(angles))
+        yy = np.rint((height - 1) / 2.0 + radius * np.sin(angles))
+        return xx.astype(np.int64), yy.astype(np.int64)
+
+    # Walk clockwise along the border starting at the top left corner.
+    w, h = (width - 1, height - 1)
+    distances = np.arange(num_pins) * 2.0 * (w + h) / num_pins
+    xx = np.select(
+        [distances < w, distances < w + h, distances < 2 * w + h],
+        [distances, w, 2 * w + h - distances], 0.0)
+    yy = np.select(
+        [distances < w, distances < w + h, distances < 2 * w + h],
+        [0.0, distances - w, h], 2 * (w + h) - distances)
+    return np.rint(xx).astype(np.int64), np.rint(yy).astype(np.int64)
+
+
+class ChordTable:
+    """
+    Pixels and running line sums of all chords between a fixed set of pins.
+
+    Pixels of each chord are stored as offsets plus a flat index array. An
+    inverted index from pixel to chords allows to update the sums of all chords
+    crossing a freshly drawn chord without rasterizing anything again.
+    """
+
+    def __init__(self, image, pins_x, pins_y):
+        """
+        Args:
+            image (np.array): Image as np.array.
+            pins_x (np.array): Pin columns.
+            pins_y (np.array): Pin rows.
+        """
+        num_pins = pins_x.shape[0]
+        self.width = image.shape[1]
+
+        (pins_a, pins_b) = np.triu_indices(num_pins, k=1)
+        self.chord_pins = np.stack((pins_a, pins_b), axis=1)
+        self.chord_ids = np.full((num_pins, num_pins), -1, dtype=np.int64)
+        self.chord_ids[pins_a, pins_b] = np.arange(pins_a.shape[0])
+        self.chord_ids[pins_b, pins_a] = np.arange(pins_a.shape[0])
+
+        all_indices = []
+        all_lengths = []
+        for start in range(0, pins_a.shape[0], CHORD_CHUNK_SIZE):
+            chunk_a = pins_a[start:start + CHORD_CHUNK_SIZE]
+            chunk_b = pins_b[start:start + CHORD_CHUNK_SIZE]
+            yy, xx, offsets = line_segments(
+                pins_y[chunk_a], pins_x[chunk_a], pins_y[chunk_b], pins_x[chunk_b])
+            all_indices.append((yy * self.width + xx).astype(np.int32))
+            all_lengths.append(np.diff(offsets))
+
+        self.indices = np.concatenate(all_indices)
+        self.lengths = np.concatenate(all_lengths)
+        self.offsets = np.zeros(self.lengths.shape[0] + 1, dtype=np.int64)
+        np.cumsum(self.lengths, out=self.offsets[1:])
+
+        # Inverted index: chords crossing each pixel.
+        order = np.argsort(self.indices, kind='stable')
+        self.pixel_chords = np.repeat(
+            np.arange(self.lengths.shape[0], dtype=np.int32), self.lengths)[order]
+        self.pixel_offsets = np.zeros(image.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=image.size), out=self.pixel_offsets[1:])
+
+        self.sums = np.add.reduceat(
+            image.reshape(-1)[self.indices].astype(np.int64), self.offsets[:-1])
+
+    def chord_pixels(self, chord_id):
+        return self.indices[self.offsets[chord_id]:self.offsets[chord_id + 1]]
+
+    def accumulate(self, image, chord_id, delta):
+        """Adds delta to the image along a chord and updates all chord sums.
+
+        Args:
+            image (np.array): Image as np.array.
+            chord_id (int): Chord to draw.
+            delta (int): Value to add.
+        """
+        flat_indexes = self.chord_pixels(chord_id)
+        image.reshape(-1)[flat_indexes] += delta
+
+        starts = self.pixel_offsets[flat_indexes]
+        lengths = self.pixel_offsets[flat_indexes + 1] - starts
+        positions = np.arange(np.sum(lengths)) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        crossing_chords = self.pixel_chords[positions]
+        self.sums += delta * np.bincount(crossing_chords, minlength=self.sums.shape[0])
+
+
+def compute_pin_lines(image, num_lines, search_max, line_heaviness, num_pins,
+                      layout=PinLayout.CIRCLE, min_pin_gap=10, pin_sequence=None):
+    """Computes lines of a single thread going from pin to pin like in string art.
+
+    Args:
+        image (np.array): Image as numpy array.
+        num_lines (int): Number of lines to draw.
+        search_max (bool): Search brightest chords if set, otherwise darkest chords.
+        line_heaviness (int): Line heaviness. Subtracted from the image if search_max is set.
+        num_pins (int): Number of pins.
+        layout (PinLayout, optional): Enum for pin layout. Defaults to PinLayout.CIRCLE.
+        min_pin_gap (int, optional): Skip chords to pins closer than this along the pins. Defaults to 10.
+        pin_sequence (list, optional): Gets visited pins appended. Defaults to None.
+
+    Returns:
+        list(): List of point pairs
+
+    Raises:
+        ValueError: If num_pins is too small for min_pin_gap to reach two pins from every pin.
+    """
+    from tqdm import tqdm
+
+    if num_pins < 2 * max(min_pin_gap, 1) + 1:
+        raise ValueError('{} pins are too few for a minimal pin gap of {}, use at least {} pins.'.format(
+            num_pins, min_pin_gap, 2 * max(min_pin_gap, 1) + 1))
+
+    (image_height, image_width) = image.shape
+    pins_x, pins_y = pin_positions(num_pins, image_width, image_height, layout)
+
+    print('Build chord table for {} pins...'.format(num_pins))
+    chord_table = ChordTable(image, pins_x, pins_y)
+
+    # Pins which can not be reached from a pin, because they are too close.
+    pin_range = np.arange(num_pins)
+    gaps = np.abs(pin_range[:, np.newaxis] - pin_range[np.newaxis, :])
+    too_close = np.minimum(gaps, num_pins - gaps) < max(min_pin_gap, 1)
+
+    delta = -line_heaviness if search_max else line_heaviness
+    list_of_lines = []
+    current_pin = 0
+    previous_pin = -1
+    if pin_sequence is not None:
+        pin_sequence.append(current_pin)
+
+    for _ in tqdm(range(num_lines), desc='Calculating line: '):
+        candidate_ids = chord_table.chord_ids[current_pin]
+        scores = chord_table.sums[candidate_ids] / chord_table.lengths[candidate_ids]
+
+        excluded = too_close[current_pin].copy()
+        if previous_pin >= 0:
+            excluded[previous_pin] = True
+        if search_max:
+            scores[excluded] = -np.inf
+            next_pin = int(np.argmax(scores))
+        else:
+            scores[excluded] = np.inf
+            next_pin = int(np.argmin(scores))
+
+        chord_table.accumulate(image, candidate_ids[next_pin], delta)
+
+        list_of_lines.append((
+            PointInt(int(pins_x[current_pin]), int(pins_y[current_pin])),
+            PointInt(int(pins_x[next_pin]), int(pins_y[next_pin]))))
+        if pin_sequence is not None:
+            pin_sequence.append(next_pin)
+
+        previous_pin, current_pin = (current_pin, next_pin)
+
+    return list_of_lines
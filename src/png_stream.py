@@ -0,0 +1,81 @@
+import struct
+import zlib
+
+import numpy as np
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+COLOR_TYPES = {1: 0, 3: 2}
+
+
+class PngStreamWriter:
+    """
+    Writes a PNG file row stripe by row stripe.
+
+    Only the compressor state and the current stripe are kept in memory, so the
+    image size is not limited by the available memory.
+    """
+
+    def __init__(self, path, width, height, channels=1, compression_level=6):
+        """
+        Args:
+            path (str): Output path.
+            width (int): Image width.
+            height (int): Image height.
+            channels (int, optional): 1 for grayscale or 3 for RGB. Defaults to 1.
+            compression_level (int, optional): zlib compression level. Defaults to 6.
+        """
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compression_level)
+        self._file = open(path, 'wb')
+
+        self._file.write(PNG_SIGNATURE)
+        self._write_chunk(b'IHDR', struct.pack(
+            '>IIBBBBB', width, height, 8, COLOR_TYPES[channels], 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # Keep the original error instead of the one about missing rows.
+            self._file.close()
+            return
+        self.close()
+
+    def _write_chunk(self, chunk_type, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
+
+    def write_rows(self, rows):
+        """Appends rows to the image.
+
+        Args:
+            rows (np.array): uint8 array with shape (N, width) or (N, width, 3).
+        """
+        rows = np.asarray(rows, dtype=np.uint8).reshape(rows.shape[0], -1)
+        # Every row starts with filter type 0 (no filter).
+        filtered = np.zeros((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 1:] = rows
+
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            self._write_chunk(b'IDAT', data)
+        self.rows_written += rows.shape[0]
+
+    def close(self):
+        """Finishes the PNG file."""
+        if self._file.closed:
+            return
+
+        if self.rows_written != self.height:
+            self._file.close()
+            raise ValueError('PNG expects {} rows but got {}.'.format(self.height, self.rows_written))
+
+        self._write_chunk(b'IDAT', self._compressor.flush())
+        self._write_chunk(b'IEND', b'')
+        self._file.close()
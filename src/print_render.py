@@ -0,0 +1,200 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from png_stream import PngStreamWriter
+
+# Rows rendered per tile.
+TILE_ROWS = 256
+
+# Pixel candidates evaluated at once, which bounds the memory per thread.
+BATCH_PIXELS = 1 << 20
+
+
+def scale_line_coordinates(lines, scale):
+    """Maps lines to an image scaled by scale, pixel center to pixel center, without rounding.
+
+    Args:
+        lines (np.array): (N, 4) array of x1, y1, x2, y2.
+        scale (float): Scale factor.
+
+    Returns:
+        np.array: (N, 4) float64 array of scaled lines.
+    """
+    return (np.asarray(lines, dtype=np.float64).reshape(-1, 4) + 0.5) * scale - 0.5
+
+
+def _major_ranges(lines, row_start, row_end, width, reach):
+    """Major axis steps of every line which can touch the rows of a tile.
+
+    Lines are walked along their major axis. Per step, all pixels within
+    reach of the line along the minor axis are candidates.
+
+    Returns:
+        tuple: Steep mask, major axis start, slope, minor axis start, first and
+        last step and minor axis reach per line.
+    """
+    (x_1, y_1, x_2, y_2) = lines.T
+    steep = np.abs(y_2 - y_1) > np.abs(x_2 - x_1)
+    (major_1, major_2) = (np.where(steep, y_1, x_1), np.where(steep, y_2, x_2))
+    (minor_1, minor_2) = (np.where(steep, x_1, y_1), np.where(steep, x_2, y_2))
+
+    # Walk every line from its smaller major axis end.
+    swap = major_2 < major_1
+    (major_1, major_2) = (np.where(swap, major_2, major_1), np.where(swap, major_1, major_2))
+    (minor_1, minor_2) = (np.where(swap, minor_2, minor_1), np.where(swap, minor_1, minor_2))
+    length = major_2 - major_1
+    slope = np.divide(minor_2 - minor_1, length, out=np.zeros_like(length), where=length > 0)
+    minor_reach = reach * np.sqrt(1 + slope * slope)
+
+    first = np.floor(major_1 - reach)
+    last = np.ceil(major_2 + reach)
+    # Steep lines step through rows, flat lines through columns.
+    first = np.maximum(first, np.where(steep, row_start, 0))
+    last = np.minimum(last, np.where(steep, row_end - 1, width - 1))
+
+    # Flat lines only need the columns where they pass the rows of the tile.
+    flat = ~steep & (slope != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bound_1 = major_1 + (row_start - minor_reach - 1 - minor_1) / slope
+        bound_2 = major_1 + (row_end + minor_reach - minor_1) / slope
+    first = np.where(flat, np.maximum(first, np.floor(np.minimum(bound_1, bound_2))), first)
+    last = np.where(flat, np.minimum(last, np.ceil(np.maximum(bound_1, bound_2))), last)
+
+    return steep, major_1, slope, minor_1, first.astype(np.int64), last.astype(np.int64), minor_reach
+
+
+def render_tile(lines, row_start, row_end, width, line_width=1.0):
+    """Sums the anti-aliased coverage of lines over the rows of one tile.
+
+    A pixel is covered by a line of width w with the box filtered area
+    clip((w + 1) / 2 - d, 0, min(w, 1)), where d is the distance of the pixel
+    center to the line segment. Every line puts w units of coverage per
+    unit of length, independent of its angle.
+
+    Args:
+        lines (np.array): (N, 4) float64 lines in output pixel coordinates.
+        row_start (int): First row of the tile.
+        row_end (int): Row after the last row of the tile.
+        width (int): Image width.
+        line_width (float, optional): Line width in output pixels. Defaults to 1.0.
+
+    Returns:
+        np.array: float64 coverage with shape (row_end - row_start, width).
+    """
+    num_rows = row_end - row_start
+    coverage = np.zeros(num_rows * width)
+    reach = (line_width + 1) / 2
+    if lines.shape[0] == 0:
+        return coverage.reshape(num_rows, width)
+
+    (steep, major_1, slope, minor_1, first, last, minor_reach) = _major_ranges(
+        lines, row_start, row_end, width, reach)
+    num_steps = np.maximum(last - first + 1, 0)
+    num_minor = int(np.ceil(2 * np.max(minor_reach))) + 2
+    offsets = np.arange(num_minor)
+
+    # Split lines into batches of about BATCH_PIXELS candidates.
+    batch_ids = np.maximum(np.cumsum(num_steps) - 1, 0) // max(BATCH_PIXELS // num_minor, 1)
+    batch_bounds = np.concatenate([[0], np.flatnonzero(np.diff(batch_ids)) + 1, [lines.shape[0]]])
+    for (batch_start, batch_end) in zip(batch_bounds[:-1], batch_bounds[1:]):
+        selected = slice(batch_start, batch_end)
+        counts = num_steps[selected]
+        if counts.sum() == 0:
+            continue
+        line_indexes = np.repeat(np.arange(counts.shape[0]), counts)
+        majors = (np.repeat(first[selected], counts)
+                  + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+
+        centers = minor_1[selected][line_indexes] + (majors - major_1[selected][line_indexes]) * \
+            slope[selected][line_indexes]
+        minors = np.floor(centers - minor_reach[selected][line_indexes])[:, np.newaxis] + offsets
+        majors = np.broadcast_to(majors[:, np.newaxis], minors.shape)
+
+        is_steep = steep[selected][line_indexes][:, np.newaxis]
+        xx = np.where(is_steep, minors, majors)
+        yy = np.where(is_steep, majors, minors)
+
+        # Distance of every pixel center to its line segment.
+        (x_1, y_1, x_2, y_2) = (column[:, np.newaxis] for column in lines[selected][line_indexes].T)
+        (d_x, d_y) = (x_2 - x_1, y_2 - y_1)
+        squared_length = d_x * d_x + d_y * d_y
+        t = np.divide((xx - x_1) * d_x + (yy - y_1) * d_y, squared_length,
+                      out=np.zeros(xx.shape), where=squared_length > 0)
+        np.clip(t, 0, 1, out=t)
+        distances = np.hypot(xx - (x_1 + t * d_x), yy - (y_1 + t * d_y))
+        pixel_coverage = np.clip(reach - distances, 0, min(line_width, 1.0))
+
+        inside = (pixel_coverage > 0) & (yy >= row_start) & (yy < row_end) & (xx >= 0) & (xx < width)
+        flat_indexes = (yy[inside] - row_start).astype(np.int64) * width + xx[inside].astype(np.int64)
+        coverage += np.bincount(flat_indexes, weights=pixel_coverage[inside],
+                                minlength=coverage.shape[0])
+
+    return coverage.reshape(num_rows, width)
+
+
+def render_tiled_png(lines, image_shape, scale, search_max, output_path, line_heaviness=10,
+                     line_width=1.0, line_channels=None, num_channels=3, tile_rows=TILE_ROWS,
+                     threads=None):
+    """Renders lines anti-aliased at any scale tile by tile into a PNG file.
+
+    Tiles of tile_rows rows are rendered on a thread pool and streamed in
+    order into the PNG, so only a few tiles are in memory at once. Lines
+    are line_width * scale output pixels wide and darken (additive: lighten)
+    fully covered pixels by line_heaviness, so the tone of the drawing stays
+    the same at every scale.
+
+    Args:
+        lines (np.array): (N, 4) array of x1, y1, x2, y2 in computed image pixels.
+        image_shape (tuple(int)): Shape of the computed image.
+        scale (float): Output size relative to the computed image.
+        search_max (bool): Additive draw type if set, otherwise subtractive.
+        output_path (str): Output PNG path.
+        line_heaviness (int, optional): Line heaviness. Defaults to 10.
+        line_width (float, optional): Line width in computed image pixels. Defaults to 1.0.
+        line_channels (list, optional): Color channel of every line. Renders an RGB image
+            if given. Defaults to None.
+        num_channels (int, optional): Number of color channels with line_channels.
+            Defaults to 3.
+        tile_rows (int, optional): Rows per tile. Defaults to TILE_ROWS.
+        threads (int, optional): Number of threads. Defaults to the number of CPUs.
+
+    Returns:
+        tuple(int): Shape of the rendered image.
+    """
+    output_shape = (max(int(round(image_shape[0] * scale)), 1),
+                    max(int(round(image_shape[1] * scale)), 1))
+    (height, width) = output_shape
+    lines = scale_line_coordinates(lines, scale)
+    if line_channels is None:
+        channel_lines = [lines]
+    else:
+        line_channels = np.asarray(line_channels)
+        channel_lines = [lines[line_channels == channel] for channel in range(num_channels)]
+    # Rows each line can touch, to hand every tile only its lines.
+    reach = (line_width * scale + 1) / 2 + 1
+    row_ranges = [(np.minimum(lines_[:, 1], lines_[:, 3]) - reach,
+                   np.maximum(lines_[:, 1], lines_[:, 3]) + reach) for lines_ in channel_lines]
+
+    def render(row_start):
+        row_end = min(row_start + tile_rows, height)
+        channel_images = []
+        for (lines_, (top, bottom)) in zip(channel_lines, row_ranges):
+            tile_lines = lines_[(bottom >= row_start) & (top < row_end)]
+            ink = line_heaviness * render_tile(tile_lines, row_start, row_end, width, line_width * scale)
+            if not search_max:
+                ink = 255 - ink
+            channel_images.append(np.clip(np.rint(ink), 0, 255).astype(np.uint8))
+        return channel_images[0] if line_channels is None else np.dstack(channel_images)
+
+    threads = threads or os.cpu_count()
+    with PngStreamWriter(output_path, width, height, 1 if line_channels is None else 3) as writer, \
+            ThreadPoolExecutor(max_workers=threads) as executor:
+        # Keep only a few tiles per thread in flight.
+        tile_starts = list(range(0, height, tile_rows))
+        for window in range(0, len(tile_starts), 2 * threads):
+            for tile in executor.map(render, tile_starts[window:window + 2 * threads]):
+                writer.write_rows(tile)
+
+    return output_shape
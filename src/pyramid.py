@@ -0,0 +1,57 @@
+import numpy as np
+
+from geometry import Point
+
+
+class CoarseImage:
+    """
+    Block mean downsampled copy of an image.
+
+    The copy is kept in sync with lines accumulated on the full resolution
+    image by only updating the blocks touched by a line.
+    """
+
+    def __init__(self, image, factor):
+        """
+        Args:
+            image (np.array): Full resolution image.
+            factor (int): Downsampling factor per axis.
+        """
+        self.factor = factor
+        (height, width) = image.shape
+        coarse_shape = (-(-height // factor), -(-width // factor))
+
+        yy, xx = np.indices(image.shape)
+        block_indexes = (yy // factor) * coarse_shape[1] + xx // factor
+        self.block_sizes = np.bincount(block_indexes.ravel()).reshape(coarse_shape)
+        self.image = (np.bincount(block_indexes.ravel(), weights=image.ravel()).reshape(coarse_shape)
+                      / self.block_sizes)
+
+    def coarse_point(self, index_y, index_x):
+        """Maps a full resolution pixel to a point in the coarse image.
+
+        Args:
+            index_y (int): Pixel row.
+            index_x (int): Pixel column.
+
+        Returns:
+            Point: Point in the coordinate system of the geometry library.
+        """
+        (height, width) = self.image.shape
+        x = min(max((index_x + 0.5) / self.factor - 0.5, 0.0), width - 1.0)
+        y = min(max((index_y + 0.5) / self.factor - 0.5, 0.0), height - 1.0)
+
+        # y-axis value is inverted because geometry library uses inverted y-axis direction.
+        return Point(x, - y)
+
+    def accumulate(self, yy, xx, delta):
+        """Adds delta of full resolution pixels to their blocks.
+
+        Args:
+            yy (np.array): Rows of full resolution pixels.
+            xx (np.array): Columns of full resolution pixels.
+            delta (int): Value added to each pixel.
+        """
+        block_yy = yy // self.factor
+        block_xx = xx // self.factor
+        np.add.at(self.image, (block_yy, block_xx), delta / self.block_sizes[block_yy, block_xx])
@@ -0,0 +1,109 @@
+import numpy as np
+
+from geometry import PointInt
+
+# Number of image rows summed at once when building the accumulator.
+SUM_CHUNK_ROWS = 16
+
+
+class RadonAccumulator:
+    """
+    Discretized Radon transform holding the line sums of all lines of a LineTable.
+
+    Every pixel lies on exactly one line per quantized angle, so after drawing a
+    line only the sums of the lines crossing its pixels change. These are found
+    by the line id arithmetic of the line table without touching other cells.
+    """
+
+    def __init__(self, image, line_table):
+        """
+        Args:
+            image (np.array): Image as np.array.
+            line_table (LineTable): Line table matching the image size.
+        """
+        self.line_table = line_table
+        self.width = image.shape[1]
+        self.lengths = np.diff(np.asarray(line_table.offsets))
+
+        flat_image = image.reshape(-1).astype(np.float64)
+        self.sums = np.zeros(line_table.num_lines, dtype=np.int64)
+        for start in range(0, image.size, SUM_CHUNK_ROWS * self.width):
+            chunk = flat_image[start:start + SUM_CHUNK_ROWS * self.width]
+            (yy, xx) = np.divmod(np.arange(start, start + chunk.shape[0]), self.width)
+            self.sums += np.rint(np.bincount(
+                line_table.crossing_line_ids(xx, yy).reshape(-1),
+                weights=np.tile(chunk, line_table.num_angles),
+                minlength=line_table.num_lines)).astype(np.int64)
+
+    def accumulate(self, image, line_id, delta):
+        """Adds delta to the image along a line and updates all affected line sums.
+
+        Args:
+            image (np.array): Image as np.array.
+            line_id (int): Line to draw.
+            delta (int): Value to add.
+
+        Returns:
+            np.array: Number of pixels each line shares with the drawn line.
+        """
+        flat_indexes, _ = self.line_table.pixels(line_id)
+        image.reshape(-1)[flat_indexes] += delta
+
+        (yy, xx) = np.divmod(flat_indexes, self.width)
+        crossing_lines = self.line_table.crossing_line_ids(xx, yy).reshape(-1)
+        shared_pixels = np.bincount(crossing_lines, minlength=self.sums.shape[0])
+        self.sums += delta * shared_pixels
+        return shared_pixels
+
+
+def compute_radon_lines(image, num_lines, search_max, line_heaviness, line_table,
+                        min_length=20, line_ids=None):
+    """Computes lines by always drawing the globally best line of the line table.
+
+    Lines are scored by how much they change the squared error between the
+    drawn image and the target image. With residual R and heaviness h a pixel
+    changes the error by 2h(R-255)+h^2 in subtractive mode and by -2hR+h^2
+    in additive mode, so the score of every line follows from its line sum and
+    length in the Radon accumulator. Drawing a line raises the score of every
+    line by 2h^2 per shared pixel in both modes.
+
+    Args:
+        image (np.array): Image as numpy array.
+        num_lines (int): Number of lines to draw.
+        search_max (bool): Search brightest lines if set, otherwise darkest lines.
+        line_heaviness (int): Line heaviness. Subtracted from the image if search_max is set.
+        line_table (LineTable): Line table matching the image size.
+        min_length (int, optional): Ignore lines with fewer pixels. Defaults to 20.
+        line_ids (list, optional): Gets line table ids of found lines appended. Defaults to None.
+
+    Returns:
+        list(): List of point pairs
+    """
+    from tqdm import tqdm
+
+    print('Build Radon accumulator for {} lines...'.format(line_table.num_lines))
+    accumulator = RadonAccumulator(image, line_table)
+
+    h = line_heaviness
+    if search_max:
+        delta = -h
+        error_changes = (-2 * h * accumulator.sums + h * h * accumulator.lengths).astype(np.float64)
+    else:
+        delta = h
+        error_changes = (2 * h * accumulator.sums
+                         + (h * h - 510 * h) * accumulator.lengths).astype(np.float64)
+    error_changes[accumulator.lengths < min(min_length, np.max(accumulator.lengths))] = np.inf
+
+    list_of_lines = []
+
+    for _ in tqdm(range(num_lines), desc='Calculating line: '):
+        line_id = int(np.argmin(error_changes))
+        shared_pixels = accumulator.accumulate(image, line_id, delta)
+        error_changes += (2 * h * h) * shared_pixels
+
+        (x_1, y_1, x_2, y_2) = (int(v) for v in line_table.endpoints[line_id])
+        list_of_lines.append((PointInt(x_1, y_1), PointInt(x_2, y_2)))
+        if line_ids is not None:
+            line_ids.append(line_id)
+
+    return list_of_lines
@@ -0,0 +1,157 @@
+import numpy as np
+
+
+def line_segments(r0, c0, r1, c1):
+    """Rasterizes many line segments at once into one concatenated buffer.
+
+    The pixels of every segment are identical to the ones returned by
+    skimage.draw.line, but all segments are walked in a single NumPy pass
+    by using the closed form of the Bresenham error term.
+
+    Args:
+        r0 (np.array): Start rows.
+        c0 (np.array): Start columns.
+        r1 (np.array): End rows.
+        c1 (np.array): End columns.
+
+    Returns:
+        (np.array, np.array, np.array): Rows and columns of all pixels and the
+        offsets into them, where segment i owns rr[offsets[i]:offsets[i+1]].
+    """
+    r0 = np.atleast_1d(np.asarray(r0, dtype=np.int64))
+    c0 = np.atleast_1d(np.asarray(c0, dtype=np.int64))
+    r1 = np.atleast_1d(np.asarray(r1, dtype=np.int64))
+    c1 = np.atleast_1d(np.asarray(c1, dtype=np.int64))
+
+    d_r = r1 - r0
+    d_c = c1 - c0
+    step_r = np.where(d_r > 0, 1, -1)
+    step_c = np.where(d_c > 0, 1, -1)
+    d_r = np.abs(d_r)
+    d_c = np.abs(d_c)
+
+    # Walk along the major axis, the minor axis follows the error term.
+    steep = d_r > d_c
+    major = np.where(steep, d_r, d_c)
+    minor = np.where(steep, d_c, d_r)
+
+    lengths = major + 1
+    offsets = np.zeros(lengths.shape[0] + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    starts = np.repeat(offsets[:-1], lengths)
+    i = np.arange(offsets[-1], dtype=np.int64) - starts
+
+    major_ = np.repeat(major, lengths)
+    minor_ = np.repeat(minor, lengths)
+    minor_steps = (2 * minor_ * i + major_) // (2 * np.maximum(major_, 1))
+
+    steep_ = np.repeat(steep, lengths)
+    rr = np.repeat(r0, lengths) + np.repeat(step_r, lengths) * np.where(steep_, i, minor_steps)
+    cc = np.repeat(c0, lengths) + np.repeat(step_c, lengths) * np.where(steep_, minor_steps, i)
+
+    return rr, cc, offsets
+
+
+def line(r0, c0, r1, c1):
+    """Rasterizes one line segment.
+
+    Returns the same pixels as skimage.draw.line with the closed form of the
+    Bresenham error term used by line_segments(), but without its setup cost
+    for many segments.
+
+    Args:
+        r0 (int): Start row.
+        c0 (int): Start column.
+        r1 (int): End row.
+        c1 (int): End column.
+
+    Returns:
+        (np.array, np.array): Rows and columns of the pixels.
+    """
+    (r0, c0, r1, c1) = (int(r0), int(c0), int(r1), int(c1))
+    step_r = 1 if r1 > r0 else -1
+    step_c = 1 if c1 > c0 else -1
+    d_r = abs(r1 - r0)
+    d_c = abs(c1 - c0)
+
+    if d_r > d_c:
+        i = np.arange(d_r + 1)
+        minor_steps = (2 * d_c * i + d_r) // (2 * d_r)
+        return r0 + step_r * i, c0 + step_c * minor_steps
+
+    i = np.arange(d_c + 1)
+    minor_steps = (2 * d_r * i + d_c) // (2 * max(d_c, 1))
+    return r0 + step_r * minor_steps, c0 + step_c * i
+
+
+# Number of segments walked together in one padded 2D block.
+SEGMENT_GROUP_SIZE = 64
+
+# Longest major axis for which the error term still fits into int32.
+MAX_INT32_MAJOR = 32767
+
+
+def line_flat_indexes(r0, c0, r1, c1, width):
+    """Rasterizes many line segments into flat pixel indexes of a row-major image.
+
+    Yields the same pixels as line_segments(), but the order of the segments
+    is not kept. Segments are sorted by length and walked in small groups as
+    padded 2D blocks, which avoids repeating per segment values for every
+    pixel. Meant for accumulating line counts with np.bincount.
+
+    Args:
+        r0 (np.array): Start rows.
+        c0 (np.array): Start columns.
+        r1 (np.array): End rows.
+        c1 (np.array): End columns.
+        width (int): Image width.
+
+    Returns:
+        np.array: Flat indexes of all pixels of all segments.
+    """
+    r0 = np.atleast_1d(np.asarray(r0, dtype=np.int64))
+    c0 = np.atleast_1d(np.asarray(c0, dtype=np.int64))
+    d_r = np.atleast_1d(np.asarray(r1, dtype=np.int64)) - r0
+    d_c = np.atleast_1d(np.asarray(c1, dtype=np.int64)) - c0
+    step_r = np.where(d_r > 0, width, -width)
+    step_c = np.where(d_c > 0, 1, -1)
+    d_r = np.abs(d_r)
+    d_c = np.abs(d_c)
+
+    steep = d_r > d_c
+    major = np.where(steep, d_r, d_c)
+    minor = np.where(steep, d_c, d_r)
+    major_steps = np.where(steep, step_r, step_c)
+    minor_steps = np.where(steep, step_c, step_r)
+    starts = r0 * width + c0
+
+    if major.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Walking the segments is far cheaper in int32 if all values fit.
+    max_flat_index = (max(r0.max(), (r0 + np.where(step_r > 0, d_r, -d_r)).max()) + 1) * width
+    if major.max() <= MAX_INT32_MAJOR and max_flat_index < 2**31:
+        dtype = np.int32
+    else:
+        dtype = np.int64
+    minor_2 = (2 * minor).astype(dtype)
+    major_2 = (2 * np.maximum(major, 1)).astype(dtype)
+    major = major.astype(dtype)
+    major_steps = major_steps.astype(dtype)
+    minor_steps = minor_steps.astype(dtype)
+    starts = starts.astype(dtype)
+
+    order = np.argsort(major, kind='stable')
+    flat_indexes = []
+    for group_start in range(0, order.shape[0], SEGMENT_GROUP_SIZE):
+        group = order[group_start:group_start + SEGMENT_GROUP_SIZE]
+        group_major = major[group][:, None]
+        i = np.arange(group_major[-1, 0] + 1, dtype=dtype)
+
+        minor_i = (i * minor_2[group][:, None] + group_major) // major_2[group][:, None]
+        block = starts[group][:, None] + i * major_steps[group][:, None] \
+            + minor_i * minor_steps[group][:, None]
+        flat_indexes.append(block[i <= group_major])
+
+    return np.concatenate(flat_indexes)
@@ -0,0 +1,206 @@
+import sys
+from enum import Enum
+
+import numpy as np
+
+from geometry import Point, PointInt, Points, Rectangle
+from raster import line_segments
+
+# Number of candidate lines rasterized together when scoring several pixels.
+BATCH_CANDIDATES = 256
+
+
+class DrawType(Enum):
+    ADDITIVE = 1
+    SUBTRACTIVE = 2
+
+
+def _clip_lines_to_image(selected_point, angles, image_width, image_height):
+    """Clips all lines through a point against the image border at once.
+
+    Args:
+        selected_point (Point or Points): Point where lines need to go through or one
+            point per line.
+        angles (np.array): Angle of each line.
+        image_width (int): Image width.
+        image_height (int): Image height.
+
+    Returns:
+        (np.array, np.array): Endpoints with shape (N, 2, 2) in the coordinate
+        system of the geometry library and mask of lines with two endpoints.
+    """
+    # Rectangle representing the image boarders is mapped to the bottom left quadrant
+    # due to the different coordinate system used in the numpy arrays.
+    image_rectangle = Rectangle(
+        image_width - 1.0, image_height - 1.0, Point(0.0, - image_height + 1.0))
+
+    directions = Points(np.column_stack((np.cos(angles), np.sin(angles))))
+    if not isinstance(selected_point, Points):
+        selected_point = Points(selected_point.as_tuple())
+    return image_rectangle.intersect_lines(selected_point, directions)
+
+
+def find_best_line_through_point(num_lines_to_check, selected_point, image, debug_image, draw_type,
+                                 metrics=None):
+    """Find best line through a given point.
+
+    All candidate lines are generated, clipped, rasterized and scored in one batch.
+
+    Args:
+        num_lines_to_check (int): Number of tries to find best line.
+        selected_point (Point): Point where line needs to go through.
+        image (np.array): Image as np.array.
+        debug_image (np.array): Debug_image when needed. Other value is set to None.
+        draw_type (DrawType): Enum for draw type.
+        metrics (Metrics, optional): Collects phase timings and counters. Defaults to None.
+
+    Returns:
+        (Point,Point): Point pair representing the best line segment, or None if no
+        candidate line lies inside the image.
+    """
+    angles = (np.random.rand(num_lines_to_check) - 0.5) * np.pi
+    return score_lines_through_point(angles, selected_point, image, draw_type, debug_image, metrics)
+
+
+def score_lines_through_point(angles, selected_point, image, draw_type, debug_image=None,
+                              metrics=None):
+    """Scores lines with given angles through a point and returns the best one.
+
+    Args:
+        angles (np.array): Angles of the candidate lines.
+        selected_point (Point): Point where line needs to go through.
+        image (np.array): Image as np.array.
+        draw_type (DrawType): Enum for draw type.
+        debug_image (np.array, optional): Debug_image when needed. Defaults to None.
+        metrics (Metrics, optional): Collects phase timings and counters. Defaults to None.
+
+    Returns:
+        (Point,Point): Point pair representing the best line segment, or None if no
+        candidate line lies inside the image.
+    """
+    endpoints, mean_line_intensities, valid = mean_line_intensities_through_point(
+        angles, selected_point, image, debug_image, metrics)
+
+    if endpoints.shape[0] == 0:
+        if draw_type == DrawType.ADDITIVE:
+            return None, -sys.float_info.max
+        return None, sys.float_info.max
+
+    if draw_type == DrawType.ADDITIVE:
+        best_index = np.argmax(mean_line_intensities)
+    else:
+        best_index = np.argmin(mean_line_intensities)
+
+    # DEBUG: Check if lines are correctly drawn through random point.
+    if debug_image is not None:
+        print("point pos: ", selected_point)
+        print("angles: ", angles[valid]/np.pi*180)
+
+    (x_1, y_1), (x_2, y_2) = endpoints[best_index]
+    best_line = (PointInt(int(x_1), int(y_1)), PointInt(int(x_2), int(y_2)))
+
+    return best_line, mean_line_intensities[best_index]
+
+
+def mean_line_intensities_through_point(angles, selected_point, image, debug_image=None,
+                                        metrics=None):
+    """Clips, rasterizes and scores lines with given angles through a point.
+
+    Args:
+        angles (np.array): Angles of the candidate lines.
+        selected_point (Point or Points): Point where line needs to go through or one
+            point per line.
+        image (np.array): Image as np.array.
+        debug_image (np.array, optional): Debug_image when needed. Defaults to None.
+        metrics (Metrics, optional): Collects phase timings and counters. Defaults to None.
+
+    Returns:
+        (np.array, np.array, np.array): Integer endpoints with shape (M, 2, 2)
+        in image coordinates and mean intensity of the M valid lines, as well as
+        the mask of valid angles.
+    """
+    (image_height, image_width) = image.shape
+
+    endpoints, valid = _clip_lines_to_image(
+        selected_point, angles, image_width, image_height)
+
+    # Forget lines which are edge cases.
+    endpoints = endpoints[valid]
+    if endpoints.shape[0] == 0:
+        return np.zeros((0, 2, 2), dtype=np.int64), np.zeros(0), valid
+
+    # Remap y-coordinate system because y-axis direction is opposite in
+    # numpy arrays and the geometric lib.
+    endpoints[:, :, 1] *= -1
+    endpoints = np.trunc(endpoints).astype(np.int64)
+    if metrics is not None:
+        metrics.count('valid_candidates', endpoints.shape[0])
+        metrics.lap('candidate_generation')
+
+    yy, xx, offsets = line_segments(
+        endpoints[:, 0, 1], endpoints[:, 0, 0], endpoints[:, 1, 1], endpoints[:, 1, 0])
+    if metrics is not None:
+        metrics.count('candidate_pixels', yy.shape[0])
+        metrics.lap('rasterization')
+
+    # Sums of integers are exact in float64, so this also works for int16 images.
+    line_sums = np.add.reduceat(image[yy, xx].astype(np.float64), offsets[:-1])
+    mean_line_intensities = line_sums / np.diff(offsets)
+
+    if debug_image is not None:
+        debug_image[yy, xx] = [0, 0, 0]
+
+    return endpoints, mean_line_intensities, valid
+
+
+def find_best_lines_through_pixels(num_lines_to_check, index_ys, index_xs, image, draw_type,
+                                   metrics=None, angles=None):
+    """Find best line through each of several pixels by scoring all candidates in one batch.
+
+    Args:
+        num_lines_to_check (int): Number of tries to find best line per pixel.
+        index_ys (np.array): Rows of pixels where lines need to go through.
+        index_xs (np.array): Columns of pixels where lines need to go through.
+        image (np.array): Image as np.array.
+        draw_type (DrawType): Enum for draw type.
+        metrics (Metrics, optional): Collects phase timings and counters. Defaults to None.
+        angles (np.array, optional): num_lines_to_check candidate angles per pixel. Drawn
+            from numpy's random state if None. Defaults to None.
+
+    Returns:
+        (np.array, np.array): Integer endpoints with shape (M, 2, 2) in image
+        coordinates and mean intensities of the best line of the M pixels
+        which got a valid line, ordered from best to worst.
+    """
+    if angles is None:
+        angles = (np.random.rand(index_ys.shape[0] * num_lines_to_check) - 0.5) * np.pi
+    pixels = np.repeat(np.arange(index_ys.shape[0]), num_lines_to_check)
+
+    # y-axis value is inverted because geometry library uses inverted y-axis direction.
+    selected_points = np.column_stack((index_xs[pixels], - index_ys[pixels]))
+
+    # Score in chunks which keep the rasterized pixels small enough for the cache.
+    endpoints, mean_line_intensities, valid = [], [], []
+    for start in range(0, angles.shape[0], BATCH_CANDIDATES):
+        chunk = slice(start, start + BATCH_CANDIDATES)
+        chunk_endpoints, chunk_intensities, chunk_valid = mean_line_intensities_through_point(
+            angles[chunk], Points(selected_points[chunk]), image, None, metrics)
+        endpoints.append(chunk_endpoints)
+        mean_line_intensities.append(chunk_intensities)
+        valid.append(chunk_valid)
+    endpoints = np.concatenate(endpoints)
+    mean_line_intensities = np.concatenate(mean_line_intensities)
+    pixels = pixels[np.concatenate(valid)]
+
+    if draw_type == DrawType.ADDITIVE:
+        scores = - mean_line_intensities
+    else:
+        scores = mean_line_intensities
+
+    # Best candidate of every pixel comes first in its group.
+    order = np.lexsort((scores, pixels))
+    _, first = np.unique(pixels[order], return_index=True)
+    best = order[first]
+    best = best[np.argsort(scores[best], kind='stable')]
+
+    return endpoints[best], mean_line_intensities[best]
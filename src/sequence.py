@@ -0,0 +1,234 @@
+import csv
+import os
+import time
+
+import numpy as np
+
+from batch import collect_input_paths, output_paths_for
+from line_drawer import (LOGO, DrawType, build_arg_parser, compute_image_lines, line_counts,
+                         load_image, residual_error, write_output)
+from line_file import lines_to_array
+from raster import line_flat_indexes, line_segments
+from stopping import squared_errors
+
+SUMMARY_FIELDS = ('input_path', 'output_path', 'time', 'lines', 'reused_lines', 'residual_error')
+
+# Options of line_drawer which frame sequences use. All others are rejected.
+SUPPORTED_OPTIONS = ('num_lines', 'line_heaviness', 'num_lines_to_check', 'draw_type',
+                     'no_random_result', 'output_width', 'output_format', 'stroke_width',
+                     'svg_precision', 'lines_per_round')
+
+
+def unsupported_options(args):
+    """Finds line_drawer options which frame sequences do not use but are not at their default.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments.
+
+    Returns:
+        list(str): Command line flags of unsupported options.
+    """
+    flags = []
+    for action in build_arg_parser()._actions:  # pylint: disable=protected-access
+        if action.dest in SUPPORTED_OPTIONS or action.dest == 'help':
+            continue
+        if getattr(args, action.dest) != action.default:
+            flags.append(action.option_strings[0])
+    return flags
+
+
+def misfit_lines(lines, target, residual, draw_type, line_heaviness, changed):
+    """Finds lines through changed pixels which make the drawn image worse.
+
+    A line is a misfit if removing it from the residual image lowers the
+    squared error between drawn and target image.
+
+    Args:
+        lines (np.array): (N, 4) array of x1, y1, x2, y2.
+        target (np.array): Preprocessed frame image.
+        residual (np.array): Target image with all lines accumulated.
+        draw_type (DrawType): Enum for draw type.
+        line_heaviness (int): Line heaviness.
+        changed (np.array): Boolean image of changed pixels.
+
+    Returns:
+        np.array: Boolean array, set for lines which no longer fit.
+    """
+    if lines.shape[0] == 0:
+        return np.zeros(0, dtype=bool)
+    delta = -line_heaviness if draw_type == DrawType.ADDITIVE else line_heaviness
+    search_max = draw_type == DrawType.ADDITIVE
+
+    rr, cc, offsets = line_segments(lines[:, 1], lines[:, 0], lines[:, 3], lines[:, 2])
+    (target_values, residual_values) = (target[rr, cc], residual[rr, cc])
+    error_changes = squared_errors(target_values, residual_values, search_max) - \
+        squared_errors(target_values, residual_values - delta, search_max)
+
+    num_changed = np.add.reduceat(changed[rr, cc].astype(np.int64), offsets[:-1])
+    return (num_changed > 0) & (np.add.reduceat(error_changes, offsets[:-1]) > 0)
+
+
+def compute_frame_lines(target, num_lines, num_lines_to_check, draw_type, line_heaviness=10,
+                        previous_target=None, previous_lines=None, change_threshold=24,
+                        lines_per_round=1):
+    """Computes the lines of one frame, warm-started from the lines of the previous frame.
+
+    Pixels whose target value changed by more than change_threshold count as
+    changed. Previous lines through changed pixels are dropped if they make
+    the new frame worse, see misfit_lines(), all other lines are kept. The
+    greedy search then draws as
+    many new lines as needed to get num_lines again, but only sees the changed
+    pixels and the pixels of dropped lines. All other pixels are set to a
+    value no line is drawn to.
+
+    Args:
+        target (np.array): Preprocessed frame image.
+        num_lines (int): Number of lines per frame.
+        num_lines_to_check (int): Number of tries to find best line.
+        draw_type (DrawType): Enum for draw type.
+        line_heaviness (int, optional): Line heaviness. Defaults to 10.
+        previous_target (np.array, optional): Preprocessed previous frame. Computes
+            all lines from scratch if None. Defaults to None.
+        previous_lines (np.array, optional): (N, 4) lines of the previous frame.
+            Defaults to None.
+        change_threshold (int, optional): Smallest change of a pixel value counted as
+            change. Defaults to 24.
+        lines_per_round (int, optional): Passed to compute_image_lines(). Defaults to 1.
+
+    Returns:
+        tuple(np.array, np.array, int): (N, 4) lines, residual image and number of
+        lines kept from the previous frame.
+    """
+    if draw_type == DrawType.ADDITIVE:
+        (delta, neutral) = (-line_heaviness, 0)
+    else:
+        (delta, neutral) = (line_heaviness, 255)
+
+    if previous_target is None or previous_lines is None or previous_target.shape != target.shape:
+        residual = target.copy()
+        lines = lines_to_array(compute_image_lines(
+            residual, num_lines, num_lines_to_check, draw_type, line_heaviness,
+            lines_per_round=lines_per_round))
+        return lines, residual, 0
+
+    changed = np.abs(target.astype(np.int32) - previous_target) > change_threshold
+    residual = (target + delta * line_counts(previous_lines, target.shape)).astype(target.dtype)
+    dropped = misfit_lines(previous_lines, target, residual, draw_type, line_heaviness, changed)
+    kept_lines = previous_lines[~dropped][:num_lines]
+
+    search_region = changed.reshape(-1).copy()
+    dropped_lines = previous_lines[dropped]
+    search_region[line_flat_indexes(
+        dropped_lines[:, 1], dropped_lines[:, 0], dropped_lines[:, 3], dropped_lines[:, 2],
+        target.shape[1])] = True
+    search_region = search_region.reshape(target.shape)
+
+    residual = (target + delta * line_counts(kept_lines, target.shape)).astype(target.dtype)
+    num_new_lines = num_lines - kept_lines.shape[0]
+    if num_new_lines > 0 and np.any(search_region):
+        search_image = np.where(search_region, residual, neutral).astype(target.dtype)
+        new_lines = lines_to_array(compute_image_lines(
+            search_image, num_new_lines, num_lines_to_check, draw_type, line_heaviness,
+            lines_per_round=lines_per_round))
+        residual += (delta * line_counts(new_lines, target.shape)).astype(target.dtype)
+        lines = np.concatenate([kept_lines, new_lines])
+    else:
+        lines = kept_lines
+
+    return lines, residual, kept_lines.shape[0]
+
+
+def draw_sequence(args, input_paths):
+    """Redraws every frame of a sequence with lines, warm-started from the previous frame.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        input_paths (list(str)): Frame paths in playback order.
+
+    Returns:
+        list(dict): Summary per frame with output path, time, number of lines,
+        number of reused lines and residual error.
+    """
+    draw_type = DrawType[str.upper(args.draw_type)]
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    summaries = []
+    previous_target = None
+    previous_lines = None
+    output_paths = output_paths_for(input_paths, args.output_dir, args.output_format)
+    for (index, (input_path, output_path)) in enumerate(zip(input_paths, output_paths)):
+        start_time = time.perf_counter()
+        if args.no_random_result:
+            np.random.seed(42)
+
+        target = load_image(input_path, args.output_width)
+        if args.keyframe_every > 0 and index % args.keyframe_every == 0:
+            previous_target = None
+        lines, residual, num_reused = compute_frame_lines(
+            target, args.num_lines, args.num_lines_to_check, draw_type, args.line_heaviness,
+            previous_target, previous_lines, args.change_threshold, args.lines_per_round)
+
+        write_output(lines, target.shape, draw_type, args, output_path, args.output_format)
+
+        summary = {
+            'input_path': input_path,
+            'output_path': output_path,
+            'time': time.perf_counter() - start_time,
+            'lines': lines.shape[0],
+            'reused_lines': num_reused,
+            'residual_error': residual_error(target, residual, draw_type),
+        }
+        summaries.append(summary)
+        print('Frame {}/{}: {} lines, {} reused, {:.2f}s, residual error {:.1f}'.format(
+            index + 1, len(input_paths), summary['lines'], summary['reused_lines'],
+            summary['time'], summary['residual_error']))
+
+        (previous_target, previous_lines) = (target, lines)
+
+    return summaries
+
+
+def main(args):
+    print(LOGO)
+
+    input_paths = collect_input_paths(args.inputs)
+    print('Found {} frames.'.format(len(input_paths)))
+    summaries = draw_sequence(args, input_paths)
+
+    total_time = sum(summary['time'] for summary in summaries)
+    total_lines = sum(summary['lines'] for summary in summaries)
+    total_reused = sum(summary['reused_lines'] for summary in summaries)
+    print('Finished {} frames in {:.2f}s, {:.2f}s per frame, {:.1%} of lines reused'.format(
+        len(summaries), total_time, total_time / max(len(summaries), 1),
+        total_reused / max(total_lines, 1)))
+
+    if args.summary_path:
+        print('Write summary to {}'.format(args.summary_path))
+        with open(args.summary_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            for summary in summaries:
+                writer.writerow(summary)
+
+
+if __name__ == "__main__":
+    parser = build_arg_parser()
+    parser.description = 'line_drawer sequence - Redraws the frames of a clip, reusing the ' \
+        'lines of the previous frame where the frame did not change.'
+
+    parser.add_argument('inputs', nargs='+',
+                        help='Frame directories, glob patterns or manifest files (.txt/.lst) with one frame path per line. Directories and patterns are sorted by name.')
+    parser.add_argument('--output-dir', type=str, required=True,
+                        help='Directory where output frames are written.')
+    parser.add_argument('--change-threshold', type=int, default=24,
+                        help='Smallest change of a preprocessed pixel value between two frames counted as change.')
+    parser.add_argument('--keyframe-every', type=int, default=0,
+                        help='Compute all lines from scratch every this many frames. "0" only does it for the first frame.')
+    parser.add_argument('--summary-path', type=str, default='',
+                        help='Write per-frame time, lines and reused lines as CSV to this path.')
+
+    args = parser.parse_args()
+    if unsupported_options(args):
+        parser.error('not supported for frame sequences: {}'.format(' '.join(unsupported_options(args))))
+
+    main(args)
@@ -0,0 +1,647 @@
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+
+from PIL import Image
+
+from line_drawer import LOGO, build_arg_parser, draw_image
+from metrics import Metrics
+
+# Lines between two progress events of a running job.
+PROGRESS_EVERY = 50
+
+# Seconds a running job gets to stop by itself before its worker is replaced.
+CANCEL_GRACE = 2.0
+
+# Largest accepted request body in bytes.
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+FINAL_STATES = ('done', 'failed', 'cancelled')
+
+# Options a client may not set: paths on the server and options starting extra processes.
+# input_path is only accepted relative to the input directory of the service.
+FORBIDDEN_OPTIONS = ('output_path', 'checkpoint_path', 'metrics_out', 'lines_path',
+                     'preview_path', 'pin_sequence_path', 'raster_cache_dir', 'work_dir',
+                     'workers', 'channel_jobs', 'color', 'large_image')
+
+CONTENT_TYPES = {'PNG': 'image/png', 'SVG': 'image/svg+xml'}
+
+REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+           429: 'Too Many Requests', 500: 'Internal Server Error'}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class HttpError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def job_args_from_options(options):
+    """Parses job options with the command line parser of line_drawer.
+
+    Options use the names of the command line arguments with or without
+    leading dashes. Flags are switched on with true and omitted with false.
+
+    Args:
+        options (dict): Option names and values.
+
+    Returns:
+        argparse.Namespace: Arguments for draw_image().
+
+    Raises:
+        ValueError: If an option is unknown or has an invalid value.
+    """
+    argv = []
+    for (name, value) in options.items():
+        flag = '--' + name.lstrip('-').replace('_', '-')
+        if value is True:
+            argv.append(flag)
+        elif value is not False and value is not None:
+            argv += [flag, str(value)]
+
+    parser = build_arg_parser()
+    try:
+        args, unknown = parser.parse_known_args(argv)
+    except SystemExit as error:
+        raise ValueError('invalid options: {}'.format(' '.join(argv))) from error
+    if unknown:
+        raise ValueError('unknown options: {}'.format(' '.join(unknown)))
+    return args
+
+
+def _worker_main(job_queue, events, cancel_event):
+    """Runs jobs in a long-lived worker process with warm imports and line tables."""
+    # Progress bars and prints of the jobs would only garble the service log.
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    sys.stderr = sys.stdout
+
+    for (job_id, options) in iter(job_queue.get, None):
+        def progress(_, num_lines, job_id=job_id):
+            if cancel_event.is_set():
+                raise JobCancelled()
+            events.send((job_id, 'progress', {'lines': num_lines}))
+
+        try:
+            summary = draw_image(job_args_from_options(options),
+                                 Metrics(callback=progress, callback_every=PROGRESS_EVERY))
+            events.send((job_id, 'done', summary))
+        except JobCancelled:
+            events.send((job_id, 'cancelled', None))
+        except Exception as error:  # pylint: disable=broad-except
+            events.send((job_id, 'failed', '{}: {}'.format(type(error).__name__, error)))
+
+
+class Job:
+    """State and event history of one render job."""
+
+    def __init__(self, job_id, options, directory, num_lines):
+        self.id = job_id
+        self.options = options
+        self.directory = directory
+        self.num_lines = num_lines
+        self.status = 'queued'
+        self.lines = 0
+        self.summary = None
+        self.error = None
+        self.submit_time = time.time()
+        self.start_time = None
+        self.finish_time = None
+        self.events = []
+        self.changed = asyncio.Event()
+
+    def add_event(self, event):
+        self.events.append(event)
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'lines': self.lines,
+            'num_lines': self.num_lines,
+            'summary': self.summary,
+            'error': self.error,
+        }
+
+
+class _WorkerSlot:
+    """One worker process with its own job queue, event pipe and cancel flag.
+
+    Nothing is shared between slots, so killing a worker cannot leave a
+    half written message in a pipe which other workers still use.
+    """
+
+    def __init__(self, context):
+        self.job_queue = context.Queue()
+        self.cancel_event = context.Event()
+        (self.events, worker_events) = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=_worker_main, args=(self.job_queue, worker_events, self.cancel_event), daemon=True)
+        self.process.start()
+        worker_events.close()
+        self.job = None
+        self.timeout_handle = None
+        self.cancel_handle = None
+
+    def close(self):
+        for handle in (self.timeout_handle, self.cancel_handle):
+            if handle is not None:
+                handle.cancel()
+        self.process.terminate()
+        self.process.join()
+        self.events.close()
+        self.job_queue.cancel_join_thread()
+        self.job_queue.close()
+
+
+class RenderService:
+    """
+    Queues render jobs and runs them on a pool of warm worker processes.
+
+    Every worker runs one job at a time, so at most num_workers jobs run
+    concurrently. Jobs which exceed the per-job limits are rejected at submit
+    time and running jobs are cancelled after job_timeout seconds. Cancelling
+    a running job first asks it to stop at its next progress event and
+    replaces its worker process if it did not stop within CANCEL_GRACE seconds.
+    """
+
+    def __init__(self, num_workers=1, work_dir=None, max_queued=100, max_num_lines=0,
+                 max_output_width=0, job_timeout=0.0, input_dir=None, max_finished=1000,
+                 finished_ttl=3600.0, max_input_pixels=0):
+        """
+        Args:
+            num_workers (int, optional): Number of worker processes. Defaults to 1.
+            work_dir (str, optional): Directory for job inputs and outputs. A temporary
+                directory is used if None. Defaults to None.
+            max_queued (int, optional): Maximal number of waiting jobs. Defaults to 100.
+            max_num_lines (int, optional): Maximal num_lines per job. 0 disables it.
+                Defaults to 0.
+            max_output_width (int, optional): Maximal output_width per job. Jobs keeping
+                the full image size are rejected too. 0 disables it. Defaults to 0.
+            job_timeout (float, optional): Seconds a job may run. 0 disables it.
+                Defaults to 0.0.
+            input_dir (str, optional): Directory of images which jobs may reference with
+                input_path relative to it. Jobs must upload their image if None.
+                Defaults to None.
+            max_finished (int, optional): Number of finished jobs kept with their outputs.
+                Older ones are removed. Defaults to 1000.
+            finished_ttl (float, optional): Seconds finished jobs are kept with their
+                outputs. 0 keeps them until max_finished is reached. Defaults to 3600.0.
+            max_input_pixels (int, optional): Maximal number of pixels of the input image,
+                which is decoded at full size before it is scaled. 0 disables it.
+                Defaults to 0.
+        """
+        self.num_workers = num_workers
+        self.max_queued = max_queued
+        self.max_num_lines = max_num_lines
+        self.max_output_width = max_output_width
+        self.job_timeout = job_timeout
+        self.input_dir = input_dir
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self.max_input_pixels = max_input_pixels
+
+        self._temp_dir = None
+        if work_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory()
+            work_dir = self._temp_dir.name
+        self.work_dir = work_dir
+
+        self.jobs = {}
+        self._pending = deque()
+        self._job_ids = itertools.count(1)
+        # Forked workers would inherit open client connections and keep them alive.
+        self._context = multiprocessing.get_context('spawn')
+        self._slots = []
+        self._loop = None
+
+    def start(self):
+        """Starts worker processes. Must be called from the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._slots = [self._start_worker() for _ in range(self.num_workers)]
+
+    def stop(self):
+        for slot in self._slots:
+            self._loop.remove_reader(slot.events.fileno())
+            slot.close()
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+
+    def submit(self, request):
+        """Validates and queues a job.
+
+        Options naming server paths or starting extra processes are rejected,
+        see FORBIDDEN_OPTIONS. The output is always written to the job
+        directory.
+
+        Args:
+            request (dict): Job options in "options" and the input image either
+                base64 encoded in "image" or as input_path option relative to input_dir.
+
+        Returns:
+            Job: Queued job.
+
+        Raises:
+            HttpError: If the job is invalid, exceeds a limit or the queue is full.
+        """
+        if len(self._pending) >= self.max_queued:
+            raise HttpError(429, 'job queue is full')
+
+        options = {}
+        for (name, value) in dict(request.get('options', {})).items():
+            name = name.lstrip('-').replace('-', '_')
+            if name in FORBIDDEN_OPTIONS:
+                raise HttpError(400, 'option {} is not allowed'.format(name))
+            options[name] = value
+        input_path = self._input_path(options.pop('input_path', None), 'image' in request)
+
+        self._evict_finished()
+        job_id = str(next(self._job_ids))
+        directory = os.path.join(self.work_dir, job_id)
+        os.makedirs(directory, exist_ok=True)
+
+        try:
+            if input_path is None:
+                input_path = os.path.join(directory, 'input')
+                with open(input_path, 'wb') as file:
+                    file.write(base64.b64decode(request['image']))
+            options['input_path'] = input_path
+            args = job_args_from_options(options)
+            if not os.path.isfile(args.input_path):
+                raise ValueError('input image not found')
+            if self.max_num_lines > 0 and args.num_lines > self.max_num_lines:
+                raise ValueError('num_lines is limited to {}'.format(self.max_num_lines))
+            if self.max_output_width > 0 and not 0 < args.output_width <= self.max_output_width:
+                raise ValueError('output_width must be between 1 and {}'.format(self.max_output_width))
+            self._check_input_image(args.input_path)
+        except (ValueError, TypeError) as error:
+            shutil.rmtree(directory)
+            raise HttpError(400, str(error)) from error
+
+        options['output_path'] = os.path.join(directory, 'output.{}'.format(args.output_format.lower()))
+
+        job = Job(job_id, options, directory, args.num_lines)
+        self.jobs[job_id] = job
+        self._pending.append(job)
+        job.add_event({'event': 'queued'})
+        self._schedule()
+        return job
+
+    def _input_path(self, input_path, uploaded):
+        """Resolves the input_path option inside input_dir, or None for an uploaded image."""
+        if uploaded:
+            if input_path is not None:
+                raise HttpError(400, 'job needs either an image or input_path')
+            return None
+        if input_path is None:
+            raise HttpError(400, 'job needs an image or input_path')
+        if self.input_dir is None:
+            raise HttpError(400, 'input_path is not allowed, upload the image')
+
+        input_dir = os.path.realpath(self.input_dir)
+        input_path = os.path.realpath(os.path.join(input_dir, str(input_path)))
+        if os.path.commonpath([input_dir, input_path]) != input_dir:
+            raise HttpError(400, 'input_path must be inside the input directory')
+        return input_path
+
+    def _check_input_image(self, input_path):
+        """Reads the size of the input image from its header, without decoding it.
+
+        Raises:
+            ValueError: If the image is unreadable or has more than max_input_pixels pixels.
+        """
+        try:
+            with Image.open(input_path) as image:
+                (width, height) = image.size
+        except (OSError, Image.DecompressionBombError) as error:
+            raise ValueError('input image is not readable: {}'.format(error)) from error
+        if self.max_input_pixels > 0 and width * height > self.max_input_pixels:
+            raise ValueError('input image has {} pixels, limit is {}'.format(
+                width * height, self.max_input_pixels))
+
+    def _evict_finished(self):
+        """Removes finished jobs and their directories after finished_ttl or beyond max_finished."""
+        finished = sorted((job for job in self.jobs.values() if job.status in FINAL_STATES),
+                          key=lambda job: job.finish_time)
+        expired = finished[:max(len(finished) - self.max_finished, 0)]
+        if self.finished_ttl > 0:
+            expired += [job for job in finished[len(expired):]
+                        if time.time() - job.finish_time > self.finished_ttl]
+        for job in expired:
+            del self.jobs[job.id]
+            shutil.rmtree(job.directory, ignore_errors=True)
+
+    def cancel(self, job):
+        """Cancels a queued or running job.
+
+        Returns:
+            bool: False if the job was already finished.
+        """
+        if job.status in FINAL_STATES:
+            return False
+        if job.status == 'queued':
+            self._pending.remove(job)
+            self._finish(job, 'cancelled')
+            return True
+
+        slot = self._slot_of(job)
+        if slot.cancel_handle is None:
+            slot.cancel_event.set()
+            slot.cancel_handle = self._loop.call_later(
+                CANCEL_GRACE, self._replace_worker, slot, 'cancelled')
+        return True
+
+    def output_path(self, job):
+        return job_args_from_options(job.options).output_path
+
+    def _slot_of(self, job):
+        return next(slot for slot in self._slots if slot.job is job)
+
+    def _start_worker(self):
+        slot = _WorkerSlot(self._context)
+        self._loop.add_reader(slot.events.fileno(), self._receive_events, slot)
+        return slot
+
+    def _schedule(self):
+        for slot in self._slots:
+            if not self._pending:
+                return
+            if slot.job is None:
+                job = self._pending.popleft()
+                slot.job = job
+                slot.cancel_event.clear()
+                slot.job_queue.put((job.id, job.options))
+                job.status = 'running'
+                job.start_time = time.time()
+                job.add_event({'event': 'running'})
+                if self.job_timeout > 0:
+                    slot.timeout_handle = self._loop.call_later(
+                        self.job_timeout, self._timeout, slot, job)
+
+    def _timeout(self, slot, job):
+        if slot.job is job:
+            job.error = 'job timeout of {:.1f}s reached'.format(self.job_timeout)
+            self.cancel(job)
+
+    def _replace_worker(self, slot, status):
+        """Kills a worker which did not stop its job or died and starts a fresh one."""
+        self._loop.remove_reader(slot.events.fileno())
+        slot.close()
+        self._slots[self._slots.index(slot)] = self._start_worker()
+        if slot.job is not None:
+            self._finish(slot.job, status)
+        self._schedule()
+
+    def _receive_events(self, slot):
+        try:
+            while slot.events.poll():
+                self._handle_event(slot, *slot.events.recv())
+        except EOFError:
+            slot.process.join()
+            if slot.job is not None and slot.job.error is None:
+                slot.job.error = 'worker process exited with code {}'.format(slot.process.exitcode)
+            self._replace_worker(slot, 'failed')
+
+    def _handle_event(self, slot, job_id, kind, data):
+        job = self.jobs[job_id]
+        if kind == 'progress':
+            job.lines = data['lines']
+            job.add_event({'event': 'progress', 'lines': job.lines, 'num_lines': job.num_lines})
+            return
+
+        slot.job = None
+        for handle in (slot.timeout_handle, slot.cancel_handle):
+            if handle is not None:
+                handle.cancel()
+        slot.timeout_handle = None
+        slot.cancel_handle = None
+        if kind == 'done':
+            job.summary = data
+            job.lines = data['lines']
+        elif kind == 'failed':
+            job.error = data
+        self._finish(job, kind)
+        self._schedule()
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finish_time = time.time()
+        event = {'event': status}
+        if job.summary is not None:
+            event['summary'] = job.summary
+        if job.error is not None:
+            event['error'] = job.error
+        job.add_event(event)
+        self._evict_finished()
+
+
+async def _read_request(reader):
+    request_line = (await reader.readline()).decode('latin-1').strip()
+    if not request_line:
+        return None
+    (method, target, _) = request_line.split(' ', 2)
+
+    headers = {}
+    while True:
+        header = (await reader.readline()).decode('latin-1').strip()
+        if not header:
+            break
+        (name, _, value) = header.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0))
+    if length > MAX_REQUEST_BYTES:
+        raise HttpError(413, 'request body is larger than {} bytes'.format(MAX_REQUEST_BYTES))
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], body
+
+
+def _write_head(writer, status, content_type, length=None):
+    head = ['HTTP/1.1 {} {}'.format(status, REASONS[status]),
+            'Content-Type: {}'.format(content_type), 'Connection: close']
+    if length is not None:
+        head.append('Content-Length: {}'.format(length))
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+
+
+def _write_json(writer, status, data):
+    body = json.dumps(data).encode('utf-8')
+    _write_head(writer, status, 'application/json', len(body))
+    writer.write(body)
+
+
+async def _stream_events(writer, job):
+    """Streams all events of a job as JSON lines until the job is finished."""
+    _write_head(writer, 200, 'application/x-ndjson')
+    num_sent = 0
+    while True:
+        changed = job.changed
+        for event in job.events[num_sent:]:
+            writer.write((json.dumps(event) + '\n').encode('utf-8'))
+        num_sent = len(job.events)
+        await writer.drain()
+        if job.status in FINAL_STATES:
+            return
+        await changed.wait()
+
+
+async def _handle_request(service, method, path, body, writer):
+    parts = [part for part in path.split('/') if part]
+    if parts == ['jobs']:
+        if method == 'GET':
+            _write_json(writer, 200, [job.as_dict() for job in service.jobs.values()])
+            return
+        if method == 'POST':
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError as error:
+                raise HttpError(400, 'invalid JSON: {}'.format(error)) from error
+            job = service.submit(request)
+            _write_json(writer, 202, job.as_dict())
+            return
+        raise HttpError(405, 'use GET or POST')
+
+    if len(parts) < 2 or parts[0] != 'jobs' or parts[1] not in service.jobs:
+        raise HttpError(404, 'no such job')
+    job = service.jobs[parts[1]]
+
+    if len(parts) == 2 and method == 'GET':
+        _write_json(writer, 200, job.as_dict())
+    elif len(parts) == 2 and method == 'DELETE':
+        if not service.cancel(job):
+            raise HttpError(409, 'job is already {}'.format(job.status))
+        _write_json(writer, 202, job.as_dict())
+    elif parts[2:] == ['events'] and method == 'GET':
+        await _stream_events(writer, job)
+    elif parts[2:] == ['result'] and method == 'GET':
+        if job.status != 'done':
+            raise HttpError(409, 'job is {}'.format(job.status))
+        output_path = service.output_path(job)
+        with open(output_path, 'rb') as file:
+            data = file.read()
+        content_type = CONTENT_TYPES.get(
+            os.path.splitext(output_path)[1][1:].upper(), 'application/octet-stream')
+        _write_head(writer, 200, content_type, len(data))
+        writer.write(data)
+    else:
+        raise HttpError(404, 'unknown endpoint')
+
+
+async def handle_connection(service, reader, writer):
+    """Answers one HTTP request per connection."""
+    try:
+        request = await _read_request(reader)
+        if request is not None:
+            await _handle_request(service, *request, writer)
+    except HttpError as error:
+        _write_json(writer, error.status, {'error': str(error)})
+    except (ValueError, asyncio.IncompleteReadError) as error:
+        _write_json(writer, 400, {'error': 'malformed request: {}'.format(error)})
+    except ConnectionError:
+        pass
+    finally:
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def serve(service, host='127.0.0.1', port=8350, socket_path='', started=None):
+    """Runs the HTTP service until cancelled.
+
+    Args:
+        service (RenderService): Job queue and worker pool.
+        host (str, optional): Host to listen on. Defaults to '127.0.0.1'.
+        port (int, optional): TCP port, 0 picks a free one. Defaults to 8350.
+        socket_path (str, optional): Listen on this Unix socket instead of TCP.
+            Defaults to ''.
+        started (callable, optional): Called with the listening server. Defaults to None.
+    """
+    service.start()
+
+    def handler(reader, writer):
+        return handle_connection(service, reader, writer)
+
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+
+    try:
+        async with server:
+            if started is not None:
+                started(server)
+            await server.serve_forever()
+    finally:
+        service.stop()
+
+
+def main(args):
+    print(LOGO)
+    service = RenderService(args.jobs, args.work_dir or None, args.max_queued,
+                            args.max_num_lines, args.max_output_width, args.job_timeout,
+                            args.input_dir or None, args.max_finished, args.finished_ttl,
+                            args.max_input_pixels)
+
+    def started(server):
+        if args.socket_path:
+            print('Listening on {} with {} workers.'.format(args.socket_path, args.jobs))
+        else:
+            (host, port) = server.sockets[0].getsockname()[:2]
+            print('Listening on http://{}:{} with {} workers.'.format(host, port, args.jobs))
+
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket_path, started))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='line_drawer service - Renders jobs on warm worker processes over HTTP.')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help='Host to listen on.')
+    parser.add_argument('--port', type=int, default=8350,
+                        help='TCP port to listen on.')
+    parser.add_argument('--socket-path', type=str, default='',
+                        help='Listen on this Unix socket instead of TCP.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='Number of worker processes, i.e. jobs running in parallel.')
+    parser.add_argument('--work-dir', type=str, default='',
+                        help='Directory for uploaded images and outputs. A temporary directory is used if empty.')
+    parser.add_argument('--input-dir', type=str, default='',
+                        help='Directory of images which jobs may reference with input_path relative to it. Jobs must upload their image if empty.')
+    parser.add_argument('--max-finished', type=int, default=1000,
+                        help='Number of finished jobs kept with their outputs. Older ones are removed.')
+    parser.add_argument('--finished-ttl', type=float, default=3600.0,
+                        help='Seconds finished jobs are kept with their outputs. "0" keeps them until --max-finished is reached.')
+    parser.add_argument('--max-queued', type=int, default=100,
+                        help='Reject new jobs while this many jobs are waiting.')
+    parser.add_argument('--max-num-lines', type=int, default=0,
+                        help='Reject jobs with more lines. "0" disables it.')
+    parser.add_argument('--max-output-width', type=int, default=0,
+                        help='Reject jobs with larger output width or keeping the full image size. "0" disables it.')
+    parser.add_argument('--max-input-pixels', type=int, default=0,
+                        help='Reject jobs whose input image has more pixels, since it is decoded at full size before scaling. "0" disables it.')
+    parser.add_argument('--job-timeout', type=float, default=0.0,
+                        help='Cancel jobs running longer than this many seconds. "0" disables it.')
+
+    main(parser.parse_args())
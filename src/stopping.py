@@ -0,0 +1,180 @@
+import time
+
+import numpy as np
+
+# Rows processed at once when computing the error of a full image.
+ERROR_STRIPE_ROWS = 256
+
+# Number of lines between two adaptions of num_lines_to_check to the time budget.
+ADAPT_EVERY = 10
+
+# Part of the time budget kept free to absorb timing noise.
+BUDGET_MARGIN = 0.05
+
+
+def squared_errors(target, residual, search_max):
+    """Squared error between target and drawn image per pixel.
+
+    The drawn image is derived from the residual image, which is the target
+    image with all lines accumulated.
+
+    Args:
+        target (np.array): Preprocessed input image.
+        residual (np.array): Target image with accumulated lines.
+        search_max (bool): Additive draw type if set, otherwise subtractive.
+
+    Returns:
+        np.array: Squared errors as float64.
+    """
+    target = np.asarray(target, dtype=np.float64)
+    if search_max:
+        drawn = np.clip(target - residual, 0, 255)
+    else:
+        drawn = np.clip(255 - (residual - target), 0, 255)
+    return (target - drawn) ** 2
+
+
+class ResidualErrorTracker:
+    """
+    Keeps the summed squared error between target and drawn image up to date.
+
+    The full image is only looked at once. Afterwards only the pixels of each
+    accumulated line are evaluated again.
+    """
+
+    def __init__(self, target, residual, search_max):
+        """
+        Args:
+            target (np.array): Preprocessed input image.
+            residual (np.array): Target image with all lines so far accumulated.
+            search_max (bool): Additive draw type if set, otherwise subtractive.
+        """
+        self.target = target
+        self.search_max = search_max
+        self.squared_error = 0.0
+        for row in range(0, target.shape[0], ERROR_STRIPE_ROWS):
+            self.squared_error += float(np.sum(squared_errors(
+                target[row:row + ERROR_STRIPE_ROWS], residual[row:row + ERROR_STRIPE_ROWS],
+                search_max)))
+
+    @property
+    def mean_squared_error(self):
+        return self.squared_error / self.target.size
+
+    def update(self, yy, xx, residual_values, delta):
+        """Updates the error after delta was added to the residual at unique pixels.
+
+        Args:
+            yy (np.array): Rows of the pixels.
+            xx (np.array): Columns of the pixels.
+            residual_values (np.array): Residual values after adding delta.
+            delta (int): Value added to the pixels.
+        """
+        target_values = self.target[yy, xx]
+        residual_values = residual_values.astype(np.float64)
+        self.squared_error += float(
+            np.sum(squared_errors(target_values, residual_values, self.search_max))
+            - np.sum(squared_errors(target_values, residual_values - delta, self.search_max)))
+
+
+class StoppingCriteria:
+    """
+    Stops the line search early and adapts num_lines_to_check to a time budget.
+
+    Stops once the mean squared error reaches target_error, once it improved
+    less than min_improvement (relative) over the last window lines, or once
+    time_budget seconds are used up. With a time budget, num_lines_to_check is
+    lowered whenever the remaining lines would not fit into the remaining time
+    and raised again up to the requested value if time is left.
+    """
+
+    def __init__(self, error_tracker, target_error=0.0, min_improvement=0.0, window=100,
+                 time_budget=0.0):
+        """
+        Args:
+            error_tracker (ResidualErrorTracker): Tracks error of residual image.
+            target_error (float, optional): Stop at this mean squared error. 0 disables it.
+                Defaults to 0.0.
+            min_improvement (float, optional): Stop if relative error improvement over the
+                window is smaller. 0 disables it. Defaults to 0.0.
+            window (int, optional): Number of lines for min_improvement. Defaults to 100.
+            time_budget (float, optional): Seconds for the line search, counted from
+                construction. 0 disables it. Defaults to 0.0.
+        """
+        self.error_tracker = error_tracker
+        self.target_error = target_error
+        self.min_improvement = min_improvement
+        self.window = window
+        self.time_budget = time_budget
+
+        self.reason = None
+        self.num_lines_done = 0
+        self.num_lines_total = 0
+        self.max_lines_to_check = 0
+        self.lines_to_check = 0
+        self._start_time = time.perf_counter()
+        self._adapt_time = self._start_time
+        self._error_history = [error_tracker.mean_squared_error]
+
+    def start(self, num_lines, num_lines_to_check):
+        """Prepares a line search for num_lines lines.
+
+        Args:
+            num_lines (int): Number of lines to draw at most.
+            num_lines_to_check (int): Requested number of tries to find best line.
+        """
+        self.num_lines_done = 0
+        self.num_lines_total = num_lines
+        self.max_lines_to_check = num_lines_to_check
+        self.lines_to_check = num_lines_to_check
+        self._adapt_time = time.perf_counter()
+
+    def line_accepted(self, yy, xx, residual_values, delta):
+        """Updates error and time budget after a line was accumulated.
+
+        Args:
+            yy (np.array): Rows of the line pixels.
+            xx (np.array): Columns of the line pixels.
+            residual_values (np.array): Residual values after adding delta.
+            delta (int): Value added to the pixels.
+        """
+        self.error_tracker.update(yy, xx, residual_values, delta)
+        self.num_lines_done += 1
+        if self.min_improvement > 0:
+            self._error_history.append(self.error_tracker.mean_squared_error)
+            del self._error_history[:-(self.window + 1)]
+
+        if self.time_budget > 0 and self.num_lines_done % ADAPT_EVERY == 0:
+            self._adapt_lines_to_check()
+
+    def _adapt_lines_to_check(self):
+        now = time.perf_counter()
+        seconds_per_line = (now - self._adapt_time) / ADAPT_EVERY
+        self._adapt_time = now
+
+        remaining_lines = self.num_lines_total - self.num_lines_done
+        remaining_time = (1.0 - BUDGET_MARGIN) * self.time_budget - (now - self._start_time)
+        if remaining_lines <= 0 or seconds_per_line <= 0:
+            return
+
+        # Search time grows about linearly with the number of candidates.
+        factor = min(max(remaining_time / remaining_lines / seconds_per_line, 0.5), 2.0)
+        self.lines_to_check = int(min(max(round(self.lines_to_check * factor), 1),
+                                      self.max_lines_to_check))
+
+    def should_stop(self):
+        """Checks all criteria and remembers the reason in self.reason.
+
+        Returns:
+            bool: True if no more lines should be drawn.
+        """
+        error = self.error_tracker.mean_squared_error
+        if self.target_error > 0 and error <= self.target_error:
+            self.reason = 'target error {:.1f} reached'.format(self.target_error)
+        elif self.min_improvement > 0 and len(self._error_history) > self.window and \
+                self._error_history[0] - error < self.min_improvement * self._error_history[0]:
+            self.reason = 'error improved less than {:.2%} over {} lines'.format(
+                self.min_improvement, self.window)
+        elif self.time_budget > 0 and time.perf_counter() - self._start_time >= self.time_budget:
+            self.reason = 'time budget of {:.1f}s used up'.format(self.time_budget)
+        return self.reason is not None
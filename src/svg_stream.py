@@ -0,0 +1,121 @@
+import gzip
+
+import numpy as np
+
+# Number of lines formatted at once.
+LINE_CHUNK_SIZE = 8192
+
+
+class SvgPathWriter:
+    """
+    Writes lines as a single SVG path while they are added.
+
+    Every line becomes a compact "Mx yLx y" command. Lines starting where the
+    previous line ended only add "Lx y", so connected line sequences like
+    string art are written as one continuous polyline. start_path() continues
+    with a further path of another color.
+    """
+
+    def __init__(self, path, width, height, stroke='black', background=None, stroke_width=0.1,
+                 precision=0, compress=None, blend_mode=None, scale=1.0):
+        """
+        Args:
+            path (str): Output path.
+            width (int): Width of SVG document.
+            height (int): Height of SVG document.
+            stroke (str, optional): Stroke color of lines. Defaults to 'black'.
+            background (str, optional): Fill color of the background or None. Defaults to None.
+            stroke_width (float, optional): Stroke width of lines. Defaults to 0.1.
+            precision (int, optional): Decimal places of coordinates, 0 writes integers. Defaults to 0.
+            compress (bool, optional): Write gzip compressed SVG. Defaults to None, which
+                compresses if path ends with .svgz.
+            blend_mode (str, optional): CSS mix-blend-mode of the paths, e.g. multiply.
+                Defaults to None.
+            scale (float, optional): Display size relative to width and height. Only the
+                document size changes, coordinates stay the same. Defaults to 1.0.
+        """
+        if compress is None:
+            compress = path.lower().endswith('.svgz')
+        if compress:
+            self._file = gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+
+        if precision > 0:
+            self._point_format = '{{:.{0}f}} {{:.{0}f}}'.format(precision)
+        else:
+            self._point_format = None
+        self.lines_written = 0
+        self._last_point = None
+        self._stroke_width = stroke_width
+        self._blend_mode = blend_mode
+
+        self._file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<svg xmlns="http://www.w3.org/2000/svg" width="{2:g}" height="{3:g}" '
+            'viewBox="0 0 {0} {1}">\n'.format(width, height, width * scale, height * scale))
+        if background is not None:
+            self._file.write('<rect width="{}" height="{}" fill="{}"/>\n'.format(
+                width, height, background))
+        self._open_path(stroke)
+
+    def _open_path(self, stroke):
+        style = ''
+        if self._blend_mode is not None:
+            style = ' style="mix-blend-mode:{}"'.format(self._blend_mode)
+        self._file.write('<path fill="none" stroke="{}" stroke-width="{}"{} d="'.format(
+            stroke, self._stroke_width, style))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _format_point(self, x, y):
+        if self._point_format is None:
+            return '{} {}'.format(int(round(x)), int(round(y)))
+        return self._point_format.format(x, y)
+
+    def write_lines(self, lines):
+        """Appends lines to the path.
+
+        Args:
+            lines (list): List of point pairs or (N, 4) array of x1, y1, x2, y2 in
+                image coordinates.
+        """
+        for start in range(0, len(lines), LINE_CHUNK_SIZE):
+            chunk = lines[start:start + LINE_CHUNK_SIZE]
+            if isinstance(chunk, np.ndarray):
+                chunk = chunk.tolist()
+            else:
+                chunk = [(p_1.x, p_1.y, p_2.x, p_2.y) for (p_1, p_2) in chunk]
+
+            commands = []
+            for (x_1, y_1, x_2, y_2) in chunk:
+                point_1 = self._format_point(x_1, y_1)
+                point_2 = self._format_point(x_2, y_2)
+                if point_1 != self._last_point:
+                    commands.append('M' + point_1)
+                commands.append('L' + point_2)
+                self._last_point = point_2
+            self._file.write(''.join(commands))
+            self.lines_written += len(chunk)
+
+    def start_path(self, stroke):
+        """Ends the current path and appends following lines to a new path.
+
+        Args:
+            stroke (str): Stroke color of the new path.
+        """
+        self._file.write('"/>\n')
+        self._open_path(stroke)
+        self._last_point = None
+
+    def close(self):
+        """Finishes the SVG file."""
+        if self._file.closed:
+            return
+
+        self._file.write('"/>\n</svg>\n')
+        self._file.close()
@@ -0,0 +1,105 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import batch
+from batch import collect_input_paths, output_path_for, output_paths_for, per_image_options, run_batch
+from line_drawer import build_arg_parser
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example', 'mani_matter.png')
+RUN_JOB = batch._run_job  # pylint: disable=protected-access
+
+
+def crashing_job(job_args):
+    """Kills the worker process for inputs named crash, like a segfault would."""
+    if 'crash' in os.path.basename(job_args.input_path):
+        os._exit(1)  # pylint: disable=protected-access
+    return RUN_JOB(job_args)
+
+
+def batch_args(output_dir):
+    args = build_arg_parser().parse_args(['--num-lines', '20', '--output-width', '32'])
+    (args.output_dir, args.jobs, args.summary_path) = (output_dir, 2, '')
+    return args
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_collect_input_paths(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ('b.png', 'a.jpg', 'notes.md'):
+                open(os.path.join(temp_dir, name), 'w', encoding='utf-8').close()
+            manifest_path = os.path.join(temp_dir, 'manifest.txt')
+            with open(manifest_path, 'w', encoding='utf-8') as manifest:
+                manifest.write('# comment\n/data/x.png\n\n/data/y.png\n')
+
+            self.assertEqual(collect_input_paths([temp_dir]), [
+                os.path.join(temp_dir, 'a.jpg'), os.path.join(temp_dir, 'b.png')])
+            self.assertEqual(collect_input_paths([manifest_path]), ['/data/x.png', '/data/y.png'])
+            self.assertEqual(collect_input_paths([os.path.join(temp_dir, '*.png')]), [
+                os.path.join(temp_dir, 'b.png')])
+
+    def test_output_path_for(self):
+        self.assertEqual(output_path_for('/in/cat.jpg', '/out', 'SVG'), os.path.join('/out', 'cat.svg'))
+
+    def test_output_paths_for_same_stem(self):
+        self.assertEqual(output_paths_for(['/a/x.png', '/b/x.jpg', '/c/y.png', '/d/x.png'], '/out', 'PNG'), [
+            os.path.join('/out', name) for name in ('x.png', 'x_2.png', 'y.png', 'x_3.png')])
+
+    def test_per_image_options(self):
+        parser = build_arg_parser()
+        self.assertEqual(per_image_options(parser.parse_args(['--num-lines', '20'])), [])
+        self.assertEqual(per_image_options(parser.parse_args(
+            ['--lines-path', 'lines.npz', '--checkpoint-path', 'c.npz'])), ['--checkpoint-path', '--lines-path'])
+
+
+class TestRunBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.temp_dir, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def copy_example(self, *names):
+        path = os.path.join(self.temp_dir, *names)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copy(EXAMPLE_PATH, path)
+        return path
+
+    def test_bad_image_does_not_stop_others(self):
+        bad_path = os.path.join(self.temp_dir, 'bad.png')
+        with open(bad_path, 'w', encoding='utf-8') as file:
+            file.write('no image')
+        input_paths = [self.copy_example('a', 'x.png'), bad_path, self.copy_example('b', 'x.png')]
+
+        summaries = run_batch(batch_args(self.output_dir), input_paths)
+
+        self.assertEqual(['error' in summary for summary in summaries], [False, True, False])
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ['x.png', 'x_2.png'])
+
+    def test_rejects_per_image_options(self):
+        args = batch_args(self.output_dir)
+        args.lines_path = os.path.join(self.temp_dir, 'lines.npz')
+        with self.assertRaises(ValueError):
+            run_batch(args, [self.copy_example('a.png'), self.copy_example('b.png')])
+
+    def test_worker_crash_fails_only_its_image(self):
+        input_paths = [self.copy_example('crash.png'), self.copy_example('a.png'),
+                       self.copy_example('b.png')]
+        with mock.patch('batch._run_job', crashing_job):
+            summaries = run_batch(batch_args(self.output_dir), input_paths)
+
+        self.assertIn('BrokenProcessPool', summaries[0]['error'])
+        self.assertEqual(['error' in summary for summary in summaries[1:]], [False, False])
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ['a.png', 'b.png'])
+
+
+if __name__ == '__main__':
+    unittest.main()
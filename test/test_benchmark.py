@@ -0,0 +1,37 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bench'))
+
+from benchmark import compare_results, run_angle_sampling_benchmark, synthetic_image
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_synthetic_image(self):
+        image = synthetic_image(64)
+        self.assertEqual(image.shape, (64, 64))
+        self.assertTrue((image >= 0).all() and (image <= 255).all())
+        self.assertTrue((image == synthetic_image(64)).all())
+
+    def test_compare_results(self):
+        baseline = {'a': {'time': 1.0, 'mse': 100.0}, 'b': {'time': 1.0}, 'c': {'time': 1.0}}
+        current = {'a': {'time': 1.1, 'mse': 110.0}, 'b': {'time': 1.5}, 'd': {'time': 1.0}}
+
+        rows = compare_results(baseline, current, threshold=0.2, quality_threshold=0.02)
+        self.assertEqual([row['case'] for row in rows], ['a', 'b'])
+        self.assertEqual(rows[0]['regressions'], ['quality'])
+        self.assertEqual(rows[1]['regressions'], ['time'])
+
+    def test_run_angle_sampling_benchmark(self):
+        rows = run_angle_sampling_benchmark(32, 20, (2, 5), progress=lambda line: None)
+        self.assertEqual(len(rows), 8)
+        for row in rows:
+            self.assertGreater(row['mse'], 0)
+            self.assertGreater(row['mse_guided'], 0)
+            self.assertTrue(2 <= row['same_mse_at'] <= 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
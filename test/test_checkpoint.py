@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from checkpoint import load_checkpoint, save_checkpoint
+from geometry import PointInt
+from line_drawer import DrawType, build_arg_parser, draw_image, iter_image_lines
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example', 'mani_matter.png')
+CONFIG = {'shape': (40, 50), 'draw_type': 'SUBTRACTIVE'}
+
+
+def target_image():
+    return np.random.default_rng(3).integers(0, 255, (40, 50)).astype(np.int16)
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'checkpoint.npz')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        residual = target_image()
+        lines = [(PointInt(0, 1), PointInt(49, 30)), (PointInt(5, 39), PointInt(7, 0))]
+        np.random.seed(5)
+        save_checkpoint(self.path, residual, lines, [4, 2], CONFIG)
+        expected_random = np.random.rand(3)
+
+        np.random.seed(6)
+        (loaded_residual, loaded_lines, loaded_ids) = load_checkpoint(self.path, CONFIG)
+        self.assertTrue(np.array_equal(loaded_residual, residual))
+        self.assertEqual(loaded_lines, lines)
+        self.assertEqual(loaded_ids, [4, 2])
+        self.assertTrue(np.array_equal(np.random.rand(3), expected_random))
+
+    def test_config_mismatch(self):
+        save_checkpoint(self.path, target_image(), [], [], CONFIG)
+        with self.assertRaises(ValueError):
+            load_checkpoint(self.path, dict(CONFIG, draw_type='ADDITIVE'))
+
+    def test_resume_matches_uninterrupted_run(self):
+        np.random.seed(42)
+        image = target_image()
+        expected_lines = list(iter_image_lines(image, 30, 5, DrawType.SUBTRACTIVE))
+
+        np.random.seed(42)
+        image = target_image()
+        lines = []
+        for line_ in iter_image_lines(image, 12, 5, DrawType.SUBTRACTIVE):
+            lines.append(line_)
+        save_checkpoint(self.path, image, lines, [], CONFIG)
+        np.random.seed(0)
+
+        (image, lines, _) = load_checkpoint(self.path, CONFIG)
+        lines += list(iter_image_lines(image, 18, 5, DrawType.SUBTRACTIVE))
+        self.assertEqual(lines, expected_lines)
+
+    def test_resume_with_other_search_settings(self):
+        argv = ['--input-path', EXAMPLE_PATH, '--output-path', os.path.join(self.temp_dir.name, 'out.png'),
+                '--num-lines', '20', '--output-width', '32', '--checkpoint-path', self.path,
+                '--checkpoint-every', '10']
+        draw_image(build_arg_parser().parse_args(argv))
+
+        for option in (['--lines-per-round', '4'], ['--engine', 'NUMBA'], ['--orientation-spread', '0.2']):
+            with self.assertRaises(ValueError):
+                draw_image(build_arg_parser().parse_args(argv + ['--resume'] + option))
+
+
+if __name__ == '__main__':
+    unittest.main()
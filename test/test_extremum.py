@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+
+from src.extremum import ExtremumIndex
+
+
+class TestExtremumIndex(unittest.TestCase):
+
+    def _check_against_full_scan(self, search_max, delta):
+        rng = np.random.default_rng(1)
+        image = rng.integers(0, 20, (30, 40)).astype(np.int16)
+        expected_image = image.copy()
+        extremum_index = ExtremumIndex(image, search_max)
+
+        for _ in range(200):
+            if search_max:
+                value = np.max(expected_image)
+            else:
+                value = np.min(expected_image)
+            expected = np.flatnonzero(expected_image == value)
+            self.assertTrue(np.array_equal(extremum_index.target_pixels(), expected))
+
+            flat_indexes = rng.choice(image.size, 50, replace=False)
+            yy, xx = np.divmod(flat_indexes, image.shape[1])
+            extremum_index.accumulate(yy, xx, delta)
+            expected_image[yy, xx] += delta
+
+        self.assertTrue(np.array_equal(image, expected_image))
+
+    def test_darkest_pixels(self):
+        self._check_against_full_scan(False, 3)
+
+    def test_brightest_pixels(self):
+        self._check_against_full_scan(True, -3)
+
+    def test_pick_random__same_as_np_where(self):
+        image = np.random.default_rng(2).integers(0, 3, (10, 10)).astype(np.int16)
+        (indexes_y, indexes_x) = np.where(image == np.min(image))
+
+        np.random.seed(42)
+        random_index = np.random.randint(0, indexes_x.shape[0])
+        np.random.seed(42)
+        self.assertEqual(ExtremumIndex(image, False).pick_random(),
+                         (indexes_y[random_index], indexes_x[random_index]))
+
+    def test_extreme_pixels(self):
+        image = np.random.default_rng(3).integers(0, 50, (20, 30)).astype(np.int16)
+        for search_max in (False, True):
+            extremum_index = ExtremumIndex(image, search_max)
+            for min_count in (1, 10, 100, 1000):
+                pixels = extremum_index.extreme_pixels(min_count)
+                values = image.reshape(-1)[pixels]
+                others = np.delete(image.reshape(-1), pixels)
+
+                self.assertGreaterEqual(pixels.shape[0], min(min_count, image.size))
+                self.assertTrue(np.all(np.diff(pixels) > 0))
+                if search_max and others.size:
+                    self.assertGreater(np.min(values), np.max(others))
+                elif others.size:
+                    self.assertLess(np.max(values), np.min(others))
+
+    def test_sample_extreme_pixels(self):
+        rng = np.random.default_rng(4)
+        for search_max in (False, True):
+            image = rng.integers(0, 50, (60, 80)).astype(np.int16)
+            extremum_index = ExtremumIndex(image, search_max)
+            np.random.seed(0)
+            for _ in range(20):
+                expected = set(extremum_index.extreme_pixels(40).tolist())
+                pixels = extremum_index.sample_extreme_pixels(40, 40)
+
+                self.assertEqual(len(set(pixels.tolist())), pixels.shape[0])
+                self.assertGreater(pixels.shape[0], 20)
+                self.assertTrue(set(pixels.tolist()) <= expected)
+
+                # Lines move pixels out of the pool.
+                yy, xx = np.divmod(pixels[:10], image.shape[1])
+                extremum_index.accumulate(yy, xx, -5 if search_max else 5)
+
+    def test_not_contiguous(self):
+        image = np.zeros((10, 10), dtype=np.int16)
+        with self.assertRaises(ValueError):
+            ExtremumIndex(image[:, ::2], False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,14 @@
+import math
 import unittest
 
+import numpy as np
+
 
 # class TestGeometry(unittest.TestCase):
 #     def test_ole(self):
 #         self.assertEqual(1,1)
 
-from src.geometry import Point, LineSegment, Line, Rectangle
+from src.geometry import Point, Points, LineSegment, Line, Rectangle
 
 
 class TestGeometryPoint(unittest.TestCase):
@@ -26,6 +29,25 @@ class TestGeometryPoint(unittest.TestCase):
         self.assertTrue(p_1.equals(p_2))
 
 
+class TestGeometryPoints(unittest.TestCase):
+
+    def test_from_points(self):
+        points = Points.from_points([Point(3.0, 1.0), Point(-2.0, 4.5)])
+        self.assertEqual(len(points), 2)
+        self.assertEqual(points.x.tolist(), [3.0, -2.0])
+        self.assertEqual(points.y.tolist(), [1.0, 4.5])
+        self.assertEqual(points[1], Point(-2.0, 4.5))
+        self.assertEqual(points.as_points(), [Point(3.0, 1.0), Point(-2.0, 4.5)])
+
+    def test_add(self):
+        points = Points([[0.0, 1.0], [2.0, 3.0]]) + Points([1.0, -1.0])
+        self.assertEqual(points.xy.tolist(), [[1.0, 0.0], [3.0, 2.0]])
+
+    def test_equals(self):
+        points = Points([[0.0, 1.0], [0.0, 0.1], [0.0, 1e-5]])
+        self.assertEqual(points.equals(Points([0.0, 0.0])).tolist(), [False, False, True])
+
+
 class TestGeometryLineSegment(unittest.TestCase):
 
     def test_is_intersecting(self):
@@ -148,9 +170,30 @@ class TestGeometryRectangle(unittest.TestCase):
         # Check if all testpoints are available.
         test_point = Point(0,30.0)
         self.assertTrue(test_point in intersections)
-            
 
-        
+    def test_intersect_lines__same_as_intersection_with_line(self):
+        test_rectangle = Rectangle(40, 30, Point(0.0, -30.0))
+        start_point = Point(12.0, -7.0)
+        angles = np.linspace(-math.pi / 2, math.pi / 2, 181)
+        directions = Points(np.column_stack((np.cos(angles), np.sin(angles))))
+
+        endpoints, valid = test_rectangle.intersect_lines(Points(start_point.as_tuple()), directions)
+        self.assertEqual(endpoints.shape, (181, 2, 2))
+
+        for i, direction in enumerate(directions.as_points()):
+            intersections = test_rectangle.intersection_with_line(Line(start_point, direction))
+            self.assertEqual(valid[i], len(intersections) == 2)
+            if valid[i]:
+                self.assertEqual(Points(endpoints[i]).as_points(), intersections)
+
+    def test_intersect_lines__edge_cases(self):
+        test_rectangle = Rectangle(30, 40)
+        points = Points([[-1.0, -1.0], [-1.0, -1.0], [-1.0, 39.0]])
+        directions = Points([[1.0, 1.0], [1.0, -1.0], [1.0, 1.0]])
+
+        endpoints, valid = test_rectangle.intersect_lines(points, directions)
+        self.assertEqual(valid.tolist(), [True, False, False])
+        self.assertEqual(Points(endpoints[0]).as_points(), [Point(0.0, 0.0), Point(30.0, 30.0)])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from geometry import Point
+from jit_engine import JitLineSearch, _clip_line, iter_jit_image_lines
+from line_drawer import DrawType, compute_image_lines
+from scoring import _clip_lines_to_image
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example', 'mani_matter.png')
+
+
+class TestJitEngine(unittest.TestCase):
+    """Runs compiled if Numba is installed and as plain Python otherwise."""
+
+    def test_same_lines_as_python_engine(self):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (40, 56)).astype(np.int16)
+
+        for draw_type in DrawType:
+            np.random.seed(42)
+            residual = image.copy()
+            lines = compute_image_lines(residual, 60, 10, draw_type)
+
+            np.random.seed(42)
+            jit_residual = image.copy()
+            jit_lines = list(iter_jit_image_lines(
+                jit_residual, 60, 10, draw_type == DrawType.ADDITIVE, 10))
+
+            self.assertEqual(jit_lines, lines)
+            self.assertTrue(np.array_equal(jit_residual, residual))
+
+    def test_same_lines_as_python_engine_in_corner(self):
+        image = np.full((20, 20), 200, dtype=np.int16)
+        image[0, 0] = 0
+
+        np.random.seed(0)
+        residual = image.copy()
+        lines = compute_image_lines(residual, 30, 1, DrawType.SUBTRACTIVE)
+
+        np.random.seed(0)
+        jit_residual = image.copy()
+        jit_lines = list(iter_jit_image_lines(jit_residual, 30, 1, False, 10))
+
+        self.assertEqual(jit_lines, lines)
+        self.assertTrue(np.array_equal(jit_residual, residual))
+
+    def test_clipped_endpoints_same_as_rectangle(self):
+        borders = JitLineSearch(np.zeros((30, 50), dtype=np.int16), False, 10)._borders
+        np.random.seed(3)
+        angles = (np.random.rand(200) - 0.5) * np.pi
+        endpoint = np.zeros(4, dtype=np.int64)
+        for (index_y, index_x) in ((0, 0), (29, 49), (12, 0), (7, 33)):
+            endpoints, valid = _clip_lines_to_image(Point(index_x, -index_y), angles, 50, 30)
+            endpoints[:, :, 1] *= -1
+            endpoints = np.trunc(endpoints).astype(np.int64).reshape(-1, 4)
+
+            for (k, (cos, sin)) in enumerate(zip(np.cos(angles), np.sin(angles))):
+                self.assertEqual(_clip_line(float(index_x), float(-index_y), cos, sin, borders,
+                                            endpoint), valid[k])
+                if valid[k]:
+                    self.assertEqual(endpoint.tolist(), endpoints[k].tolist())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from geometry import PointInt
+from line_drawer import (DrawType, build_arg_parser, build_render_arg_parser, check_args,
+                         compute_color_lines, compute_image_lines, draw_line_image, iter_image_lines,
+                         line_counts, render_lines, residual_error, scale_lines)
+from line_file import save_lines
+from PIL import Image
+
+
+def target_image():
+    yy, xx = np.indices((60, 80))
+    return np.clip(255 - 3 * np.hypot(yy - 30, xx - 40), 0, 255).astype(np.int16)
+
+
+class TestCheckArgs(unittest.TestCase):
+
+    def test_line_by_line_options(self):
+        parser = build_arg_parser()
+        check_args(parser.parse_args(['--checkpoint-path', 'c.npz', '--time-budget', '5']))
+        check_args(parser.parse_args(['--engine', 'RADON']))
+        check_args(parser.parse_args(['--large-image', '--time-budget', '5']))
+        check_args(parser.parse_args(['--angle-resolution', '90', '--time-budget', '5']))
+        for argv in (['--engine', 'PINS', '--resume'], ['--engine', 'RADON', '--preview-path', 'p.png'],
+                     ['--color', '--target-error', '100'], ['--color', '--large-image'],
+                     ['--color', '--workers', '2'], ['--large-image', '--workers', '2'],
+                     ['--large-image', '--pyramid-factor', '4'], ['--large-image', '--lines-per-round', '8'],
+                     ['--large-image', '--checkpoint-path', 'c.npz'],
+                     ['--angle-resolution', '90', '--workers', '2'],
+                     ['--angle-resolution', '90', '--pyramid-factor', '4']):
+            with self.assertRaises(ValueError):
+                check_args(parser.parse_args(argv))
+
+
+def corner_image():
+    """Image whose darkest pixel is in a corner, where most lines leave the image at once."""
+    image = np.full((20, 20), 200, dtype=np.int16)
+    image[0, 0] = 0
+    return image
+
+
+class TestCornerPixel(unittest.TestCase):
+
+    def test_lines_inside_image(self):
+        image = corner_image()
+        np.random.seed(0)
+        lines = compute_image_lines(image, 30, 1, DrawType.SUBTRACTIVE)
+
+        self.assertEqual(len(lines), 30)
+        self.assertTrue(np.array_equal(image - corner_image(), 10 * line_counts(lines, image.shape)))
+
+
+class TestLinesPerRound(unittest.TestCase):
+
+    def test_residual_matches_lines(self):
+        for draw_type in DrawType:
+            target = target_image()
+            residual = target.copy()
+
+            np.random.seed(42)
+            lines = compute_image_lines(residual, 200, 10, draw_type, lines_per_round=8)
+            self.assertEqual(len(lines), 200)
+
+            # The residual holds exactly the accumulated lines.
+            line_image = draw_line_image(lines, target.shape, draw_type)
+            if draw_type == DrawType.ADDITIVE:
+                self.assertTrue(np.array_equal(target - residual, line_image.astype(np.int64)))
+            else:
+                self.assertTrue(np.array_equal(residual - target, 255 - line_image.astype(np.int64)))
+
+    def test_residual_matches_lines_mid_round(self):
+        target = target_image()
+        residual = target.copy()
+
+        np.random.seed(42)
+        lines = []
+        for line_ in iter_image_lines(residual, 200, 10, DrawType.SUBTRACTIVE, lines_per_round=8):
+            lines.append(line_)
+            if len(lines) == 3:
+                break
+
+        # Lines found in the same round but not yet yielded are not in the residual.
+        line_image = draw_line_image(lines, target.shape, DrawType.SUBTRACTIVE)
+        self.assertTrue(np.array_equal(residual - target, 255 - line_image.astype(np.int64)))
+
+    def test_quality_close_to_one_line_per_round(self):
+        target = target_image()
+        errors = []
+        for lines_per_round in (1, 8):
+            residual = target.copy()
+            np.random.seed(42)
+            compute_image_lines(residual, 300, 20, DrawType.SUBTRACTIVE,
+                                lines_per_round=lines_per_round)
+            errors.append(residual_error(target, residual, DrawType.SUBTRACTIVE))
+        self.assertLess(errors[1], 1.1 * errors[0])
+
+
+class TestColor(unittest.TestCase):
+
+    def test_draw_line_image_per_channel(self):
+        lines = [(PointInt(0, 0), PointInt(9, 0)), (PointInt(0, 1), PointInt(9, 1)),
+                 (PointInt(0, 2), PointInt(9, 2))]
+        image = draw_line_image(lines, (3, 10), DrawType.SUBTRACTIVE, 100, line_channels=[0, 2, 2])
+        self.assertEqual(image.shape, (3, 10, 3))
+        self.assertEqual(image[0, 0].tolist(), [155, 255, 255])
+        self.assertEqual(image[1, 0].tolist(), [255, 255, 155])
+
+    def test_parallel_same_as_sequential(self):
+        target = np.dstack([target_image(), target_image()[::-1], 255 - target_image()])
+        args = build_arg_parser().parse_args(['--num-lines', '50', '--no-random-result'])
+
+        results = []
+        for jobs in (1, 3):
+            residual = target.copy()
+            lines, _, line_channels, _ = compute_color_lines(args, residual, DrawType.SUBTRACTIVE, jobs)
+            results.append((lines, residual))
+            self.assertEqual(line_channels[:6], [0, 1, 2, 0, 1, 2])
+
+        self.assertEqual(results[0][0], results[1][0])
+        self.assertTrue(np.array_equal(results[0][1], results[1][1]))
+
+        # The residual of every channel holds exactly the lines of that channel.
+        line_image = draw_line_image(results[0][0], target.shape[:2], DrawType.SUBTRACTIVE,
+                                     line_channels=line_channels)
+        self.assertTrue(np.array_equal(results[0][1] - target, 255 - line_image.astype(np.int64)))
+
+
+class TestRender(unittest.TestCase):
+
+    def test_render_same_as_draw_line_image(self):
+        target = target_image()
+        np.random.seed(42)
+        lines = compute_image_lines(target.copy(), 100, 10, DrawType.ADDITIVE)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            lines_path = os.path.join(temp_dir, 'lines.npz')
+            output_path = os.path.join(temp_dir, 'output.png')
+            save_lines(lines_path, lines, target.shape, {
+                'draw_type': 'ADDITIVE', 'line_heaviness': 30, 'stroke_width': 0.1})
+            render_lines(build_render_arg_parser().parse_args([lines_path, '--output-path', output_path]))
+
+            self.assertTrue(np.array_equal(np.asarray(Image.open(output_path)),
+                                           draw_line_image(lines, target.shape, DrawType.ADDITIVE, 30)))
+
+    def test_render_antialias(self):
+        lines = np.array([[0, 10, 79, 10], [40, 0, 40, 59]])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            lines_path = os.path.join(temp_dir, 'lines.npz')
+            output_path = os.path.join(temp_dir, 'output.png')
+            save_lines(lines_path, lines, (60, 80), {
+                'draw_type': 'SUBTRACTIVE', 'line_heaviness': 30, 'stroke_width': 0.1})
+            render_lines(build_render_arg_parser().parse_args(
+                [lines_path, '--output-path', output_path, '--scale', '2', '--antialias']))
+            image = np.asarray(Image.open(output_path))
+
+        self.assertEqual(image.shape, (120, 160))
+        self.assertEqual(image[21, 20], 225)
+
+    def test_scale_lines(self):
+        lines = np.array([[0, 0, 79, 59]])
+        self.assertEqual(scale_lines(lines, 2.0, (120, 160)).tolist(), [[0, 0, 158, 118]])
+        self.assertEqual(scale_lines(lines, 0.5, (30, 40)).tolist(), [[0, 0, 39, 29]])
+
+
+if __name__ == '__main__':
+    unittest.main()
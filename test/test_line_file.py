@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from geometry import PointInt
+from line_file import lines_from_array, lines_to_array, load_lines, save_lines
+
+
+class TestLineFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_array_round_trip(self):
+        lines = [(PointInt(0, 1), PointInt(2, 3)), (PointInt(4, 5), PointInt(6, 7))]
+        array = lines_to_array(lines)
+        self.assertEqual(array.dtype, np.int32)
+        self.assertEqual(array.tolist(), [[0, 1, 2, 3], [4, 5, 6, 7]])
+        self.assertEqual(lines_from_array(array), lines)
+        self.assertEqual(lines_to_array([]).shape, (0, 4))
+
+    def test_save_and_load(self):
+        path = os.path.join(self.temp_dir.name, 'drawing.lines')
+        lines = np.array([[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11]])
+        save_lines(path, lines, (12, 20), {'draw_type': 'ADDITIVE', 'seed': None}, [0, 2, 1], [5, 6, 7])
+
+        self.assertEqual(os.listdir(self.temp_dir.name), ['drawing.lines'])
+        with np.load(path) as line_file:
+            self.assertEqual(line_file['lines'].dtype, np.int16)
+
+        loaded, metadata, channels, line_ids = load_lines(path)
+        self.assertTrue(np.array_equal(loaded, lines))
+        self.assertEqual(channels.tolist(), [0, 2, 1])
+        self.assertEqual(line_ids.tolist(), [5, 6, 7])
+        self.assertEqual((metadata['height'], metadata['width']), (12, 20))
+        self.assertEqual(metadata['draw_type'], 'ADDITIVE')
+        self.assertIsNone(metadata['seed'])
+
+    def test_large_coordinates(self):
+        path = os.path.join(self.temp_dir.name, 'lines.npz')
+        lines = np.array([[0, 0, 40000, 1]])
+        save_lines(path, lines, (2, 40001))
+
+        loaded, _, channels, line_ids = load_lines(path)
+        self.assertTrue(np.array_equal(loaded, lines))
+        self.assertIsNone(channels)
+        self.assertIsNone(line_ids)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.line_table import LineTable
+
+
+class TestLineTable(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.width, self.height = (23, 17)
+        self.line_table = LineTable.load_or_build(self.temp_dir.name, self.width, self.height, 12)
+
+    def tearDown(self):
+        del self.line_table
+        self.temp_dir.cleanup()
+
+    def test_load_or_build__cached(self):
+        directory = LineTable.cache_path(self.temp_dir.name, self.width, self.height, 12)
+        self.assertTrue(os.path.isdir(directory))
+        self.assertEqual(LineTable(directory).num_lines, self.line_table.num_lines)
+
+    def test_every_pixel_once_per_angle(self):
+        for a in range(self.line_table.num_angles):
+            line_ids = np.arange(self.line_table.line_base[a], self.line_table.line_base[a + 1])
+            flat_indexes, _ = self.line_table.pixels(line_ids)
+            self.assertEqual(sorted(flat_indexes.tolist()), list(range(self.width * self.height)))
+
+    def test_crossing_line_ids__same_as_line_ids(self):
+        rng = np.random.default_rng(1)
+        xx = rng.integers(0, self.width, 50)
+        yy = rng.integers(0, self.height, 50)
+
+        crossing_line_ids = self.line_table.crossing_line_ids(xx, yy)
+        self.assertEqual(crossing_line_ids.shape, (self.line_table.num_angles, 50))
+        for a in range(self.line_table.num_angles):
+            self.assertTrue(np.array_equal(
+                crossing_line_ids[a], self.line_table.line_ids(np.full(50, a), xx, yy)))
+
+    def test_line_ids__line_goes_through_pixel(self):
+        rng = np.random.default_rng(0)
+        xx = rng.integers(0, self.width, 100)
+        yy = rng.integers(0, self.height, 100)
+        angle_indexes = rng.integers(0, self.line_table.num_angles, 100)
+
+        line_ids = self.line_table.line_ids(angle_indexes, xx, yy)
+        flat_indexes, offsets = self.line_table.pixels(line_ids)
+        for i in range(100):
+            self.assertIn(yy[i] * self.width + xx[i], flat_indexes[offsets[i]:offsets[i+1]])
+
+    def test_endpoints__first_and_last_pixel(self):
+        flat_indexes, offsets = self.line_table.pixels(np.arange(self.line_table.num_lines))
+        (x_1, y_1, x_2, y_2) = np.asarray(self.line_table.endpoints).T
+        self.assertTrue(np.array_equal(flat_indexes[offsets[:-1]], y_1 * self.width + x_1))
+        self.assertTrue(np.array_equal(flat_indexes[offsets[1:] - 1], y_2 * self.width + x_2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from line_drawer import DrawType, compute_image_lines
+from metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_line_finished(self):
+        calls = []
+        errors = iter([3.0, 2.0])
+        metrics = Metrics(callback=lambda m, n: calls.append(n), callback_every=2,
+                          error_function=lambda: next(errors), error_every=3)
+        for num_lines in range(1, 7):
+            metrics.line_finished(num_lines)
+
+        self.assertEqual(calls, [2, 4, 6])
+        self.assertEqual(metrics.error_trajectory, [(3, 3.0), (6, 2.0)])
+        self.assertIn('error_tracking', metrics.timings)
+
+    def test_save(self):
+        metrics = Metrics()
+        metrics.lap('scoring')
+        metrics.count('lines', 2)
+        metrics.error_trajectory.append((2, 1.5))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path = os.path.join(temp_dir, 'metrics.json')
+            metrics.save(json_path)
+            with open(json_path, encoding='utf-8') as file:
+                saved = json.load(file)
+            self.assertEqual(saved['counters'], {'lines': 2})
+            self.assertEqual(saved['error_trajectory'], [[2, 1.5]])
+
+            csv_path = os.path.join(temp_dir, 'metrics.csv')
+            metrics.save(csv_path)
+            with open(csv_path, encoding='utf-8') as file:
+                rows = list(csv.reader(file))
+            self.assertEqual(rows[0], ['kind', 'name', 'value'])
+            self.assertEqual([row[:2] for row in rows[1:]],
+                             [['timing', 'scoring'], ['counter', 'lines'], ['error', '2']])
+
+    def test_compute_image_lines_unchanged(self):
+        image = np.random.default_rng(0).integers(0, 255, (40, 50)).astype(np.int16)
+
+        np.random.seed(42)
+        expected_lines = compute_image_lines(image.copy(), 20, 5, DrawType.SUBTRACTIVE)
+
+        metrics = Metrics()
+        np.random.seed(42)
+        lines = compute_image_lines(image.copy(), 20, 5, DrawType.SUBTRACTIVE, metrics=metrics)
+        self.assertEqual(lines, expected_lines)
+        self.assertEqual(metrics.counters['lines'], 20)
+        self.assertEqual(metrics.counters['candidates'], 100)
+        for phase in ('extremum_search', 'candidate_generation', 'rasterization', 'scoring',
+                      'accumulation'):
+            self.assertIn(phase, metrics.timings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from line_drawer import DrawType, compute_image_lines
+from orientation import OrientationMap
+
+
+def line_image(direction_x, direction_y, size=64):
+    """White image with a dark line through the center in image coordinates."""
+    image = np.full((size, size), 255, dtype=np.int16)
+    steps = np.arange(-size, size)
+    yy = np.rint(size / 2 + steps * direction_y).astype(int)
+    xx = np.rint(size / 2 + steps * direction_x).astype(int)
+    inside = (yy >= 0) & (yy < size) & (xx >= 0) & (xx < size)
+    image[yy[inside], xx[inside]] = 0
+    return image
+
+
+class TestOrientationMap(unittest.TestCase):
+
+    def test_angles_follow_dark_line(self):
+        for (direction, angle) in (((1, 0), 0.0), ((0, 1), -np.pi / 2), ((1, 1), -np.pi / 4),
+                                   ((1, -1), np.pi / 4)):
+            orientation_map = OrientationMap(line_image(*direction), 0.2, False)
+            # Angles of lines are equal modulo pi.
+            self.assertLess(abs(np.sin(orientation_map.angles[32, 32] - angle)), 1e-3)
+            self.assertGreater(orientation_map.coherence[32, 32], 0.9)
+
+    def test_additive_ink_is_bright(self):
+        orientation_map = OrientationMap(255 - line_image(1, 0), 0.2, True)
+        self.assertAlmostEqual(float(orientation_map.angles[32, 32]), 0.0, places=3)
+
+    def test_flat_image_samples_uniformly(self):
+        orientation_map = OrientationMap(np.full((40, 40), 128, dtype=np.int16), 0.2, False)
+        np.random.seed(0)
+        angles = orientation_map.sample_angles(20, 20, 2000)
+        self.assertTrue(np.all((angles >= -np.pi / 2) & (angles < np.pi / 2)))
+        self.assertAlmostEqual(np.std(angles), np.pi / np.sqrt(12), places=1)
+
+    def test_sample_angles_around_orientation(self):
+        orientation_map = OrientationMap(line_image(1, 1), 0.1, False)
+        np.random.seed(0)
+        angles = orientation_map.sample_angles(32, 32, 2000)
+        self.assertGreater(np.mean(np.abs(angles + np.pi / 4) < 0.3), 0.8)
+
+    def test_downsampled_map(self):
+        image = line_image(1, 0, 600)
+        orientation_map = OrientationMap(image, 0.2, False)
+        self.assertEqual(orientation_map.factor, 3)
+        self.assertEqual(orientation_map.angles.shape, (200, 200))
+        np.random.seed(0)
+        self.assertEqual(orientation_map.sample_angles(599, 599, 5).shape, (5,))
+
+    def test_compute_image_lines_reproducible(self):
+        image = line_image(1, 1)
+        results = []
+        for _ in range(2):
+            np.random.seed(42)
+            residual = image.copy()
+            results.append(compute_image_lines(
+                residual, 30, 5, DrawType.SUBTRACTIVE,
+                orientation_map=OrientationMap(image, 0.2, False)))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(results[0]), 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
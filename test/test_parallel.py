@@ -0,0 +1,87 @@
+import os
+import sys
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from geometry import Point
+from line_drawer import DrawType, draw_line_image, iter_image_lines, line_counts
+from parallel import ParallelLineScorer
+
+
+class TestParallelLineScorer(unittest.TestCase):
+
+    def _find_lines(self, image, seed):
+        with ParallelLineScorer(image, 2, seed) as scorer:
+            return [scorer.find_best_line_through_point(9, Point(x, -y), False)
+                    for (x, y) in ((3, 4), (20, 10), (0, 0), (39, 29))]
+
+    def test_reproducible(self):
+        image = np.random.default_rng(0).integers(0, 255, (30, 40)).astype(np.int16)
+        results = self._find_lines(image, 7)
+        self.assertEqual(results, self._find_lines(image, 7))
+
+        for (p_1, p_2), best_mean_value in results:
+            yy, xx = np.round(np.linspace((p_1.y, p_1.x), (p_2.y, p_2.x), 50)).astype(int).T
+            self.assertTrue(np.all((0 <= yy) & (yy < 30) & (0 <= xx) & (xx < 40)))
+            self.assertTrue(0 <= best_mean_value <= 255)
+
+    def test_shared_image(self):
+        image = np.zeros((10, 10), dtype=np.int16)
+        with ParallelLineScorer(image, 1, 0) as scorer:
+            scorer.image[:] = 100
+            (_, best_mean_value) = scorer.find_best_line_through_point(5, Point(5, -5), False)
+        self.assertEqual(best_mean_value, 100)
+
+    def test_close_after_worker_died(self):
+        scorer = ParallelLineScorer(np.zeros((10, 10), dtype=np.int16), 2, 0)
+        name = scorer._memory.name  # pylint: disable=protected-access
+        scorer._processes[0].kill()  # pylint: disable=protected-access
+        scorer._processes[0].join()  # pylint: disable=protected-access
+        scorer.close()
+
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_find_best_lines_through_pixels(self):
+        image = np.random.default_rng(0).integers(0, 255, (30, 40)).astype(np.int16)
+        (index_ys, index_xs) = (np.array([3, 10, 25, 29, 0]), np.array([4, 20, 5, 39, 0]))
+
+        def find_lines(seed):
+            with ParallelLineScorer(image, 2, seed) as scorer:
+                return scorer.find_best_lines_through_pixels(9, index_ys, index_xs, False)
+
+        (endpoints, mean_values) = find_lines(7)
+        self.assertEqual(endpoints.shape, (5, 2, 2))
+        self.assertTrue(np.all(np.diff(mean_values) >= 0))
+        self.assertTrue(np.all((endpoints >= 0) & (endpoints < (40, 30))))
+        self.assertTrue(np.array_equal(endpoints, find_lines(7)[0]))
+
+    def test_rounds_with_workers(self):
+        target = np.random.default_rng(1).integers(0, 255, (30, 40)).astype(np.int16)
+        image = target.copy()
+        np.random.seed(42)
+        lines = list(iter_image_lines(image, 60, 5, DrawType.SUBTRACTIVE, workers=2, lines_per_round=8))
+
+        self.assertEqual(len(lines), 60)
+        # The caller's image holds exactly the accumulated lines.
+        self.assertTrue(np.array_equal(
+            image - target, 255 - draw_line_image(lines, target.shape, DrawType.SUBTRACTIVE).astype(np.int64)))
+
+    def test_corner_pixel_with_workers(self):
+        target = np.full((20, 20), 200, dtype=np.int16)
+        target[0, 0] = 0
+        image = target.copy()
+        np.random.seed(0)
+        lines = list(iter_image_lines(image, 30, 2, DrawType.SUBTRACTIVE, workers=2))
+
+        # Pixels without any candidate line inside the image are picked again.
+        self.assertEqual(len(lines), 30)
+        self.assertTrue(np.array_equal(image - target, 10 * line_counts(lines, target.shape)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from pins import ChordTable, PinLayout, compute_pin_lines, pin_positions
+
+
+class TestPins(unittest.TestCase):
+
+    def test_pin_positions__border(self):
+        pins_x, pins_y = pin_positions(8, 11, 11, PinLayout.BORDER)
+        self.assertEqual(list(zip(pins_x, pins_y)), [
+            (0, 0), (5, 0), (10, 0), (10, 5), (10, 10), (5, 10), (0, 10), (0, 5)])
+
+    def test_pin_positions__circle(self):
+        pins_x, pins_y = pin_positions(16, 41, 31, PinLayout.CIRCLE)
+        radius = np.hypot(pins_x - 20, pins_y - 15)
+        self.assertTrue(np.all(np.abs(radius - 15) < 1.0))
+
+    def test_chord_table__sums_updated_incrementally(self):
+        image = np.random.default_rng(0).integers(0, 255, (40, 50)).astype(np.int16)
+        pins_x, pins_y = pin_positions(20, 50, 40, PinLayout.BORDER)
+        chord_table = ChordTable(image, pins_x, pins_y)
+
+        for chord_id in (0, 17, 100, 17):
+            chord_table.accumulate(image, chord_id, 10)
+
+        for chord_id in range(chord_table.sums.shape[0]):
+            self.assertEqual(chord_table.sums[chord_id],
+                             np.sum(image.reshape(-1)[chord_table.chord_pixels(chord_id)]))
+
+    def test_compute_pin_lines__continuous_thread(self):
+        image = np.random.default_rng(1).integers(0, 255, (30, 30)).astype(np.int16)
+        pin_sequence = []
+        lines = compute_pin_lines(image, 20, False, 10, 24, PinLayout.CIRCLE, 3, pin_sequence)
+
+        self.assertEqual(len(lines), 20)
+        self.assertEqual(len(pin_sequence), 21)
+        for line_a, line_b in zip(lines[:-1], lines[1:]):
+            self.assertTrue(line_a[1].equals(line_b[0]))
+
+    def test_compute_pin_lines__too_few_pins(self):
+        image = np.full((30, 30), 100, dtype=np.int16)
+        with self.assertRaises(ValueError):
+            compute_pin_lines(image, 5, False, 10, 16, PinLayout.CIRCLE, 10)
+
+        lines = compute_pin_lines(image, 5, False, 10, 21, PinLayout.CIRCLE, 10)
+        self.assertEqual(len(lines), 5)
+        self.assertFalse(any(line_[0].equals(line_[1]) for line_ in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from src.png_stream import PngStreamWriter
+
+
+class TestPngStreamWriter(unittest.TestCase):
+
+    def _write_and_read(self, image, stripe_rows):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'out.png')
+            channels = 1 if image.ndim == 2 else 3
+            with PngStreamWriter(path, image.shape[1], image.shape[0], channels) as writer:
+                for row in range(0, image.shape[0], stripe_rows):
+                    writer.write_rows(image[row:row + stripe_rows])
+            return np.asarray(Image.open(path))
+
+    def test_grayscale(self):
+        image = np.random.default_rng(0).integers(0, 256, (37, 21)).astype(np.uint8)
+        self.assertTrue(np.array_equal(self._write_and_read(image, 10), image))
+
+    def test_rgb(self):
+        image = np.random.default_rng(1).integers(0, 256, (9, 13, 3)).astype(np.uint8)
+        self.assertTrue(np.array_equal(self._write_and_read(image, 4), image))
+
+    def test_missing_rows(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            writer = PngStreamWriter(os.path.join(temp_dir, 'out.png'), 4, 4)
+            writer.write_rows(np.zeros((2, 4), dtype=np.uint8))
+            with self.assertRaises(ValueError):
+                writer.close()
+
+    def test_error_in_body_is_kept(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(RuntimeError):
+                with PngStreamWriter(os.path.join(temp_dir, 'out.png'), 4, 4) as writer:
+                    writer.write_rows(np.zeros((2, 4), dtype=np.uint8))
+                    raise RuntimeError('failed')
+
+
+if __name__ == '__main__':
+    unittest.main()
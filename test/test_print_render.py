@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from print_render import render_tile, render_tiled_png, scale_line_coordinates
+
+
+class TestRenderTile(unittest.TestCase):
+
+    def test_horizontal_line(self):
+        coverage = render_tile(np.array([[2.0, 10.0, 50.0, 10.0]]), 0, 20, 64, 3.0)
+        self.assertEqual(coverage[:, 20].tolist(), [0] * 9 + [1] * 3 + [0] * 8)
+
+    def test_coverage_per_length(self):
+        # Diagonal and flat lines get the same coverage per unit of length.
+        for line_ in ([[10.0, 10.3, 50.0, 43.1]], [[5.0, 20.2, 58.0, 21.7]]):
+            lines = np.array(line_)
+            length = np.hypot(*(lines[0, 2:] - lines[0, :2]))
+            for line_width in (0.5, 3.0):
+                coverage = render_tile(lines, 0, 64, 64, line_width)
+                self.assertAlmostEqual(coverage.sum() / (length * line_width), 1.0, delta=0.1)
+
+    def test_tiles_match_whole_image(self):
+        lines = np.random.default_rng(0).uniform(-5, 70, (50, 4))
+        whole = render_tile(lines, 0, 60, 64, 2.5)
+        tiles = np.concatenate([render_tile(lines, row, min(row + 7, 60), 64, 2.5)
+                                for row in range(0, 60, 7)])
+        self.assertTrue(np.allclose(whole, tiles))
+
+
+class TestRenderTiledPng(unittest.TestCase):
+
+    def test_tone_independent_of_scale(self):
+        lines = np.random.default_rng(0).integers(0, 64, (200, 4))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'print.png')
+            means = []
+            for scale in (1.0, 3.0):
+                shape = render_tiled_png(lines, (48, 64), scale, False, output_path, 10,
+                                         tile_rows=16, threads=2)
+                image = np.asarray(Image.open(output_path))
+                self.assertEqual(image.shape, shape)
+                means.append(255 - image.mean())
+            self.assertEqual(shape, (144, 192))
+
+        self.assertAlmostEqual(means[0], means[1], delta=0.05 * means[0])
+
+    def test_color(self):
+        lines = np.array([[0, 5, 19, 5], [0, 15, 19, 15]])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'print.png')
+            render_tiled_png(lines, (20, 20), 2.0, True, output_path, 100, line_channels=[0, 2])
+            image = np.asarray(Image.open(output_path))
+
+        self.assertEqual(image.shape, (40, 40, 3))
+        self.assertEqual(image[11, 20].tolist(), [100, 0, 0])
+        self.assertEqual(image[31, 20].tolist(), [0, 0, 100])
+
+    def test_scale_line_coordinates(self):
+        lines = np.array([[0, 0, 79, 59]])
+        self.assertEqual(scale_line_coordinates(lines, 2.0).tolist(), [[0.5, 0.5, 158.5, 118.5]])
+
+
+if __name__ == '__main__':
+    unittest.main()
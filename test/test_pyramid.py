@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from pyramid import CoarseImage
+
+
+def block_mean(image, factor):
+    (height, width) = image.shape
+    return np.array([[np.mean(image[y:y+factor, x:x+factor]) for x in range(0, width, factor)]
+                     for y in range(0, height, factor)])
+
+
+class TestCoarseImage(unittest.TestCase):
+
+    def test_block_mean(self):
+        image = np.random.default_rng(0).integers(0, 255, (13, 10)).astype(np.int16)
+        coarse_image = CoarseImage(image, 4)
+        self.assertEqual(coarse_image.image.shape, (4, 3))
+        self.assertTrue(np.allclose(coarse_image.image, block_mean(image, 4)))
+
+    def test_accumulate(self):
+        image = np.random.default_rng(1).integers(0, 255, (13, 10)).astype(np.int16)
+        coarse_image = CoarseImage(image, 3)
+
+        yy, xx = (np.array([0, 5, 12, 12]), np.array([0, 9, 9, 3]))
+        image[yy, xx] += 10
+        coarse_image.accumulate(yy, xx, 10)
+        self.assertTrue(np.allclose(coarse_image.image, block_mean(image, 3)))
+
+    def test_coarse_point__inside_coarse_image(self):
+        coarse_image = CoarseImage(np.zeros((512, 512), dtype=np.int16), 4)
+        point = coarse_image.coarse_point(511, 511)
+        self.assertEqual((point.x, point.y), (127.0, -127.0))
+        point = coarse_image.coarse_point(2, 6)
+        self.assertEqual((point.x, point.y), (1.125, -0.125))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from line_table import LineTable
+from radon import RadonAccumulator, compute_radon_lines
+
+
+def brute_force_sums(image, line_table):
+    flat_indexes, offsets = line_table.pixels(np.arange(line_table.num_lines))
+    values = image.reshape(-1)[flat_indexes].astype(np.int64)
+    return np.array([np.sum(values[offsets[i]:offsets[i + 1]])
+                     for i in range(line_table.num_lines)])
+
+
+class TestRadon(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.line_table = LineTable.load_or_build(self.temp_dir.name, 21, 15, 16)
+        self.image = np.random.default_rng(0).integers(0, 255, (15, 21)).astype(np.int16)
+
+    def tearDown(self):
+        del self.line_table
+        self.temp_dir.cleanup()
+
+    def test_accumulator_sums(self):
+        accumulator = RadonAccumulator(self.image, self.line_table)
+        self.assertTrue(np.array_equal(accumulator.sums, brute_force_sums(self.image, self.line_table)))
+
+        accumulator.accumulate(self.image, 7, 10)
+        accumulator.accumulate(self.image, 40, -3)
+        self.assertTrue(np.array_equal(accumulator.sums, brute_force_sums(self.image, self.line_table)))
+
+    def test_compute_radon_lines__best_line_first(self):
+        target = self.image.copy()
+        line_ids = []
+        lines = compute_radon_lines(self.image, 1, False, 10, self.line_table, 1, line_ids)
+        self.assertEqual(len(lines), 1)
+
+        # First line reduces the squared error more than any other line.
+        def error_after(line_id):
+            residual = target.astype(np.int64)
+            flat_indexes, _ = self.line_table.pixels(line_id)
+            residual.reshape(-1)[flat_indexes] += 10
+            return np.sum((residual - 255) ** 2)
+
+        errors = [error_after(line_id) for line_id in range(self.line_table.num_lines)]
+        self.assertEqual(errors[line_ids[0]], min(errors))
+
+    def test_compute_radon_lines__endpoints(self):
+        line_ids = []
+        lines = compute_radon_lines(self.image, 5, True, 10, self.line_table, 10, line_ids)
+        for (line_, line_id) in zip(lines, line_ids):
+            (x_1, y_1, x_2, y_2) = self.line_table.endpoints[line_id]
+            self.assertEqual((line_[0].x, line_[0].y, line_[1].x, line_[1].y), (x_1, y_1, x_2, y_2))
+            self.assertGreaterEqual(np.diff(self.line_table.offsets)[line_id], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
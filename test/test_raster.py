@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+
+from src.raster import line, line_flat_indexes, line_segments
+
+
+class TestRasterLineSegments(unittest.TestCase):
+
+    def test_line_segments__single_point(self):
+        rr, cc, offsets = line_segments([3], [4], [3], [4])
+        self.assertEqual(rr.tolist(), [3])
+        self.assertEqual(cc.tolist(), [4])
+        self.assertEqual(offsets.tolist(), [0, 1])
+
+    def test_line_segments__offsets(self):
+        rr, cc, offsets = line_segments([0, 0], [0, 0], [0, 5], [9, 2])
+        self.assertEqual(offsets.tolist(), [0, 10, 16])
+        self.assertEqual(rr[:10].tolist(), [0] * 10)
+        self.assertEqual(cc[:10].tolist(), list(range(10)))
+        self.assertEqual(rr[10:].tolist(), list(range(6)))
+
+    def test_line_segments__same_as_skimage(self):
+        try:
+            from skimage.draw import line
+        except ImportError:
+            self.skipTest('scikit-image not installed')
+
+        rng = np.random.default_rng(0)
+        coordinates = rng.integers(-20, 60, (500, 4))
+        rr, cc, offsets = line_segments(*coordinates.T)
+
+        for i, (r_0, c_0, r_1, c_1) in enumerate(coordinates):
+            yy, xx = line(r_0, c_0, r_1, c_1)
+            self.assertTrue(np.array_equal(yy, rr[offsets[i]:offsets[i+1]]))
+            self.assertTrue(np.array_equal(xx, cc[offsets[i]:offsets[i+1]]))
+
+
+class TestRasterLine(unittest.TestCase):
+
+    def test_line__hand_checked(self):
+        rr, cc = line(1, 1, 3, 6)
+        self.assertEqual(rr.tolist(), [1, 1, 2, 2, 3, 3])
+        self.assertEqual(cc.tolist(), [1, 2, 3, 4, 5, 6])
+        rr, cc = line(4, 2, 0, 2)
+        self.assertEqual(rr.tolist(), [4, 3, 2, 1, 0])
+        self.assertEqual(cc.tolist(), [2] * 5)
+
+    def test_line__single_point(self):
+        rr, cc = line(5, 7, 5, 7)
+        self.assertEqual(rr.tolist(), [5])
+        self.assertEqual(cc.tolist(), [7])
+
+    def test_line__same_as_skimage(self):
+        try:
+            from skimage.draw import line as skimage_line
+        except ImportError:
+            self.skipTest('scikit-image not installed')
+
+        rng = np.random.default_rng(2)
+        for (r_0, c_0, r_1, c_1) in rng.integers(-20, 60, (500, 4)):
+            yy, xx = skimage_line(r_0, c_0, r_1, c_1)
+            rr, cc = line(r_0, c_0, r_1, c_1)
+            self.assertTrue(np.array_equal(yy, rr))
+            self.assertTrue(np.array_equal(xx, cc))
+
+
+class TestRasterLineFlatIndexes(unittest.TestCase):
+
+    def test_line_flat_indexes__same_pixels_as_line_segments(self):
+        rng = np.random.default_rng(1)
+        coordinates = rng.integers(0, 70, (300, 4))
+        rr, cc, _ = line_segments(*coordinates.T)
+        flat_indexes = line_flat_indexes(*coordinates.T, 70)
+        self.assertTrue(np.array_equal(np.sort(flat_indexes), np.sort(rr * 70 + cc)))
+
+    def test_line_flat_indexes__empty(self):
+        self.assertEqual(line_flat_indexes([], [], [], [], 10).shape, (0,))
+
+
+if __name__ == '__main__':
+    unittest.main()
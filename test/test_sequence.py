@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from line_drawer import DrawType, build_arg_parser, line_counts
+from sequence import compute_frame_lines, misfit_lines, unsupported_options
+
+
+def frame(offset):
+    """Light image with a dark square starting at column offset."""
+    image = np.full((64, 64), 220, dtype=np.int16)
+    image[20:40, offset:offset + 20] = 10
+    return image
+
+
+class TestMisfitLines(unittest.TestCase):
+
+    def test_misfit_lines(self):
+        target = np.full((10, 10), 255, dtype=np.int16)
+        target[2] = 0
+        lines = np.array([[0, 2, 9, 2], [0, 7, 9, 7]])
+        residual = target + 10 * line_counts(lines, target.shape)
+        changed = np.zeros(target.shape, dtype=bool)
+
+        # Only lines through changed pixels are checked.
+        self.assertEqual(misfit_lines(lines, target, residual, DrawType.SUBTRACTIVE, 10,
+                                      changed).tolist(), [False, False])
+        changed[:, 0] = True
+        # The line on the light row 7 darkens pixels which should stay light.
+        self.assertEqual(misfit_lines(lines, target, residual, DrawType.SUBTRACTIVE, 10,
+                                      changed).tolist(), [False, True])
+
+
+class TestComputeFrameLines(unittest.TestCase):
+
+    def test_unchanged_frame_reuses_all_lines(self):
+        np.random.seed(42)
+        lines, _, num_reused = compute_frame_lines(frame(10), 200, 10, DrawType.SUBTRACTIVE)
+        self.assertEqual(num_reused, 0)
+
+        warm_lines, _, num_reused = compute_frame_lines(
+            frame(10), 200, 10, DrawType.SUBTRACTIVE, previous_target=frame(10),
+            previous_lines=lines)
+        self.assertEqual(num_reused, 200)
+        self.assertTrue(np.array_equal(warm_lines, lines))
+
+    def test_changed_frame(self):
+        np.random.seed(42)
+        lines, _, _ = compute_frame_lines(frame(10), 200, 10, DrawType.SUBTRACTIVE)
+        warm_lines, residual, num_reused = compute_frame_lines(
+            frame(30), 200, 10, DrawType.SUBTRACTIVE, previous_target=frame(10),
+            previous_lines=lines)
+
+        self.assertEqual(warm_lines.shape, (200, 4))
+        self.assertGreater(num_reused, 0)
+        self.assertLess(num_reused, 200)
+        # Kept lines come first and the residual matches all lines.
+        previous = set(map(tuple, lines.tolist()))
+        self.assertTrue(all(tuple(line_) in previous for line_ in warm_lines[:num_reused].tolist()))
+        self.assertTrue(np.array_equal(
+            residual, frame(30) + 10 * line_counts(warm_lines, residual.shape)))
+
+
+class TestUnsupportedOptions(unittest.TestCase):
+
+    def test_unsupported_options(self):
+        parser = build_arg_parser()
+        self.assertEqual(unsupported_options(parser.parse_args(
+            ['--num-lines', '50', '--draw-type', 'additive', '--lines-per-round', '4'])), [])
+        self.assertEqual(unsupported_options(parser.parse_args(
+            ['--engine', 'PINS', '--angle-resolution', '64', '--workers', '2'])),
+            ['--angle-resolution', '--engine', '--workers'])
+
+
+if __name__ == '__main__':
+    unittest.main()
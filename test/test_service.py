@@ -0,0 +1,161 @@
+import asyncio
+import base64
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from service import HttpError, RenderService, job_args_from_options, serve
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example')
+
+
+class TestJobArgs(unittest.TestCase):
+
+    def test_options_like_command_line(self):
+        args = job_args_from_options({'input_path': 'in.png', 'num-lines': 5, '--draw-type': 'additive',
+                                      'no_random_result': True, 'resume': False})
+        self.assertEqual(args.input_path, 'in.png')
+        self.assertEqual(args.num_lines, 5)
+        self.assertEqual(args.draw_type, 'additive')
+        self.assertTrue(args.no_random_result)
+        self.assertFalse(args.resume)
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            job_args_from_options({'unknown_option': 1})
+        with self.assertRaises(ValueError):
+            job_args_from_options({'num_lines': 'many'})
+
+
+class TestRenderService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = RenderService(num_workers=1, max_num_lines=100000, input_dir=EXAMPLE_DIR)
+        cls.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def set_port(server):
+            cls.port = server.sockets[0].getsockname()[1]
+            started.set()
+
+        async def run():
+            try:
+                await serve(cls.service, port=0, started=set_port)
+            except asyncio.CancelledError:
+                pass
+
+        cls.task = cls.loop.create_task(run())
+        cls.thread = threading.Thread(target=cls.loop.run_until_complete, args=(cls.task,), daemon=True)
+        cls.thread.start()
+        started.wait(10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.task.cancel)
+        cls.thread.join(10)
+        cls.loop.close()
+
+    def request(self, method, path, data=None):
+        request = urllib.request.Request(
+            'http://127.0.0.1:{}{}'.format(self.port, path), method=method,
+            data=None if data is None else json.dumps(data).encode('utf-8'))
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+
+    def events(self, job_id):
+        with urllib.request.urlopen('http://127.0.0.1:{}/jobs/{}/events'.format(
+                self.port, job_id), timeout=30) as response:
+            return [json.loads(line) for line in response]
+
+    def test_job_with_progress_and_result(self):
+        status, body = self.request('POST', '/jobs', {'options': {
+            'input_path': 'mani_matter.png', 'num_lines': 120, 'output_width': 64, 'no_random_result': True}})
+        self.assertEqual(status, 202)
+        job_id = json.loads(body)['id']
+
+        events = self.events(job_id)
+        self.assertEqual(events[-1]['event'], 'done')
+        self.assertEqual(events[-1]['summary']['lines'], 120)
+        self.assertIn({'event': 'progress', 'lines': 100, 'num_lines': 120}, events)
+
+        status, body = self.request('GET', '/jobs/{}/result'.format(job_id))
+        self.assertEqual(status, 200)
+        self.assertEqual(body[:4], b'\x89PNG')
+
+    def test_cancel_running_job(self):
+        _, body = self.request('POST', '/jobs', {'options': {
+            'input_path': 'mani_matter.png', 'num_lines': 100000, 'output_width': 64}})
+        job_id = json.loads(body)['id']
+        while json.loads(self.request('GET', '/jobs/' + job_id)[1])['lines'] == 0:
+            time.sleep(0.05)
+
+        self.assertEqual(self.request('DELETE', '/jobs/' + job_id)[0], 202)
+        self.assertEqual(self.events(job_id)[-1]['event'], 'cancelled')
+        self.assertEqual(self.request('DELETE', '/jobs/' + job_id)[0], 409)
+
+    def test_rejected_jobs(self):
+        self.assertEqual(self.request('POST', '/jobs', {'options': {
+            'input_path': 'mani_matter.png', 'num_lines': 200000}})[0], 400)
+        self.assertEqual(self.request('POST', '/jobs', {'options': {
+            'input_path': 'missing.png'}})[0], 400)
+        self.assertEqual(self.request('GET', '/jobs/unknown')[0], 404)
+
+    def test_rejected_paths_and_processes(self):
+        for options in ({'input_path': '../README.md'}, {'input_path': '/etc/passwd'},
+                        {'input_path': 'mani_matter.png', 'output_path': '/tmp/x.png'},
+                        {'input_path': 'mani_matter.png', 'metrics-out': '/tmp/x.json'},
+                        {'input_path': 'mani_matter.png', '--workers': 2},
+                        {'input_path': 'mani_matter.png', 'color': True}):
+            status, body = self.request('POST', '/jobs', {'options': options})
+            self.assertEqual(status, 400, options)
+            self.assertIn('error', json.loads(body))
+
+
+class TestFinishedJobs(unittest.TestCase):
+
+    def test_finished_jobs_are_evicted(self):
+        with open(os.path.join(EXAMPLE_DIR, 'mani_matter.png'), 'rb') as file:
+            image = base64.b64encode(file.read()).decode('ascii')
+        service = RenderService(max_finished=1, finished_ttl=0)
+        try:
+            jobs = [service.submit({'image': image}) for _ in range(3)]
+            for job in jobs:
+                service.cancel(job)
+
+            self.assertEqual(list(service.jobs), [jobs[-1].id])
+            self.assertEqual([os.path.isdir(job.directory) for job in jobs], [False, False, True])
+        finally:
+            service.stop()
+
+
+    def test_image_size_limits(self):
+        service = RenderService(max_output_width=256, input_dir=EXAMPLE_DIR, max_input_pixels=469 * 466)
+        try:
+            service.submit({'options': {'input_path': 'mani_matter.png', 'output_width': 128}})
+            for output_width in (-1, 0, 1024):
+                with self.assertRaises(HttpError):
+                    service.submit({'options': {'input_path': 'mani_matter.png',
+                                                'output_width': output_width}})
+            with self.assertRaises(HttpError):
+                service.submit({'image': base64.b64encode(b'no image').decode('ascii')})
+
+            service.max_input_pixels = 469 * 466 - 1
+            with self.assertRaises(HttpError):
+                service.submit({'options': {'input_path': 'mani_matter.png', 'output_width': 128}})
+        finally:
+            service.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
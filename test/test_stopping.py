@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from line_drawer import DrawType, compute_image_lines, residual_error
+from stopping import ResidualErrorTracker, StoppingCriteria
+
+
+def target_image():
+    return np.random.default_rng(0).integers(0, 255, (40, 50)).astype(np.int16)
+
+
+class TestResidualErrorTracker(unittest.TestCase):
+
+    def test_update_same_as_full_error(self):
+        for draw_type in DrawType:
+            target = target_image()
+            residual = target.copy()
+            tracker = ResidualErrorTracker(target, residual, draw_type == DrawType.ADDITIVE)
+            delta = -40 if draw_type == DrawType.ADDITIVE else 40
+
+            rng = np.random.default_rng(1)
+            for _ in range(20):
+                flat_indexes = rng.choice(target.size, 30, replace=False)
+                (yy, xx) = np.divmod(flat_indexes, target.shape[1])
+                residual[yy, xx] += delta
+                tracker.update(yy, xx, residual[yy, xx], delta)
+
+            self.assertAlmostEqual(tracker.mean_squared_error,
+                                   residual_error(target, residual, draw_type))
+
+
+class TestStoppingCriteria(unittest.TestCase):
+
+    def test_target_error(self):
+        target = target_image()
+        residual = target.copy()
+        stopping = StoppingCriteria(ResidualErrorTracker(target, residual, False), target_error=6000.0)
+
+        np.random.seed(42)
+        lines = compute_image_lines(residual, 1000, 5, DrawType.SUBTRACTIVE, stopping=stopping)
+        self.assertLess(len(lines), 1000)
+        self.assertIsNotNone(stopping.reason)
+        self.assertLessEqual(residual_error(target, residual, DrawType.SUBTRACTIVE), 6000.0)
+        self.assertAlmostEqual(stopping.error_tracker.mean_squared_error,
+                               residual_error(target, residual, DrawType.SUBTRACTIVE))
+
+    def test_min_improvement(self):
+        target = np.full((20, 20), 250, dtype=np.int16)
+        stopping = StoppingCriteria(ResidualErrorTracker(target, target.copy(), False),
+                                    min_improvement=0.01, window=5)
+        stopping.start(100, 10)
+        for _ in range(5):
+            self.assertFalse(stopping.should_stop())
+            stopping.line_accepted(np.array([0]), np.array([0]), np.array([250]), 0)
+        self.assertTrue(stopping.should_stop())
+
+    def test_time_budget_lowers_lines_to_check(self):
+        target = target_image()
+        stopping = StoppingCriteria(ResidualErrorTracker(target, target.copy(), False),
+                                    time_budget=1e-9)
+        stopping.start(100, 64)
+        for _ in range(10):
+            stopping.line_accepted(np.array([0]), np.array([0]), target[[0], [0]], 0)
+        self.assertEqual(stopping.lines_to_check, 32)
+        self.assertTrue(stopping.should_stop())
+
+
+if __name__ == '__main__':
+    unittest.main()
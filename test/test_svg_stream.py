@@ -0,0 +1,61 @@
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from geometry import Point, PointInt
+from svg_stream import SvgPathWriter
+
+SVG_NAMESPACE = '{http://www.w3.org/2000/svg}'
+
+
+class TestSvgPathWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_path_commands(self):
+        path = os.path.join(self.temp_dir.name, 'lines.svg')
+        lines = [(PointInt(0, 1), PointInt(5, 6)), (PointInt(5, 6), PointInt(9, 0)),
+                 (PointInt(2, 2), PointInt(3, 3))]
+        with SvgPathWriter(path, 10, 7, background='white') as writer:
+            writer.write_lines(lines[:2])
+            writer.write_lines(lines[2:])
+
+        root = ET.parse(path).getroot()
+        self.assertEqual(root.get('viewBox'), '0 0 10 7')
+        self.assertEqual(root.find(SVG_NAMESPACE + 'rect').get('fill'), 'white')
+        self.assertEqual(root.find(SVG_NAMESPACE + 'path').get('d'), 'M0 1L5 6L9 0M2 2L3 3')
+
+    def test_precision_and_gzip(self):
+        path = os.path.join(self.temp_dir.name, 'lines.svgz')
+        with SvgPathWriter(path, 10, 10, precision=2) as writer:
+            writer.write_lines([(Point(0.5, 1.0), Point(2.125, 3.0))])
+
+        with gzip.open(path) as file:
+            root = ET.parse(file).getroot()
+        self.assertIsNone(root.find(SVG_NAMESPACE + 'rect'))
+        self.assertEqual(root.find(SVG_NAMESPACE + 'path').get('d'), 'M0.50 1.00L2.12 3.00')
+
+    def test_start_path(self):
+        path = os.path.join(self.temp_dir.name, 'lines.svg')
+        with SvgPathWriter(path, 10, 10, 'cyan', blend_mode='multiply') as writer:
+            writer.write_lines([(PointInt(0, 0), PointInt(1, 1))])
+            writer.start_path('magenta')
+            writer.write_lines([(PointInt(1, 1), PointInt(2, 2))])
+
+        paths = ET.parse(path).getroot().findall(SVG_NAMESPACE + 'path')
+        self.assertEqual([p.get('stroke') for p in paths], ['cyan', 'magenta'])
+        self.assertEqual([p.get('d') for p in paths], ['M0 0L1 1', 'M1 1L2 2'])
+        self.assertEqual(paths[1].get('style'), 'mix-blend-mode:multiply')
+
+
+if __name__ == '__main__':
+    unittest.main()